@@ -0,0 +1,66 @@
+"""
+Content-addressed store for large text fields of the graph state (raw search
+results, Gemini video analyses). Nodes keep a short reference in state and
+the text lives on disk once, so checkpoints and "values" streams don't
+re-serialize it after every later node
+"""
+
+import hashlib
+import os
+import tempfile
+from typing import Optional
+
+BLOB_REF_PREFIX = "blob:sha256:"
+
+
+def is_blob_ref(value: str) -> bool:
+    return isinstance(value, str) and value.startswith(BLOB_REF_PREFIX) and len(value) == len(BLOB_REF_PREFIX) + 64
+
+
+class BlobStore:
+    """Write-once text blobs under `root`, named by their SHA-256, safe to share across threads and processes"""
+
+    def __init__(self, root: str, min_bytes: int = 512):
+        self.root = root
+        self.min_bytes = min_bytes
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest[2:])
+
+    def put(self, text: str) -> str:
+        """Store the text (if not stored already) and return its reference"""
+        data = text.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write then rename, so concurrent writers of the same blob never expose a partial file
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        return BLOB_REF_PREFIX + digest
+
+    def get(self, ref: str) -> Optional[str]:
+        """The stored text, or None if the blob is gone"""
+        try:
+            with open(self._path(ref[len(BLOB_REF_PREFIX):]), "rb") as f:
+                return f.read().decode("utf-8")
+        except FileNotFoundError:
+            return None
+
+    def offload(self, text: str) -> str:
+        """A reference for texts of at least min_bytes, the text itself otherwise"""
+        if not text or len(text.encode("utf-8")) < self.min_bytes:
+            return text
+        return self.put(text)
+
+    def resolve(self, value: str) -> str:
+        """The text behind a reference; anything else is returned unchanged"""
+        if not is_blob_ref(value):
+            return value
+        text = self.get(value)
+        if text is None:
+            raise KeyError(f"Blob {value} is missing from {self.root}")
+        return text
@@ -0,0 +1,200 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Optional, Tuple, TypeVar
+
+
+T = TypeVar("T")
+
+
+# Root directory for all on-disk caches
+cache_dir = os.getenv("CLIPHUNT_CACHE_DIR") or os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+
+
+def cache_key(*parts: Any) -> str:
+    """Content-addressed key: SHA-256 of the JSON-serialized parts"""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SQLiteCache:
+    """Persistent key/value cache with TTL expiry and size-based LRU eviction, safe to share across threads"""
+
+    def __init__(self, path: str, ttl: Optional[float] = None, max_bytes: Optional[int] = None):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+            "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at)")
+
+    def _expired(self, created_at: float, now: float, max_age: Optional[float] = None) -> bool:
+        ttl = max_age if max_age is not None else self.ttl
+        return ttl is not None and now - created_at > ttl
+
+    def get(self, key: str, allow_stale: bool = False, max_age: Optional[float] = None) -> Optional[Any]:
+        """Return the cached value, or None on a miss (expired entries count as misses unless allow_stale)
+
+        max_age overrides the cache-wide TTL for this lookup.
+        """
+        entry = self.get_entry(key, allow_stale=allow_stale, max_age=max_age)
+        return entry[0] if entry is not None else None
+
+    def get_entry(self, key: str, allow_stale: bool = False, max_age: Optional[float] = None) -> Optional[Tuple[Any, float]]:
+        """Like get, but returns (value, created_at) so callers can carry the entry's age along"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created_at FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None or (self._expired(row[1], now, max_age) and not allow_stale):
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return json.loads(row[0]), row[1]
+
+    def set(self, key: str, value: Any) -> None:
+        """Store a JSON-serializable value and evict least recently used entries beyond max_bytes"""
+        data = json.dumps(value, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, data, len(data.encode("utf-8")), now, now),
+            )
+            self._evict(now)
+
+    def _evict(self, now: float) -> None:
+        if self.max_bytes is None:
+            return
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        if self.ttl is not None:
+            self._conn.execute("DELETE FROM entries WHERE created_at < ?", (now - self.ttl,))
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        for key, size in self._conn.execute("SELECT key, size FROM entries ORDER BY accessed_at ASC").fetchall():
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total -= size
+
+    def stats(self) -> dict:
+        """Hit/miss counters since process start plus current entry count and size"""
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "bytes": size}
+
+
+class LRUCache:
+    """In-process, thread-safe LRU cache with an optional default TTL"""
+
+    def __init__(self, max_entries: int = 512, ttl: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, max_age: Optional[float] = None) -> Optional[Any]:
+        """Return the cached value, or None on a miss; max_age overrides the default TTL for this lookup"""
+        ttl = max_age if max_age is not None else self.ttl
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (ttl is not None and time.time() - entry[0] > ttl):
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: str, value: Any, created_at: Optional[float] = None) -> None:
+        """Store a value; created_at backdates it (an entry copied from another tier keeps its age)"""
+        with self._lock:
+            self._entries[key] = (created_at if created_at is not None else time.time(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+
+class TieredCache:
+    """In-process LRU in front of an optional persistent SQLiteCache; disk hits are promoted to memory"""
+
+    def __init__(self, memory: LRUCache, disk: Optional[SQLiteCache] = None):
+        self.memory = memory
+        self.disk = disk
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str, max_age: Optional[float] = None) -> Optional[Any]:
+        value = self.memory.get(key, max_age=max_age)
+        if value is None and self.disk is not None:
+            entry = self.disk.get_entry(key, max_age=max_age)
+            if entry is not None:
+                # Keep the disk entry's age, so the promoted copy expires when the original does
+                value, created_at = entry
+                self.memory.set(key, value, created_at=created_at)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value)
+
+    def stats(self) -> dict:
+        stats = {"hits": self.hits, "misses": self.misses, "memory": self.memory.stats()}
+        if self.disk is not None:
+            stats["disk"] = self.disk.stats()
+        return stats
+
+
+class SingleFlight:
+    """Collapse concurrent calls with the same key into one execution whose result every caller receives"""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, func: Callable[[], T]) -> T:
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+        if not leader:
+            return future.result()
+        try:
+            result = func()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
@@ -0,0 +1,64 @@
+"""
+Lazily built API clients. Importing an SDK and constructing its client
+(Gemini, Tavily, YouTube) costs well over a second, so cliphunt.py registers
+factories and only pays for a client the first time a node uses it
+"""
+
+import threading
+from typing import Any, Callable, Dict, List
+
+
+class ClientRegistry:
+    """Named client factories, each called at most once, on first use"""
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._clients: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, factory: Callable[[], Any]) -> "LazyClient":
+        """Register a factory and return a proxy that builds the client on first attribute access"""
+        self._factories[name] = factory
+        return LazyClient(self, name)
+
+    def get(self, name: str) -> Any:
+        client = self._clients.get(name)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(name)
+                if client is None:
+                    client = self._factories[name]()
+                    self._clients[name] = client
+        return client
+
+    def set(self, name: str, client: Any) -> None:
+        """Use an already built client (tests, benchmarks) instead of calling the factory"""
+        with self._lock:
+            self._clients[name] = client
+
+    @property
+    def built(self) -> List[str]:
+        return sorted(self._clients)
+
+    def build_all(self) -> None:
+        """Build every registered client now (warm-up, or to measure the deferred cost)"""
+        for name in list(self._factories):
+            self.get(name)
+
+
+class LazyClient:
+    """Stand-in for a registered client that forwards attribute access to the real one"""
+
+    def __init__(self, registry: ClientRegistry, name: str):
+        self._registry = registry
+        self._name = name
+
+    def __getattr__(self, attr: str) -> Any:
+        # langgraph probes the globals of node functions (hasattr(..., "__self__")) when compiling
+        # the graph; answering dunder lookups from the proxy itself keeps that from building clients
+        if attr.startswith("__"):
+            raise AttributeError(attr)
+        return getattr(self._registry.get(self._name), attr)
+
+    def __repr__(self) -> str:
+        return f"LazyClient({self._name!r})"
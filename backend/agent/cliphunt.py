@@ -1,35 +1,186 @@
 from dotenv import load_dotenv
-from langchain_google_genai import ChatGoogleGenerativeAI
-from pydantic import BaseModel, Field
-from typing import TypedDict, List, Optional, Union, Dict
+from pydantic import BaseModel, Field, ValidationError
+from typing import Annotated, TypedDict, List, Optional, Union, Dict
 from langchain_core.messages import SystemMessage, HumanMessage
-from langgraph.graph import StateGraph, END
-from tavily import TavilyClient
-from google import genai
-from google.genai import types
+from langchain_core.runnables.config import ContextThreadPoolExecutor
+from langgraph.graph import StateGraph, START, END
+import operator
 import os
-import requests
+import threading
+import time
+import httplib2
 from enum import Enum
-from googleapiclient.discovery import build
+from concurrent.futures import wait
+from scheduler import TokenBucket, DeadlineExceeded, QuotaLedger, call_with_retry
+from cache import SQLiteCache, LRUCache, TieredCache, SingleFlight, cache_dir, cache_key
+from llm_cache import CachedLLM, SemanticIndex
+from instrumentation import TokenUsageCallback, instrument_node, record, record_cache, record_call
+from clients import ClientRegistry
+from http_pool import PooledSession
+from context_packing import pack_research
+from blob_store import BlobStore
+from segment_ranking import extract_json, find_segments, rank_segments
 
 
 load_dotenv()
+
+# API clients are built on first use: the SDK imports and client construction
+# below would otherwise dominate the import time of this module
+clients = ClientRegistry()
+
+
+def build_llm():
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    # Token usage is counted per node for /metrics
+    return ChatGoogleGenerativeAI(model="gemini-2.5-flash", callbacks=[TokenUsageCallback()])
+
+
+def build_embeddings():
+    from langchain_google_genai import GoogleGenerativeAIEmbeddings
+    return GoogleGenerativeAIEmbeddings(model=os.getenv("LLM_EMBEDDING_MODEL", "models/text-embedding-004"))
+
+
+def build_tavily():
+    from tavily import TavilyClient
+    # TAVILY_API_BASE_URL points it at a local stub for load tests. The client sets its API key header on
+    # the session it is given, so it gets its own session on the shared pool rather than http_session itself
+    return TavilyClient(api_key=os.getenv("TAVILY_API_KEY"), api_base_url=os.getenv("TAVILY_API_BASE_URL"), session=http_session.scoped())
+
+
+def build_gemini_client():
+    from google import genai
+    # Honours GOOGLE_GEMINI_BASE_URL, as does the LLM
+    return genai.Client()
+
+
+def build_youtube():
+    from googleapiclient.discovery import build
+    # static_discovery: use the discovery document bundled with google-api-python-client, never fetch it
+    return build(
+        'youtube', 'v3', developerKey=youtube_api_key, static_discovery=True,
+        client_options={"api_endpoint": youtube_api_base_url} if youtube_api_base_url else None
+    )
+
+
+# Keep-alive connection pool, timeouts and retries shared by the Tavily and DuckDuckGo searches (see http_pool.py)
+http_session = PooledSession()
+
 # LLM
-llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash")
+llm = clients.register("llm", build_llm)
+
+# LLM response cache: exact match on messages + output schema, optional embedding-similarity tier
+if os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true":
+    llm = CachedLLM(
+        llm,
+        SQLiteCache(
+            os.path.join(cache_dir, "llm_responses.sqlite"),
+            ttl=float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600))),
+            max_bytes=int(float(os.getenv("LLM_CACHE_MAX_MB", "128")) * 1024 * 1024)
+        ),
+        SemanticIndex(
+            os.path.join(cache_dir, "llm_embeddings.sqlite"),
+            clients.register("embeddings", build_embeddings),
+            threshold=float(os.getenv("LLM_SEMANTIC_THRESHOLD", "0.97"))
+        ) if os.getenv("LLM_SEMANTIC_CACHE", "false").lower() == "true" else None
+    )
 
 # Tavily client
-tavily = TavilyClient(api_key=os.getenv("TAVILY_API_KEY"))
+tavily = clients.register("tavily", build_tavily)
 
 # Google Gemini client
-gemini_client = genai.Client()
+gemini_client = clients.register("gemini_client", build_gemini_client)
+
+# DuckDuckGo Instant Answer endpoint
+duckduckgo_api_url = os.getenv("DUCKDUCKGO_API_URL", "https://api.duckduckgo.com/")
 
 # YouTube API client
 youtube_api_key = os.getenv("YOUTUBE_API_KEY")
+youtube_api_base_url = os.getenv("YOUTUBE_API_BASE_URL")
 if youtube_api_key:
-    youtube = build('youtube', 'v3', developerKey=youtube_api_key)
+    youtube = clients.register("youtube", build_youtube)
 else:
     youtube = None
 
+# Maximum number of ideators researching at the same time (Gemini/Tavily rate limits)
+research_max_concurrency = int(os.getenv("RESEARCH_MAX_CONCURRENCY", "4"))
+
+# One structured LLM call writes every ideator's search query (per-ideator calls fill any gaps)
+batch_search_queries = os.getenv("BATCH_SEARCH_QUERIES", "true").lower() == "true"
+
+# Token budget for the research insights in the script prompt (0 = pass every insight through unpacked)
+# and the word-overlap (Jaccard) above which an insight counts as a repeat of one already kept
+research_context_tokens = int(os.getenv("RESEARCH_CONTEXT_TOKENS", "2500"))
+research_context_dedup = float(os.getenv("RESEARCH_CONTEXT_DEDUP", "0.5"))
+
+# YouTube search worker pool size (1 = serial) and per-request socket timeout in seconds
+youtube_search_concurrency = int(os.getenv("YOUTUBE_SEARCH_CONCURRENCY", "4"))
+youtube_request_timeout = float(os.getenv("YOUTUBE_REQUEST_TIMEOUT", "10"))
+_youtube_thread_local = threading.local()
+
+# YouTube search response cache and daily quota ledger (search.list costs 100 units per call).
+# Once the budget minus the reserve is used up, searches are served stale from the cache or
+# degrade to concept visuals.
+youtube_search_cost = 100
+youtube_cache = SQLiteCache(
+    os.path.join(cache_dir, "youtube_search.sqlite"),
+    ttl=float(os.getenv("YOUTUBE_CACHE_TTL", str(6 * 3600))),
+    max_bytes=int(float(os.getenv("YOUTUBE_CACHE_MAX_MB", "32")) * 1024 * 1024)
+)
+youtube_quota = QuotaLedger(
+    os.path.join(cache_dir, "quota.sqlite"),
+    name="youtube",
+    daily_budget=int(os.getenv("YOUTUBE_DAILY_QUOTA", "10000")),
+    reserve=int(os.getenv("YOUTUBE_QUOTA_RESERVE", "500"))
+)
+
+# Gemini video understanding scheduler: parallel calls, shared rate limit, per-call deadline and retries,
+# and a total stage budget after which unfinished ranges fall back to concept visuals
+gemini_max_concurrency = int(os.getenv("GEMINI_MAX_CONCURRENCY", "4"))
+# 0 or less turns the shared rate limit off (concurrency and deadlines still apply)
+gemini_requests_per_second = float(os.getenv("GEMINI_REQUESTS_PER_SECOND", "1"))
+gemini_call_timeout = float(os.getenv("GEMINI_CALL_TIMEOUT", "90"))
+gemini_max_retries = int(os.getenv("GEMINI_MAX_RETRIES", "3"))
+gemini_stage_budget = float(os.getenv("GEMINI_STAGE_BUDGET", "180"))
+gemini_rate_limiter = TokenBucket(gemini_requests_per_second, capacity=gemini_max_concurrency) if gemini_requests_per_second > 0 else None
+gemini_video_model = 'models/gemini-2.5-flash'
+# Have Gemini return segments in the VideoAnalysisLLMOutput schema instead of free text asking for JSON
+gemini_structured_output = os.getenv("GEMINI_STRUCTURED_OUTPUT", "true").lower() == "true"
+
+# Persistent cache of Gemini video analyses keyed by (youtube_url, analysis_query, model)
+if os.getenv("GEMINI_CACHE_ENABLED", "true").lower() == "true":
+    gemini_cache = SQLiteCache(
+        os.path.join(cache_dir, "gemini_analysis.sqlite"),
+        ttl=float(os.getenv("GEMINI_CACHE_TTL", str(7 * 24 * 3600))),
+        max_bytes=int(float(os.getenv("GEMINI_CACHE_MAX_MB", "256")) * 1024 * 1024)
+    )
+else:
+    gemini_cache = None
+
+# Large text fields (raw search results, video analyses) stored out of the graph state: state keeps a
+# "blob:sha256:..." reference and the text is written once to a content-addressed directory
+if os.getenv("BLOB_STORE_ENABLED", "false").lower() == "true":
+    blob_store = BlobStore(
+        os.getenv("BLOB_STORE_DIR") or os.path.join(cache_dir, "blobs"),
+        min_bytes=int(os.getenv("BLOB_STORE_MIN_BYTES", "512"))
+    )
+else:
+    blob_store = None
+
+
+def offload_text(text: str) -> str:
+    """What a node should put in state for a large text field: a blob reference when the store is enabled"""
+    if blob_store is None:
+        return text
+    stored = blob_store.offload(text)
+    if stored is not text:
+        record("blob_bytes_offloaded", len(text.encode("utf-8")))
+    return stored
+
+
+def load_text(value: str) -> str:
+    """The text of a state field written with offload_text"""
+    return blob_store.resolve(value) if blob_store is not None else value
+
 
 class SearchMethod(str, Enum):
     TAVILY = "tavily"
@@ -38,6 +189,27 @@ class SearchMethod(str, Enum):
     NEWS_FOCUSED = "news_focused"
 
 
+# Search result cache: in-process LRU plus an optional on-disk tier, with per-method TTLs
+search_cache_ttls = {
+    SearchMethod.TAVILY: float(os.getenv("SEARCH_CACHE_TTL", "86400")),
+    SearchMethod.DUCKDUCKGO: float(os.getenv("SEARCH_CACHE_TTL", "86400")),
+    SearchMethod.REDDIT_STYLE: float(os.getenv("SEARCH_CACHE_TTL", "86400")),
+    SearchMethod.NEWS_FOCUSED: float(os.getenv("NEWS_SEARCH_CACHE_TTL", "900")),
+}
+if os.getenv("SEARCH_CACHE_ENABLED", "true").lower() == "true":
+    search_cache = TieredCache(
+        LRUCache(max_entries=int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "512"))),
+        SQLiteCache(
+            os.path.join(cache_dir, "search_results.sqlite"),
+            ttl=max(search_cache_ttls.values()),
+            max_bytes=int(float(os.getenv("SEARCH_CACHE_MAX_MB", "64")) * 1024 * 1024)
+        ) if os.getenv("SEARCH_CACHE_DISK", "false").lower() == "true" else None
+    )
+else:
+    search_cache = None
+search_single_flight = SingleFlight()
+
+
 class Ideator(BaseModel):
     name: str = Field(
         description="Name of the ideator."
@@ -65,11 +237,23 @@ class SearchQuery(BaseModel):
     )
 
 
+class IdeatorSearchQuery(SearchQuery):
+    ideator_name: str = Field(
+        description="Exact name of the ideator this search query belongs to."
+    )
+
+
+class SearchQueryBatch(BaseModel):
+    queries: List[IdeatorSearchQuery] = Field(
+        description="One search query per ideator."
+    )
+
+
 class ResearchResult(BaseModel):
     ideator: Ideator
     search_query: SearchQuery
     search_results: str = Field(
-        description="Raw search results from the web search."
+        description="Raw search results from the web search, or their blob store reference (see offload_text)."
     )
     key_insights: str = Field(
         description="Key insights extracted from the search results that align with the ideator's interests."
@@ -171,10 +355,18 @@ class VideoUnderstandingResult(BaseModel):
         description="The query used for video analysis."
     )
     analysis_result: str = Field(
-        description="The detailed analysis result from Gemini in JSON format."
+        description="The detailed analysis result from Gemini in JSON format, or its blob store reference (see offload_text)."
     )
     processing_time: float = Field(
-        description="Time taken to process the video in seconds."
+        description="Time taken to process the video in seconds (cache lookup time for cache hits)."
+    )
+    cache_hit: bool = Field(
+        default=False,
+        description="Whether the analysis was served from the video analysis cache."
+    )
+    cached_processing_time: Optional[float] = Field(
+        default=None,
+        description="Original Gemini processing time of a cached analysis, in seconds."
     )
 
 
@@ -301,6 +493,8 @@ class GeneratedIdeatorState(TypedDict):
     video_understanding_results: VideoUnderstandingResults
     parsed_video_analysis: ParsedVideoAnalysisResults
     final_video_structure: FinalVideoStructure
+    # Appended by instrument_node: per-node wall time, token usage, external calls and cache hits
+    node_metrics: Annotated[list, operator.add]
 
 
 ideator_instructions="""
@@ -346,6 +540,29 @@ Generate a search query and choose a method that:
 Be strategic about both WHAT you search for and HOW you search - think about what search method would be most valuable for your specific role in video content creation."""
 
 
+batch_search_query_instructions = """
+You are coordinating a team of ideators researching a topic for short-form video content. For EACH ideator below, generate a specific search query AND choose the most appropriate search method, exactly as that ideator would for their own persona.
+
+Research Topic: {topic}
+
+Ideators:
+{personas}
+
+Available Search Methods:
+1. TAVILY - Comprehensive web search with detailed content extraction (best for in-depth research)
+2. DUCKDUCKGO - General web search with quick results (good for broad topic exploration)
+3. REDDIT_STYLE - Focus on discussions, opinions, and community insights (great for understanding public sentiment)
+4. NEWS_FOCUSED - Recent news and current events (perfect for trending topics and breaking news)
+
+Each query and method should:
+1. Reflect that ideator's unique perspective and expertise
+2. Help them find information that aligns with their specific interests and role
+3. Could lead to creative video content ideas
+4. Take advantage of the most suitable search approach for their research goals
+
+Return exactly one query per ideator, with ideator_name set to the ideator's exact name. Make the queries distinct from each other."""
+
+
 scriptor_instructions = """
 You are tasked with creating a specialized video script writer persona. This scriptor will be responsible for combining insights from multiple ideators and creating compelling short-form video scripts.
 
@@ -364,6 +581,7 @@ The scriptor should NOT conduct research - they focus purely on script creation
 def tavily_search(query: str) -> str:
     """Search using Tavily API for comprehensive results"""
     try:
+        record_call("tavily")
         response = tavily.search(
             query=query,
             search_depth="advanced",
@@ -387,14 +605,15 @@ def tavily_search(query: str) -> str:
 def duckduckgo_search(query: str) -> str:
     """Search using DuckDuckGo API for general web results"""
     try:
-        url = "https://api.duckduckgo.com/"
+        url = duckduckgo_api_url
         params = {
             'q': query,
             'format': 'json',
             'no_html': '1',
             'skip_disambig': '1'
         }
-        response = requests.get(url, params=params)
+        record_call("duckduckgo")
+        response = http_session.get(url, params=params)
         data = response.json()
         
         results = []
@@ -418,6 +637,7 @@ def reddit_style_search(query: str) -> str:
     try:
         # Use Tavily with Reddit-focused query modification
         reddit_query = f"{query} site:reddit.com OR discussion OR opinion OR community"
+        record_call("tavily")
         response = tavily.search(
             query=reddit_query,
             search_depth="basic",
@@ -443,6 +663,7 @@ def news_focused_search(query: str) -> str:
     try:
         # Use Tavily with news-focused parameters
         news_query = f"{query} news OR latest OR recent OR breaking"
+        record_call("tavily")
         response = tavily.search(
             query=news_query,
             search_depth="basic",
@@ -464,8 +685,18 @@ def news_focused_search(query: str) -> str:
         return f"News search error: {str(e)}"
 
 
+def normalize_search_query(query: str) -> str:
+    """Normalize case, whitespace and token order so near-identical queries share a cache entry"""
+    return " ".join(sorted(query.lower().split()))
+
+
+def _is_search_error(search_results: str) -> bool:
+    """Search functions report failures as text; those must not be cached"""
+    return search_results.split(":", 1)[0].endswith("search error")
+
+
 def execute_search(query: str, method: SearchMethod) -> str:
-    """Execute search using the specified method"""
+    """Execute search using the specified method, served from the search cache when possible"""
     search_functions = {
         SearchMethod.TAVILY: tavily_search,
         SearchMethod.DUCKDUCKGO: duckduckgo_search,
@@ -474,7 +705,32 @@ def execute_search(query: str, method: SearchMethod) -> str:
     }
     
     search_func = search_functions.get(method, tavily_search)
-    return search_func(query)
+    if search_cache is None:
+        return search_func(query)
+    
+    method_name = getattr(method, "value", method)
+    key = cache_key(method_name, normalize_search_query(query))
+    max_age = search_cache_ttls.get(method, search_cache_ttls[SearchMethod.TAVILY])
+
+    def cached_search() -> str:
+        try:
+            search_results = search_cache.get(key, max_age=max_age)
+        except Exception as e:
+            # A broken cache must not cost the search: carry on uncached
+            print(f"Search cache lookup failed for '{query}', searching uncached: {e}")
+            search_results = None
+        record_cache("search", search_results is not None)
+        if search_results is None:
+            search_results = search_func(query)
+            if not _is_search_error(search_results):
+                try:
+                    search_cache.set(key, search_results)
+                except Exception as e:
+                    print(f"Could not cache search results for '{query}': {e}")
+        return search_results
+
+    # Concurrent identical queries (e.g. from parallel ideators) make a single upstream call
+    return search_single_flight.do(key, cached_search)
 
 
 def create_ideators(state: GeneratedIdeatorState):
@@ -496,17 +752,53 @@ def create_ideators(state: GeneratedIdeatorState):
     return {"ideators": ideators.ideators}
 
 
-def conduct_research(state: GeneratedIdeatorState):
-    """ Each ideator conducts web research based on their persona """
-    ideators = state['ideators']
-    topic = state['topic']
-    research_results = []
-    
-    
-    # Structured LLM for generating search queries
-    query_llm = llm.with_structured_output(SearchQuery)
-    
-    for ideator in ideators:        
+def generate_search_queries(ideators: List[Ideator], topic: str) -> Dict[str, SearchQuery]:
+    """ One structured LLM call writes a search query for every ideator, keyed by ideator name
+
+    Queries for unknown names are dropped and missing names are left out, so
+    the caller can fall back to per-ideator calls for exactly those ideators.
+    A failed call or invalid output yields an empty mapping.
+    """
+    names = [ideator.name for ideator in ideators]
+    names_by_key = {name.strip().casefold(): name for name in names}
+    if len(names_by_key) != len(names):
+        print("⚠️ Duplicate ideator names, generating search queries one by one")
+        return {}
+
+    batch_prompt = batch_search_query_instructions.format(
+        topic=topic,
+        personas="\n".join(ideator.persona for ideator in ideators)
+    )
+    try:
+        batch = llm.with_structured_output(SearchQueryBatch).invoke([
+            SystemMessage(content=batch_prompt),
+            HumanMessage(content="Generate the search queries.")
+        ])
+    except Exception as e:
+        print(f"⚠️ Batched search query generation failed, generating them one by one: {e}")
+        return {}
+    # Structured output comes back as None when the model skips the tool call
+    if not isinstance(batch, SearchQueryBatch):
+        print("⚠️ Batched search query generation returned no queries, generating them one by one")
+        return {}
+
+    queries = {}
+    for item in batch.queries:
+        name = names_by_key.get(item.ideator_name.strip().casefold())
+        if name is not None and name not in queries:
+            queries[name] = SearchQuery(query=item.query, search_method=item.search_method, reasoning=item.reasoning)
+    missing = [name for name in names if name not in queries]
+    if missing:
+        print(f"⚠️ Batched search queries missed {', '.join(missing)}, generating those one by one")
+    return queries
+
+
+def research_ideator(ideator: Ideator, topic: str, search_query: Optional[SearchQuery] = None) -> ResearchResult:
+    """ A single ideator generates a search query (unless batched), searches the web and extracts insights """
+    if search_query is None:
+        # Structured LLM for generating search queries
+        query_llm = llm.with_structured_output(SearchQuery)
+
         # Generate search query based on persona
         query_prompt = search_query_instructions.format(
             persona=ideator.persona,
@@ -517,40 +809,58 @@ def conduct_research(state: GeneratedIdeatorState):
             SystemMessage(content=query_prompt),
             HumanMessage(content="Generate your search query.")
         ])
+
+    # Conduct web search
+    search_results = execute_search(search_query.query, search_query.search_method)
+
+    # Generate insights from search results
+    insights_prompt = f"""
+    As {ideator.name} ({ideator.role}), analyze these search results and extract key insights that are most relevant to your expertise and interests for creating short-form video content about "{topic}".
+
+    Search Results:
+    {search_results}
+
+    Focus on:
+    1. Information that aligns with your specific role and perspective
+    2. Trends, stories, or angles that could make compelling video content
+    3. Unique insights that other personas might miss
+    4. Actionable content ideas or creative directions
+
+    Provide your key insights:
+    """
     
-        # Conduct web search
-        search_results = execute_search(search_query.query, search_query.search_method)
+    insights = llm.invoke([
+        SystemMessage(content=f"You are {ideator.name}, a {ideator.role}. {ideator.description}"),
+        HumanMessage(content=insights_prompt)
+    ]).content
     
-        # Generate insights from search results
-        insights_prompt = f"""
-        As {ideator.name} ({ideator.role}), analyze these search results and extract key insights that are most relevant to your expertise and interests for creating short-form video content about "{topic}".
-
-        Search Results:
-        {search_results}
+    # Create research result
+    return ResearchResult(
+        ideator=ideator,
+        search_query=search_query,
+        search_results=offload_text(search_results),
+        key_insights=insights
+    )
 
-        Focus on:
-        1. Information that aligns with your specific role and perspective
-        2. Trends, stories, or angles that could make compelling video content
-        3. Unique insights that other personas might miss
-        4. Actionable content ideas or creative directions
 
-        Provide your key insights:
-        """
-        
-        insights = llm.invoke([
-            SystemMessage(content=f"You are {ideator.name}, a {ideator.role}. {ideator.description}"),
-            HumanMessage(content=insights_prompt)
-        ]).content
-        
-        # Create research result
-        research_result = ResearchResult(
-            ideator=ideator,
-            search_query=search_query,
-            search_results=search_results,
-            key_insights=insights
-        )
-        
-        research_results.append(research_result)
+def conduct_research(state: GeneratedIdeatorState):
+    """ Each ideator conducts web research based on their persona, in parallel """
+    ideators = state['ideators']
+    topic = state['topic']
+    
+    if not ideators:
+        return {"research_results": []}
+    
+    # One LLM round-trip for all search queries instead of one per ideator
+    search_queries = generate_search_queries(ideators, topic) if batch_search_queries and len(ideators) > 1 else {}
+    
+    # Run each ideator's query -> search -> insights chain concurrently, capped to stay under rate limits.
+    # map() yields results in submission order, so research_results keeps the ideator order.
+    max_workers = max(1, min(research_max_concurrency, len(ideators)))
+    with ContextThreadPoolExecutor(max_workers=max_workers) as executor:
+        research_results = list(executor.map(
+            lambda ideator: research_ideator(ideator, topic, search_queries.get(ideator.name)), ideators
+        ))
     
     return {"research_results": research_results}
 
@@ -583,12 +893,27 @@ def create_script(state: GeneratedIdeatorState):
     
     
     # Summarize all research insights
-    research_summary = ""
-    for result in research_results:
-        research_summary += f"\n{result.ideator.name} ({result.ideator.role}):\n"
-        research_summary += f"Search Method: {result.search_query.search_method.value}\n"
-        research_summary += f"Key Insights: {result.key_insights}\n"
-        research_summary += "-" * 40 + "\n"
+    if research_context_tokens > 0:
+        # Overlapping insights are dropped and the rest ranked against the topic, so the prompt stays
+        # bounded as ideators are added
+        packed = pack_research(
+            [(f"{result.ideator.name} ({result.ideator.role}):\nSearch Method: {result.search_query.search_method.value}",
+              result.key_insights) for result in research_results],
+            topic, research_context_tokens, research_context_dedup
+        )
+        research_summary = packed.text
+        record("context_tokens_in", packed.stats["tokens_in"])
+        record("context_tokens_out", packed.stats["tokens_out"])
+        record("context_passages_dropped", packed.stats["passages"] - packed.stats["kept"])
+        print(f"📦 Research context: {packed.stats['kept']}/{packed.stats['passages']} insights, "
+              f"{packed.stats['duplicates']} duplicates, ~{packed.stats['tokens_in']} → ~{packed.stats['tokens_out']} tokens")
+    else:
+        research_summary = ""
+        for result in research_results:
+            research_summary += f"\n{result.ideator.name} ({result.ideator.role}):\n"
+            research_summary += f"Search Method: {result.search_query.search_method.value}\n"
+            research_summary += f"Key Insights: {result.key_insights}\n"
+            research_summary += "-" * 40 + "\n"
     
     # Enforce structured output
     structured_llm = llm.with_structured_output(VideoScript)
@@ -692,6 +1017,92 @@ Timestamped Lines to Analyze:
     return {"keyword_extraction": keyword_extraction}
 
 
+def _youtube_http() -> httplib2.Http:
+    """Per-thread HTTP transport for the YouTube client (httplib2.Http is not thread-safe)"""
+    http = getattr(_youtube_thread_local, "http", None)
+    if http is None:
+        http = httplib2.Http(timeout=youtube_request_timeout)
+        _youtube_thread_local.http = http
+    return http
+
+
+def search_youtube_range(timestamp_keyword: TimestampKeywords, topic: str) -> ContentSearchResult:
+    """Search YouTube for a single script time range"""
+    start = timestamp_keyword.start
+    end = timestamp_keyword.end
+    keywords = timestamp_keyword.keywords
+    
+    # Combine keywords for search
+    search_query = " ".join(keywords) + " " + topic
+    
+    # Search YouTube using the API with duration filter for videos under 10 minutes
+    search_params = dict(
+        q=search_query,
+        part='id,snippet',
+        maxResults=5,
+        type='video',
+        order='relevance',
+        videoDuration='short'  # short: less than 4 minutes
+    )
+    search_cache_key = cache_key("youtube.search.list", search_params)
+            
+    try:
+        search_response = youtube_cache.get(search_cache_key)
+        record_cache("youtube", search_response is not None)
+        if search_response is None:
+            if youtube_quota.try_spend(youtube_search_cost):
+                record_call("youtube")
+                search_response = youtube.search().list(**search_params).execute(http=_youtube_http())
+                youtube_cache.set(search_cache_key, search_response)
+            else:
+                # Daily budget nearly used up: serve a stale response if we have one, otherwise degrade
+                search_response = youtube_cache.get(search_cache_key, allow_stale=True)
+                if search_response is None:
+                    print(f"YouTube quota budget reached, using concept visuals for {start}-{end}")
+                    return ContentSearchResult(
+                        title=f"YouTube quota budget reached for {start}-{end}",
+                        start=start,
+                        end=end,
+                        keywords=keywords,
+                        search_query=search_query,
+                        links=[]
+                    )
+        
+        video_links = []
+        video_titles = []
+        
+        for search_result in search_response.get('items', []):
+            video_id = search_result['id']['videoId']
+            video_title = search_result['snippet']['title']
+            video_url = f"https://www.youtube.com/watch?v={video_id}"
+            
+            video_links.append(video_url)
+            video_titles.append(video_title)
+        
+        # Create a descriptive title
+        content_title = f"YouTube API results for {start}-{end} - Found {len(video_links)} videos"
+        
+        # Create search result
+        return ContentSearchResult(
+            title=content_title,
+            start=start,
+            end=end,
+            keywords=keywords,
+            search_query=search_query,
+            links=video_links
+        )
+        
+    except Exception as e:            # Create a fallback result even if search fails (including timeouts)
+        return ContentSearchResult(
+            title=f"YouTube API search failed for {start}-{end}",
+            start=start,
+            end=end,
+            keywords=keywords,
+            search_query=search_query,
+            links=[]
+        )
+
+
 def search_youtube_api(state: GeneratedIdeatorState):
     """Search for content using YouTube API with extracted keywords by script time ranges"""
     keyword_extraction = state['keyword_extraction']
@@ -701,67 +1112,151 @@ def search_youtube_api(state: GeneratedIdeatorState):
     if not youtube:
         return {"content_search_results": ContentSearchResults(search_results=[])}
     
-    search_results = []
+    timestamp_keywords = keyword_extraction.timestamp_keywords
     
-    # Process each timestamp separately
-    for timestamp_keyword in keyword_extraction.timestamp_keywords:
-        start = timestamp_keyword.start
-        end = timestamp_keyword.end
-        keywords = timestamp_keyword.keywords
-        
-        # Combine keywords for search
-        search_query = " ".join(keywords) + " " + topic
-                
+    if youtube_search_concurrency <= 1 or len(timestamp_keywords) <= 1:
+        # Serial mode: one range after another
+        search_results = [search_youtube_range(timestamp_keyword, topic) for timestamp_keyword in timestamp_keywords]
+    else:
+        # Concurrent mode: map() keeps results in script order, which generate_final_structure relies on
+        max_workers = min(youtube_search_concurrency, len(timestamp_keywords))
+        with ContextThreadPoolExecutor(max_workers=max_workers) as executor:
+            search_results = list(executor.map(lambda timestamp_keyword: search_youtube_range(timestamp_keyword, topic), timestamp_keywords))
+    
+    content_search_results = ContentSearchResults(search_results=search_results)    
+    return {"content_search_results": content_search_results}
+
+
+def _is_retryable_gemini_error(error: Exception) -> bool:
+    """Retry Gemini calls only on rate limiting (429) and server-side (5xx) errors"""
+    code = getattr(error, "code", None)
+    return isinstance(code, int) and (code == 429 or code >= 500)
+
+
+def analyze_youtube_video(search_result: ContentSearchResult, topic: str, stage_deadline: float) -> VideoUnderstandingResult:
+    """Analyze the first video of a search result with Gemini, rate limited and retried within its deadline"""
+    start = search_result.start
+    end = search_result.end
+    keywords = search_result.keywords
+    youtube_url = search_result.links[0]
+    
+    # Create analysis query based on keywords and topic
+    keywords_text = ", ".join(keywords)
+
+    analysis_query = f"Please analyze this video for segments related to '{keywords_text}' and '{topic}'. Identify all moments where these keywords are mentioned, providing precise start and end times in MM:SS format, along with a brief description of the content within that time range."
+    if not gemini_structured_output:
+        analysis_query += " Return JSON with an array of objects: {start, end, content}."
+    
+    # Serve repeat analyses of the same clip from the persistent cache
+    analysis_cache_key = cache_key(youtube_url, analysis_query, gemini_video_model)
+    if gemini_cache is not None:
+        lookup_start = time.time()
         try:
-            # Search YouTube using the API with duration filter for videos under 10 minutes
-            search_response = youtube.search().list(
-                q=search_query,
-                part='id,snippet',
-                maxResults=5,
-                type='video',
-                order='relevance',
-                videoDuration='short'  # short: less than 4 minutes
-            ).execute()
-            
-            video_links = []
-            video_titles = []
-            
-            for search_result in search_response.get('items', []):
-                video_id = search_result['id']['videoId']
-                video_title = search_result['snippet']['title']
-                video_url = f"https://www.youtube.com/watch?v={video_id}"
-                
-                video_links.append(video_url)
-                video_titles.append(video_title)
-            
-            # Create a descriptive title
-            content_title = f"YouTube API results for {start}-{end} - Found {len(video_links)} videos"
-            
-            # Create search result
-            search_result = ContentSearchResult(
-                title=content_title,
+            cached = gemini_cache.get(analysis_cache_key)
+            cached_result = None if cached is None else VideoUnderstandingResult(
                 start=start,
                 end=end,
                 keywords=keywords,
-                search_query=search_query,
-                links=video_links
-            )
-            
-            search_results.append(search_result)
-            
-        except Exception as e:            # Create a fallback result even if search fails
-            search_result = ContentSearchResult(
-                title=f"YouTube API search failed for {start}-{end}",
-                start=start,
-                end=end,
-                keywords=keywords,
-                search_query=search_query,
-                links=[]
+                youtube_url=youtube_url,
+                analysis_query=analysis_query,
+                analysis_result=offload_text(cached['analysis_result']),
+                processing_time=time.time() - lookup_start,
+                cache_hit=True,
+                cached_processing_time=cached['processing_time']
             )
-            search_results.append(search_result)
+        except Exception as e:
+            # A broken cache, a malformed entry or a failed blob write must not cost the analysis: carry on uncached
+            print(f"Gemini cache lookup failed for {youtube_url}, analyzing uncached: {e}")
+            cached_result = None
+        record_cache("gemini", cached_result is not None)
+        if cached_result is not None:
+            return cached_result
     
-    content_search_results = ContentSearchResults(search_results=search_results)    
-    return {"content_search_results": content_search_results}
+    # Each call gets its own deadline, never later than the stage budget
+    deadline = min(time.monotonic() + gemini_call_timeout, stage_deadline)
+    timing = {}
+
+    # Imported here with the Gemini client, see build_gemini_client
+    from google.genai import types
+
+    def generate():
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise DeadlineExceeded(f"Gemini call deadline exceeded for {youtube_url}")
+        
+        # Time only the attempt itself, not queueing, rate limiting or backoff
+        start_time = time.time()
+        
+        # Use Gemini's understanding API
+        record_call("gemini")
+        response = gemini_client.models.generate_content(
+            model=gemini_video_model,
+            contents=types.Content(
+                parts=[
+                    types.Part(
+                        file_data=types.FileData(file_uri=youtube_url),
+                    ),
+                    types.Part(text=analysis_query)
+                ]
+            ),
+            config=types.GenerateContentConfig(
+                http_options=types.HttpOptions(timeout=int(remaining * 1000)),
+                **({
+                    "response_mime_type": "application/json",
+                    "response_schema": VideoAnalysisLLMOutput
+                } if gemini_structured_output else {})
+            )
+        )
+        
+        timing['processing_time'] = time.time() - start_time
+        usage = getattr(response, "usage_metadata", None)
+        if usage is not None:
+            record("gemini_input_tokens", usage.prompt_token_count or 0)
+            record("gemini_output_tokens", usage.candidates_token_count or 0)
+        return response
+
+    try:
+        response = call_with_retry(
+            generate,
+            _is_retryable_gemini_error,
+            deadline=deadline,
+            max_retries=gemini_max_retries,
+            rate_limiter=gemini_rate_limiter
+        )
+
+        # Keep downstream format: JSON text that parse_video_analysis validates ({"segments": [...]} with structured output)
+        analysis_result = response.text
+        
+        if gemini_cache is not None and analysis_result:
+            try:
+                gemini_cache.set(analysis_cache_key, {
+                    "analysis_result": analysis_result,
+                    "processing_time": timing['processing_time']
+                })
+            except Exception as e:
+                print(f"Could not cache Gemini analysis for {youtube_url}: {e}")
+                        
+        # Create understanding result
+        return VideoUnderstandingResult(
+            start=start,
+            end=end,
+            keywords=keywords,
+            youtube_url=youtube_url,
+            analysis_query=analysis_query,
+            analysis_result=offload_text(analysis_result),
+            processing_time=timing['processing_time']
+        )
+        
+    except Exception as e:                # Create a fallback result even if analysis fails
+        return VideoUnderstandingResult(
+            start=start,
+            end=end,
+            keywords=keywords,
+            youtube_url=youtube_url,
+            analysis_query=analysis_query,
+            analysis_result=f"Analysis failed: {str(e)}",
+            processing_time=0.0
+        )
 
 
 def understand_youtube_videos(state: GeneratedIdeatorState):
@@ -770,73 +1265,37 @@ def understand_youtube_videos(state: GeneratedIdeatorState):
     topic = state['topic']
     
     
-    understanding_results = []
-    
     # Process all search results, analyzing only the first video link of each
+    to_analyze = []
     for search_result in content_search_results.search_results:
-        start = search_result.start
-        end = search_result.end
-        keywords = search_result.keywords
-        
-        # Get the first YouTube URL for analysis
-        youtube_url = search_result.links[0] if search_result.links else None
-        
-        if not youtube_url:
-            print(f"No YouTube URL found for script range {start}-{end}, skipping...")
+        if not search_result.links:
+            print(f"No YouTube URL found for script range {search_result.start}-{search_result.end}, skipping...")
             continue
-        
-        try:
-            import time
-            start_time = time.time()
-            
-            # Create analysis query based on keywords and topic
-            keywords_text = ", ".join(keywords)
-
-            analysis_query = f"Please analyze this video for segments related to '{keywords_text}' and '{topic}'. Identify all moments where these keywords are mentioned, providing precise start and end times in MM:SS format, along with a brief description of the content within that time range. Return JSON with an array of objects: {{start, end, content}}."
-            
-            # Use Gemini's understanding API
-            response = gemini_client.models.generate_content(
-                model='models/gemini-2.5-flash',
-                contents=types.Content(
-                    parts=[
-                        types.Part(
-                            file_data=types.FileData(file_uri=youtube_url),
-                        ),
-                        types.Part(text=analysis_query)
-                    ]
-                )
-            )
-
-            end_time = time.time()
-            processing_time = end_time - start_time
-
-            # Keep downstream format: JSON text that parse_video_analysis can consume
-            analysis_result = response.text
-                            
-            # Create understanding result
-            understanding_result = VideoUnderstandingResult(
-                start=start,
-                end=end,
-                keywords=keywords,
-                youtube_url=youtube_url,
-                analysis_query=analysis_query,
-                analysis_result=analysis_result,
-                processing_time=processing_time
-            )
-            
-            understanding_results.append(understanding_result)
-            
-        except Exception as e:                # Create a fallback result even if analysis fails
-            understanding_result = VideoUnderstandingResult(
-                start=start,
-                end=end,
-                keywords=keywords,
-                youtube_url=youtube_url or "No URL available",
-                analysis_query=analysis_query if 'analysis_query' in locals() else "Query not generated",
-                analysis_result=f"Analysis failed: {str(e)}",
-                processing_time=0.0
-            )
-            understanding_results.append(understanding_result)
+        to_analyze.append(search_result)
+    
+    if not to_analyze:
+        return {"video_understanding_results": VideoUnderstandingResults(understanding_results=[])}
+    
+    # Analyze videos in parallel; the whole stage must finish within its budget
+    stage_deadline = time.monotonic() + gemini_stage_budget
+    executor = ContextThreadPoolExecutor(max_workers=max(1, min(gemini_max_concurrency, len(to_analyze))))
+    futures = [executor.submit(analyze_youtube_video, search_result, topic, stage_deadline) for search_result in to_analyze]
+    done, _ = wait(futures, timeout=gemini_stage_budget)
+    
+    # Don't block the request on stragglers: they are bounded by their own deadlines
+    executor.shutdown(wait=False, cancel_futures=True)
+    
+    understanding_results = []
+    for search_result, future in zip(to_analyze, futures):
+        if future in done:
+            understanding_results.append(future.result())
+        else:
+            # No result means generate_final_structure falls back to a concept visual for this range
+            print(f"Video analysis budget exceeded for script range {search_result.start}-{search_result.end}, using concept visual...")
+    
+    if gemini_cache is not None:
+        cache_hits = sum(1 for result in understanding_results if result.cache_hit)
+        print(f"Video analysis cache: {cache_hits} hits, {len(understanding_results) - cache_hits} misses")
     
     video_understanding_results = VideoUnderstandingResults(understanding_results=understanding_results)    
     return {"video_understanding_results": video_understanding_results}
@@ -849,111 +1308,43 @@ def parse_video_analysis(state: GeneratedIdeatorState):
     
     
     for understanding_result in video_understanding_results.understanding_results:
+        record("video_analyses")
         try:
-            # Extract JSON from markdown code blocks if present
-            analysis_text = understanding_result.analysis_result.strip()
-            
-            # Check if the response is wrapped in markdown code blocks
-            if analysis_text.startswith('```json') or analysis_text.startswith('```'):
-                # Extract content between ```json and ```
-                lines = analysis_text.split('\n')
-                json_lines = []
-                in_json_block = False
-                
-                for line in lines:
-                    if line.strip().startswith('```json') or line.strip() == '```':
-                        in_json_block = True
-                        continue
-                    elif line.strip() == '```' and in_json_block:
-                        break
-                    elif in_json_block:
-                        json_lines.append(line)
-                
-                json_text = '\n'.join(json_lines)
-            else:
-                json_text = analysis_text
-            
-            # Parse the JSON analysis result
-            import json
-            analysis_data = json.loads(json_text)
-            
-            # Extract video segments
+            analysis_text = load_text(understanding_result.analysis_result)
+            try:
+                # Structured output arrives already in the VideoAnalysisLLMOutput schema
+                segments = [segment.model_dump() for segment in VideoAnalysisLLMOutput.model_validate_json(analysis_text).segments]
+            except ValidationError:
+                # Free text (structured output off, analyses cached before it, failed calls):
+                # fenced, prose-wrapped or truncated JSON
+                segments = find_segments(extract_json(analysis_text))
+                if segments:
+                    record("video_analyses_repaired")
+            if not segments:
+                # No usable segment (no JSON, an empty list, nothing segment-shaped): the video-analysis call
+                # was spent for nothing and the range falls back to a concept visual
+                record("video_analyses_discarded")
+
+            # Keep only the top 3 most related segments based on keyword matches, in start time order
+            video_segments = [
+                VideoSegment(start=segment['start'], end=segment['end'], content=segment['content'])
+                for segment in rank_segments(segments, understanding_result.keywords, k=3)
+            ]
+        except Exception as e:
+            print(f"Could not parse video analysis for {understanding_result.youtube_url}: {e}")
+            record("video_analyses_discarded")
             video_segments = []
-            if isinstance(analysis_data, list):
-                for segment_data in analysis_data:
-                    if all(k in segment_data for k in ('start', 'end', 'content')):
-                        video_segment = VideoSegment(
-                            start=segment_data['start'],
-                            end=segment_data['end'],
-                            content=segment_data['content']
-                        )
-                        video_segments.append(video_segment)
-
-            # Keep only the top 3 most related segments based on keyword matches
-            if video_segments:
-                keywords_lower = [k.lower() for k in understanding_result.keywords]
-
-                def segment_score(segment: VideoSegment) -> int:
-                    content_lower = segment.content.lower()
-                    return sum(content_lower.count(keyword) for keyword in keywords_lower)
-
-                # Stable sort by score descending and take top 3
-                video_segments = sorted(
-                    video_segments,
-                    key=segment_score,
-                    reverse=True
-                )[:3]
-
-                # Then sort the retained segments by start time ascending (MM:SS or HH:MM:SS)
-                def to_seconds(time_str: str) -> int:
-                    try:
-                        parts = [int(p) for p in time_str.split(":")]
-                        if len(parts) == 2:
-                            minutes, seconds = parts
-                            return minutes * 60 + seconds
-                        if len(parts) == 3:
-                            hours, minutes, seconds = parts
-                            return hours * 3600 + minutes * 60 + seconds
-                        return 0
-                    except Exception:
-                        return 0
-
-                video_segments = sorted(video_segments, key=lambda seg: to_seconds(seg.start))
-            
-            # Create parsed analysis
-            parsed_analysis = ParsedVideoAnalysis(
-                script_start=understanding_result.start,
-                script_end=understanding_result.end,
-                keywords=understanding_result.keywords,
-                youtube_url=understanding_result.youtube_url,
-                video_segments=video_segments,
-                processing_time=understanding_result.processing_time
-            )
-            
-            parsed_results.append(parsed_analysis)
-                        
-        except json.JSONDecodeError as e:
-            # Create a fallback with no segments
-            parsed_analysis = ParsedVideoAnalysis(
-                script_start=understanding_result.start,
-                script_end=understanding_result.end,
-                keywords=understanding_result.keywords,
-                youtube_url=understanding_result.youtube_url,
-                video_segments=[],
-                processing_time=understanding_result.processing_time
-            )
-            parsed_results.append(parsed_analysis)
-        
-        except Exception as e:            # Create a fallback with no segments
-            parsed_analysis = ParsedVideoAnalysis(
-                script_start=understanding_result.start,
-                script_end=understanding_result.end,
-                keywords=understanding_result.keywords,
-                youtube_url=understanding_result.youtube_url,
-                video_segments=[],
-                processing_time=understanding_result.processing_time
-            )
-            parsed_results.append(parsed_analysis)
+
+        # Create parsed analysis (with no segments if nothing could be parsed)
+        parsed_analysis = ParsedVideoAnalysis(
+            script_start=understanding_result.start,
+            script_end=understanding_result.end,
+            keywords=understanding_result.keywords,
+            youtube_url=understanding_result.youtube_url,
+            video_segments=video_segments,
+            processing_time=understanding_result.processing_time
+        )
+        parsed_results.append(parsed_analysis)
     
     parsed_video_analysis = ParsedVideoAnalysisResults(parsed_results=parsed_results)
         
@@ -1044,21 +1435,23 @@ def generate_final_structure(state: GeneratedIdeatorState):
 workflow = StateGraph(GeneratedIdeatorState)
 
 # Add nodes
-workflow.add_node("create_ideators", create_ideators)
-workflow.add_node("conduct_research", conduct_research)
-workflow.add_node("create_scriptor", create_scriptor)
-workflow.add_node("create_script", create_script)
-workflow.add_node("extract_keywords", extract_keywords)
-workflow.add_node("search_youtube_api", search_youtube_api)
-workflow.add_node("understand_youtube_videos", understand_youtube_videos)
-workflow.add_node("parse_video_analysis", parse_video_analysis)
-workflow.add_node("generate_final_structure", generate_final_structure)
-
-# Set entry point and edges
-workflow.set_entry_point("create_ideators")
+workflow.add_node("create_ideators", instrument_node("create_ideators", create_ideators))
+workflow.add_node("conduct_research", instrument_node("conduct_research", conduct_research))
+workflow.add_node("create_scriptor", instrument_node("create_scriptor", create_scriptor))
+workflow.add_node("create_script", instrument_node("create_script", create_script))
+workflow.add_node("extract_keywords", instrument_node("extract_keywords", extract_keywords))
+workflow.add_node("search_youtube_api", instrument_node("search_youtube_api", search_youtube_api))
+workflow.add_node("understand_youtube_videos", instrument_node("understand_youtube_videos", understand_youtube_videos))
+workflow.add_node("parse_video_analysis", instrument_node("parse_video_analysis", parse_video_analysis))
+workflow.add_node("generate_final_structure", instrument_node("generate_final_structure", generate_final_structure))
+
+# Set entry points and edges
+# create_scriptor only needs the topic, so it runs in the same superstep as create_ideators/conduct_research;
+# create_script waits for both branches before continuing down the chain
+workflow.add_edge(START, "create_ideators")
+workflow.add_edge(START, "create_scriptor")
 workflow.add_edge("create_ideators", "conduct_research")
-workflow.add_edge("conduct_research", "create_scriptor")
-workflow.add_edge("create_scriptor", "create_script")
+workflow.add_edge(["conduct_research", "create_scriptor"], "create_script")
 workflow.add_edge("create_script", "extract_keywords")
 workflow.add_edge("extract_keywords", "search_youtube_api")
 workflow.add_edge("search_youtube_api", "understand_youtube_videos")
@@ -1067,6 +1460,8 @@ workflow.add_edge("parse_video_analysis", "generate_final_structure")
 workflow.add_edge("generate_final_structure", END)
 
 # Compile
+# No checkpointer here: langgraph dev persists threads itself and rejects graphs that bring their own.
+# Embedded runs compile `workflow` with a SQLite checkpointer instead (see backend/graph_client.py).
 graph = workflow.compile()
 
 # Reference Input: initial_state = {"topic": "lebron james and the lakers", "max_ideators": 3}
\ No newline at end of file
@@ -0,0 +1,167 @@
+"""
+Research context packing for create_script: splits each ideator's insights
+into passages, drops near-duplicates across ideators, ranks passages by BM25
+relevance to the topic and packs the best of them into a token budget
+"""
+
+import math
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Sequence, Tuple
+
+WORD = re.compile(r"[a-z0-9]+")
+BULLET = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s+")
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have he his how in into is it its of on or so than that the their "
+    "them they this to was were what when which who will with you your i my me we our".split()
+)
+
+# BM25 parameters (standard Okapi defaults)
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+
+def approximate_tokens(text: str) -> int:
+    """~4 characters per token, close enough for budgeting English prompts"""
+    return max(1, len(text) // 4)
+
+
+def token_cost(text: str) -> int:
+    """approximate_tokens rounded up, so the costs of pieces add up to at least the cost of the whole"""
+    return -(-len(text) // 4)
+
+
+def terms(text: str) -> List[str]:
+    """Lowercased content words with a naive plural strip, for ranking and duplicate detection"""
+    words = [word for word in WORD.findall(text.lower()) if word not in STOPWORDS]
+    return [word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word for word in words]
+
+
+def split_passages(text: str) -> List[str]:
+    """Paragraphs and list items of an insights blob, without short lead-in lines ("Here are my insights:")"""
+    passages = []
+    for block in re.split(r"\n\s*\n", text.strip()):
+        lines = [line.strip() for line in block.splitlines() if line.strip()]
+        current: List[str] = []
+        for line in lines:
+            if BULLET.match(line) and current:
+                passages.append(" ".join(current))
+                current = []
+            current.append(line)
+        if current:
+            passages.append(" ".join(current))
+    return [passage for passage in passages if not (passage.endswith(":") and len(passage.split()) < 15)]
+
+
+@dataclass
+class Passage:
+    section: int
+    position: int
+    text: str
+    terms: List[str]
+    tokens: int
+    score: float = 0.0
+
+
+@dataclass
+class PackedContext:
+    text: str
+    stats: Dict[str, int] = field(default_factory=dict)
+
+
+def bm25_scores(passages: Sequence[Passage], query_terms: Sequence[str]) -> List[float]:
+    """Okapi BM25 of every passage against the query, with the passages themselves as the corpus"""
+    if not passages:
+        return []
+    average_length = sum(len(passage.terms) for passage in passages) / len(passages) or 1.0
+    document_frequency: Dict[str, int] = {}
+    for passage in passages:
+        for term in set(passage.terms):
+            document_frequency[term] = document_frequency.get(term, 0) + 1
+    scores = []
+    for passage in passages:
+        counts: Dict[str, int] = {}
+        for term in passage.terms:
+            counts[term] = counts.get(term, 0) + 1
+        score = 0.0
+        for term in set(query_terms):
+            frequency = counts.get(term, 0)
+            if not frequency:
+                continue
+            idf = math.log(1 + (len(passages) - document_frequency[term] + 0.5) / (document_frequency[term] + 0.5))
+            score += idf * frequency * (BM25_K1 + 1) / (
+                frequency + BM25_K1 * (1 - BM25_B + BM25_B * len(passage.terms) / average_length)
+            )
+        scores.append(score)
+    return scores
+
+
+def jaccard(left: set, right: set) -> float:
+    if not left or not right:
+        return 0.0
+    return len(left & right) / len(left | right)
+
+
+def section_overhead(header: str) -> int:
+    """Tokens a section costs before its first passage (header, label and separator)"""
+    return token_cost(f"\n{header}\nKey Insights:\n" + "-" * 40 + "\n")
+
+
+def pack_research(sections: Sequence[Tuple[str, str]], query: str, token_budget: int,
+                  duplicate_threshold: float = 0.5) -> PackedContext:
+    """Pack (header, insights) sections into at most `token_budget` tokens of ranked, de-duplicated passages
+
+    Every section first gets its best passage (while the budget allows), so no
+    ideator with something new to say disappears; the remaining budget goes to
+    the highest scoring passages overall. Kept passages stay in their original
+    order under their section's header, and sections left with nothing but
+    repeats are dropped.
+    """
+    passages = []
+    for section_index, (_, insights) in enumerate(sections):
+        for position, text in enumerate(split_passages(insights)):
+            passages.append(Passage(section_index, position, text, terms(text), token_cost(text + "\n")))
+    for passage, score in zip(passages, bm25_scores(passages, terms(query))):
+        # Ideators lead with their main point: earlier passages win ties
+        passage.score = score + 1.0 / (2 + passage.position)
+
+    ranked = sorted(passages, key=lambda passage: passage.score, reverse=True)
+    best_per_section = {}
+    for passage in ranked:
+        best_per_section.setdefault(passage.section, passage)
+    candidates = list(best_per_section.values()) + [passage for passage in ranked if passage not in best_per_section.values()]
+
+    selected: List[Passage] = []
+    selected_terms: List[set] = []
+    opened_sections = set()
+    used_tokens = 0
+    duplicates = 0
+    for passage in candidates:
+        passage_terms = set(passage.terms)
+        if any(jaccard(passage_terms, other) >= duplicate_threshold for other in selected_terms):
+            duplicates += 1
+            continue
+        cost = passage.tokens + (0 if passage.section in opened_sections else section_overhead(sections[passage.section][0]))
+        if used_tokens + cost > token_budget:
+            continue
+        selected.append(passage)
+        selected_terms.append(passage_terms)
+        opened_sections.add(passage.section)
+        used_tokens += cost
+
+    lines = []
+    for section_index, (header, _) in enumerate(sections):
+        kept = sorted((passage for passage in selected if passage.section == section_index), key=lambda passage: passage.position)
+        if not kept:
+            continue
+        lines.append(f"\n{header}\nKey Insights:")
+        lines.extend(passage.text for passage in kept)
+        lines.append("-" * 40)
+    text = "\n".join(lines) + "\n" if lines else ""
+    return PackedContext(text, {
+        "passages": len(passages),
+        "kept": len(selected),
+        "duplicates": duplicates,
+        "tokens_in": sum(approximate_tokens(header) + approximate_tokens(insights) for header, insights in sections),
+        "tokens_out": approximate_tokens(text) if text else 0,
+    })
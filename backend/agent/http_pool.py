@@ -0,0 +1,146 @@
+"""
+Shared keep-alive HTTP session for the outbound search calls (Tavily,
+DuckDuckGo): pooled connections per host, connect/read timeouts and a retry
+policy from the environment, with per-node counters for /metrics
+"""
+
+import os
+import threading
+from typing import Dict
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import TimeoutError as Urllib3TimeoutError
+from urllib3.util.retry import Retry
+
+from instrumentation import record
+
+# Hosts with a pool of their own, and kept-alive connections per host (a hard limit when HTTP_POOL_BLOCK is true)
+HTTP_POOL_HOSTS = int(os.getenv("HTTP_POOL_HOSTS", "8"))
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "16"))
+HTTP_POOL_BLOCK = os.getenv("HTTP_POOL_BLOCK", "true").lower() == "true"
+
+# Seconds; caps for callers that pass their own (Tavily always sends 60)
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "30"))
+
+# Retries on connection errors and 429/5xx responses, with exponential backoff and Retry-After honoured
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "2"))
+HTTP_RETRY_BACKOFF = float(os.getenv("HTTP_RETRY_BACKOFF", "0.5"))
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class CountingRetry(Retry):
+    """Retry policy that counts timeouts and retries against the running node
+
+    Every failed attempt passes through here, including timeouts that
+    requests later reports as ConnectionError once retries are exhausted.
+    """
+
+    def increment(self, *args, error=None, **kwargs):
+        if isinstance(error, Urllib3TimeoutError):
+            record("http_timeouts")
+        retry = super().increment(*args, error=error, **kwargs)  # Raises instead once retries are exhausted
+        record("http_retries")
+        return retry
+
+
+class CountingHTTPConnectionPool(HTTPConnectionPool):
+    def _new_conn(self):
+        record("http_connections_opened")
+        return super()._new_conn()
+
+
+class CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    def _new_conn(self):
+        record("http_connections_opened")
+        return super()._new_conn()
+
+
+class PooledSession(requests.Session):
+    """requests.Session with default timeouts, retries and connection-reuse accounting"""
+
+    def __init__(self, pool_hosts: int = HTTP_POOL_HOSTS, pool_maxsize: int = HTTP_POOL_MAXSIZE,
+                 pool_block: bool = HTTP_POOL_BLOCK, connect_timeout: float = HTTP_CONNECT_TIMEOUT,
+                 read_timeout: float = HTTP_READ_TIMEOUT, max_retries: int = HTTP_MAX_RETRIES,
+                 retry_backoff: float = HTTP_RETRY_BACKOFF):
+        super().__init__()
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        retry = CountingRetry(
+            total=max_retries,
+            backoff_factor=retry_backoff,
+            status_forcelist=RETRY_STATUSES,
+            # Read timeouts and 429/5xx responses are retried for GET only: every Tavily search POST that reaches
+            # the server is billed. Connect errors are retried for any method, as nothing was sent yet
+            allowed_methods=frozenset({"GET"}),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        self.adapter = HTTPAdapter(pool_connections=pool_hosts, pool_maxsize=pool_maxsize, max_retries=retry, pool_block=pool_block)
+        self.adapter.poolmanager.pool_classes_by_scheme = {
+            "http": CountingHTTPConnectionPool,
+            "https": CountingHTTPSConnectionPool,
+        }
+        self.mount("http://", self.adapter)
+        self.mount("https://", self.adapter)
+        self._stats_lock = threading.Lock()
+        self.requests_sent = 0
+
+    def request(self, method, url, **kwargs):
+        kwargs["timeout"] = self.clamp_timeout(kwargs.get("timeout"))
+        self.count_request()
+        return super().request(method, url, **kwargs)
+
+    def clamp_timeout(self, timeout):
+        """The (connect, read) timeout for a request, capping a single number passed by the caller"""
+        if timeout is None:
+            return self.connect_timeout, self.read_timeout
+        if isinstance(timeout, (int, float)):
+            return min(self.connect_timeout, timeout), min(self.read_timeout, timeout)
+        return timeout
+
+    def count_request(self) -> None:
+        record("http_requests")
+        with self._stats_lock:
+            self.requests_sent += 1
+
+    def scoped(self) -> "ScopedSession":
+        """A session with headers and cookies of its own that sends through this session's pool"""
+        return ScopedSession(self)
+
+    def pool_stats(self) -> Dict[str, int]:
+        """Live pool gauges for this process"""
+        host_pools = self.adapter.poolmanager.pools
+        pools = [pool for pool in (host_pools.get(key) for key in host_pools.keys()) if pool is not None]
+        return {
+            "hosts": len(pools),
+            "connections_opened": sum(pool.num_connections for pool in pools),
+            # Pool queues are pre-filled with None placeholders; only real connections count
+            "idle_connections": sum(1 for pool in pools if pool.pool for conn in list(pool.pool.queue) if conn is not None),
+            "requests": self.requests_sent,
+        }
+
+
+class ScopedSession(requests.Session):
+    """Session with its own headers and cookies sharing a PooledSession's connections, timeouts, retries and counters
+
+    For clients that configure the session they are handed: TavilyClient sets
+    its API key header on it, which must not be sent to other hosts.
+    """
+
+    def __init__(self, pool: PooledSession):
+        super().__init__()
+        self.pool = pool
+        self.mount("http://", pool.adapter)
+        self.mount("https://", pool.adapter)
+
+    def request(self, method, url, **kwargs):
+        kwargs["timeout"] = self.pool.clamp_timeout(kwargs.get("timeout"))
+        self.pool.count_request()
+        return super().request(method, url, **kwargs)
+
+    def close(self):
+        # The connection pool belongs to the PooledSession
+        pass
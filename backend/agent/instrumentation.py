@@ -0,0 +1,78 @@
+"""
+Per-node instrumentation: wall time, LLM token usage, external API calls and
+cache hits/misses, reported in each node's state update under "node_metrics"
+so the API wrappers can aggregate them in proxy and embedded mode alike
+"""
+
+import contextvars
+import functools
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+# Counters of the node currently running; ContextThreadPoolExecutor copies the context into worker threads
+_node_counters: contextvars.ContextVar[Optional["NodeCounters"]] = contextvars.ContextVar("node_counters", default=None)
+
+
+class NodeCounters:
+    """Thread-safe counters for one node execution"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.values: Dict[str, float] = {}
+
+    def add(self, name: str, amount: float = 1) -> None:
+        with self._lock:
+            self.values[name] = self.values.get(name, 0) + amount
+
+
+def record(name: str, amount: float = 1) -> None:
+    """Add to a counter of the running node; a no-op outside instrumented nodes"""
+    counters = _node_counters.get()
+    if counters is not None:
+        counters.add(name, amount)
+
+
+def record_call(service: str) -> None:
+    """Count one outbound request to an external service (tavily, duckduckgo, youtube, gemini)"""
+    record(f"external_calls.{service}")
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    """Count a cache lookup as a hit or a miss"""
+    record(f"cache_{'hits' if hit else 'misses'}.{cache}")
+
+
+def instrument_node(name: str, func: Callable[[Any], Dict[str, Any]]) -> Callable[[Any], Dict[str, Any]]:
+    """Wrap a node so its update carries {"node", "seconds", "counters"} under "node_metrics" """
+    @functools.wraps(func)
+    def node(state):
+        counters = NodeCounters()
+        token = _node_counters.set(counters)
+        start_time = time.perf_counter()
+        try:
+            update = func(state)
+        finally:
+            _node_counters.reset(token)
+        node_metrics = {
+            "node": name,
+            "seconds": round(time.perf_counter() - start_time, 4),
+            "counters": dict(counters.values),
+        }
+        return {**(update or {}), "node_metrics": [node_metrics]}
+    return node
+
+
+class TokenUsageCallback(BaseCallbackHandler):
+    """Counts LLM calls and input/output tokens from the usage metadata of every chat model response"""
+
+    def on_llm_end(self, response, **kwargs) -> None:
+        record("llm_calls")
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    record("llm_input_tokens", usage.get("input_tokens", 0))
+                    record("llm_output_tokens", usage.get("output_tokens", 0))
@@ -0,0 +1,165 @@
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, List, Optional, Sequence, Type
+
+from langchain_core.messages import AIMessage, BaseMessage
+from pydantic import BaseModel, ValidationError
+
+from cache import SQLiteCache, cache_key
+from instrumentation import record_cache
+
+
+def serialize_messages(messages: Sequence[BaseMessage]) -> str:
+    """Stable text form of a prompt, used both as the exact-match key and as the embedding input"""
+    return "\n\n".join(f"{message.type}: {message.content}" for message in messages)
+
+
+def _normalize(vector: List[float]) -> List[float]:
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return [x / norm for x in vector]
+
+
+class SemanticIndex:
+    """Local embedding index for near-duplicate prompts (cosine similarity over normalized vectors)"""
+
+    def __init__(self, path: str, embeddings, threshold: float = 0.97, max_entries: int = 2000):
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, namespace TEXT NOT NULL, vector TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_namespace ON embeddings (namespace)")
+
+    def embed(self, text: str) -> List[float]:
+        return _normalize(self.embeddings.embed_query(text))
+
+    def nearest(self, namespace: str, vector: List[float]) -> Optional[str]:
+        """Key of the most similar entry in the namespace if it clears the threshold"""
+        with self._lock:
+            rows = self._conn.execute("SELECT key, vector FROM embeddings WHERE namespace = ?", (namespace,)).fetchall()
+        best_key, best_score = None, self.threshold
+        for key, stored in rows:
+            score = sum(a * b for a, b in zip(vector, json.loads(stored)))
+            if score >= best_score:
+                best_key, best_score = key, score
+        return best_key
+
+    def add(self, namespace: str, key: str, vector: List[float]) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO embeddings (key, namespace, vector, created_at) VALUES (?, ?, ?, ?)",
+                (key, namespace, json.dumps(vector), time.time()),
+            )
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE key IN ("
+                "SELECT key FROM embeddings ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+
+class CachedLLM:
+    """Caching wrapper around a chat model: exact-match tier plus optional embedding-similarity tier
+
+    Supports the two call shapes the nodes use, `invoke(messages)` and
+    `with_structured_output(schema).invoke(messages)`. Cached structured outputs
+    are re-validated against the schema; values that no longer validate are misses.
+    """
+
+    def __init__(self, llm, cache: SQLiteCache, semantic: Optional[SemanticIndex] = None):
+        self.llm = llm
+        self.cache = cache
+        self.semantic = semantic
+        self.semantic_hits = 0
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.llm, name)
+
+    def with_structured_output(self, schema: Type[BaseModel], **kwargs) -> "CachedStructuredLLM":
+        return CachedStructuredLLM(self, schema, self.llm.with_structured_output(schema, **kwargs))
+
+    def invoke(self, messages: Sequence[BaseMessage], config=None, **kwargs) -> AIMessage:
+        content = self._cached_call(
+            "text",
+            messages,
+            lambda: self.llm.invoke(messages, config=config, **kwargs).content,
+            lambda value: value if isinstance(value, (str, list)) else None,
+        )
+        return AIMessage(content=content)
+
+    def _cached_call(self, namespace: str, messages: Sequence[BaseMessage], call, load):
+        prompt = serialize_messages(messages)
+        namespace = f"{getattr(self.llm, 'model', '')}:{namespace}"
+        key = cache_key(namespace, prompt)
+
+        value = self._load(key, load)
+        if value is not None:
+            record_cache("llm", True)
+            return value
+
+        vector = None
+        if self.semantic is not None:
+            try:
+                vector = self.semantic.embed(prompt)
+                similar_key = self.semantic.nearest(namespace, vector)
+            except Exception as e:
+                # A failed embeddings call or index lookup must not cost the LLM call: carry on uncached
+                print(f"LLM semantic cache lookup failed, calling the LLM uncached: {e}")
+                vector, similar_key = None, None
+            if similar_key is not None:
+                value = self._load(similar_key, load)
+                if value is not None:
+                    self.semantic_hits += 1
+                    record_cache("llm", True)
+                    return value
+
+        record_cache("llm", False)
+        value = call()
+        try:
+            self.cache.set(key, value.model_dump(mode="json") if isinstance(value, BaseModel) else value)
+            if vector is not None:
+                self.semantic.add(namespace, key, vector)
+        except Exception as e:
+            print(f"Could not cache LLM response: {e}")
+        return value
+
+    def _load(self, key: str, load):
+        try:
+            cached = self.cache.get(key)
+        except Exception as e:
+            # e.g. "database is locked" while another process shares the cache directory
+            print(f"LLM cache lookup failed, calling the LLM uncached: {e}")
+            return None
+        if cached is None:
+            return None
+        try:
+            return load(cached)
+        except ValidationError:
+            return None
+
+
+class CachedStructuredLLM:
+    """Structured-output runnable returned by CachedLLM.with_structured_output"""
+
+    def __init__(self, parent: CachedLLM, schema: Type[BaseModel], structured_llm):
+        self.parent = parent
+        self.schema = schema
+        self.structured_llm = structured_llm
+
+    def invoke(self, messages: Sequence[BaseMessage], config=None, **kwargs) -> BaseModel:
+        schema_id = json.dumps(self.schema.model_json_schema(), sort_keys=True)
+        return self.parent._cached_call(
+            f"{self.schema.__name__}:{cache_key(schema_id)}",
+            messages,
+            lambda: self.structured_llm.invoke(messages, config=config, **kwargs),
+            self.schema.model_validate,
+        )
@@ -0,0 +1,123 @@
+import os
+import random
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Optional, TypeVar
+from zoneinfo import ZoneInfo
+
+
+T = TypeVar("T")
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a scheduled call cannot finish before its deadline"""
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, bursts up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError(f"TokenBucket rate must be positive, got {rate}")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, deadline: Optional[float] = None) -> None:
+        """Block until a token is available, or raise DeadlineExceeded (deadline is a time.monotonic() value)"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            if deadline is not None and now + wait > deadline:
+                raise DeadlineExceeded("Rate limiter could not grant a token before the deadline")
+            time.sleep(wait)
+
+
+def backoff_delay(attempt: int, base_delay: float, max_delay: float) -> float:
+    """Exponential backoff with full jitter for the given (0-based) retry attempt"""
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+
+def call_with_retry(
+    func: Callable[[], T],
+    is_retryable: Callable[[Exception], bool],
+    deadline: Optional[float] = None,
+    max_retries: int = 3,
+    base_delay: float = 1.0,
+    max_delay: float = 16.0,
+    rate_limiter: Optional[TokenBucket] = None,
+) -> T:
+    """Call func, retrying retryable errors with jittered backoff until max_retries or the deadline is hit"""
+    attempt = 0
+    while True:
+        if rate_limiter is not None:
+            rate_limiter.acquire(deadline)
+        try:
+            return func()
+        except Exception as e:
+            if attempt >= max_retries or not is_retryable(e):
+                raise
+            delay = backoff_delay(attempt, base_delay, max_delay)
+            if deadline is not None and time.monotonic() + delay >= deadline:
+                raise
+            time.sleep(delay)
+            attempt += 1
+
+
+class QuotaLedger:
+    """Persistent per-day quota accounting for a metered API (e.g. YouTube Data API units)"""
+
+    def __init__(self, path: str, name: str, daily_budget: int, reserve: int = 0, timezone: str = "America/Los_Angeles"):
+        self.name = name
+        self.daily_budget = daily_budget
+        self.reserve = reserve
+        self.timezone = ZoneInfo(timezone)
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS quota_usage ("
+            "name TEXT NOT NULL, day TEXT NOT NULL, units INTEGER NOT NULL, PRIMARY KEY (name, day))"
+        )
+
+    def _today(self) -> str:
+        # Quotas reset at midnight in the provider's timezone (Pacific time for Google APIs)
+        return datetime.now(self.timezone).date().isoformat()
+
+    def _spent(self, day: str) -> int:
+        row = self._conn.execute("SELECT units FROM quota_usage WHERE name = ? AND day = ?", (self.name, day)).fetchone()
+        return row[0] if row else 0
+
+    def spent_today(self) -> int:
+        with self._lock:
+            return self._spent(self._today())
+
+    def remaining_today(self) -> int:
+        return max(0, self.daily_budget - self.spent_today())
+
+    def try_spend(self, units: int) -> bool:
+        """Atomically record units about to be spent; False when that would dip into the reserve"""
+        with self._lock:
+            day = self._today()
+            if self._spent(day) + units > self.daily_budget - self.reserve:
+                return False
+            self._conn.execute(
+                "INSERT INTO quota_usage (name, day, units) VALUES (?, ?, ?) "
+                "ON CONFLICT (name, day) DO UPDATE SET units = units + excluded.units",
+                (self.name, day, units),
+            )
+            return True
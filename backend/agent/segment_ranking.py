@@ -0,0 +1,135 @@
+"""
+Video segment extraction and ranking for parse_video_analysis: a tolerant
+JSON extractor for Gemini's analysis text, a compiled multi-keyword matcher
+and heap-based top-k selection
+"""
+
+import heapq
+import json
+import re
+from typing import Any, Dict, Iterable, List, Optional
+
+FENCE = "```"
+WHITESPACE_AND_COMMAS = re.compile(r"[\s,]*")
+SEGMENT_KEYS = ("start", "end", "content")
+
+_decoder = json.JSONDecoder()
+
+
+def _salvage_array(text: str, start: int) -> List[Any]:
+    """Decode the elements of the array opening at text[start] one by one, keeping those before any damage"""
+    items = []
+    position = start + 1
+    while True:
+        position = WHITESPACE_AND_COMMAS.match(text, position).end()
+        if position >= len(text) or text[position] == "]":
+            return items
+        try:
+            item, position = _decoder.raw_decode(text, position)
+        except json.JSONDecodeError:
+            return items
+        items.append(item)
+
+
+def extract_json(text: str) -> Optional[Any]:
+    """The first JSON value in a model response, or None
+
+    Looks inside the first fenced block if there is one and ignores prose
+    around the value. An array cut short or broken part-way returns the
+    elements that decoded before the damage.
+    """
+    if not text:
+        return None
+    opening = text.find(FENCE)
+    if opening != -1:
+        # Skip the info string ("json"); a block that is never closed runs to the end (truncated responses)
+        body_start = text.find("\n", opening)
+        body_start = len(text) if body_start == -1 else body_start + 1
+        closing = text.find(FENCE, body_start)
+        text = text[body_start:] if closing == -1 else text[body_start:closing]
+    match = re.search(r"[\[{]", text)
+    if match is None:
+        return None
+    try:
+        return _decoder.raw_decode(text, match.start())[0]
+    except json.JSONDecodeError:
+        if text[match.start()] == "[":
+            return _salvage_array(text, match.start()) or None
+        # An object wrapping the segment list ({"segments": [...]}): salvage the list inside it
+        inner = text.find("[", match.start())
+        return _salvage_array(text, inner) if inner != -1 else None
+
+
+def find_segments(data: Any) -> List[Dict[str, str]]:
+    """Segment objects ({start, end, content} strings) of an analysis, from a list or an object wrapping one"""
+    if isinstance(data, dict):
+        data = next((value for value in data.values() if isinstance(value, list)), [])
+    if not isinstance(data, list):
+        return []
+    return [
+        item for item in data
+        if isinstance(item, dict) and all(isinstance(item.get(key), str) for key in SEGMENT_KEYS)
+    ]
+
+
+def to_seconds(time_str: str) -> int:
+    """MM:SS or HH:MM:SS in seconds; 0 for anything else"""
+    try:
+        parts = [int(part) for part in time_str.split(":")]
+    except (AttributeError, ValueError):
+        return 0
+    if len(parts) == 2:
+        return parts[0] * 60 + parts[1]
+    if len(parts) == 3:
+        return parts[0] * 3600 + parts[1] * 60 + parts[2]
+    return 0
+
+
+# Separates texts scored together; never part of a keyword
+TEXT_SEPARATOR = "\x00"
+
+
+class KeywordMatcher:
+    """Counts keyword occurrences with one compiled regex pass over all the texts
+
+    Scores match summing str.count over every keyword: the alternation
+    prefers longer keywords, and a match also counts the shorter keywords it
+    contains ("lebron james" scores for "lebron" too). Keywords that only
+    partly overlap each other in the text are counted once.
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        # Blank keywords match everywhere and only add the same constant to every segment
+        lowered = [keyword.lower() for keyword in keywords if keyword.strip()]
+        unique = sorted(set(lowered), key=len, reverse=True)
+        # Every keyword listed (repeats included) that occurs inside this one, itself among them
+        self.weights = {keyword: sum(keyword.count(other) for other in lowered) for keyword in unique}
+        unique = [keyword for keyword in unique if TEXT_SEPARATOR not in keyword]
+        self.pattern = re.compile("|".join(map(re.escape, [TEXT_SEPARATOR] + unique))) if unique else None
+
+    def scores(self, texts: List[str]) -> List[int]:
+        """Keyword occurrences in each text"""
+        scores = [0] * len(texts)
+        if self.pattern is None:
+            return scores
+        weights = self.weights
+        joined = TEXT_SEPARATOR.join(texts).lower()
+        if joined.count(TEXT_SEPARATOR) != len(texts) - 1:
+            joined = TEXT_SEPARATOR.join(text.replace(TEXT_SEPARATOR, " ") for text in texts).lower()
+        index = 0
+        for match in self.pattern.findall(joined):
+            if match == TEXT_SEPARATOR:
+                index += 1
+            else:
+                scores[index] += weights[match]
+        return scores
+
+    def score(self, text: str) -> int:
+        return self.scores([text])[0]
+
+
+def rank_segments(segments: List[Dict[str, str]], keywords: Iterable[str], k: int = 3) -> List[Dict[str, str]]:
+    """The k segments mentioning the keywords most (ties keep analysis order), in start-time order"""
+    scores = KeywordMatcher(keywords).scores([segment["content"] for segment in segments])
+    top = heapq.nlargest(k, range(len(segments)), key=scores.__getitem__)
+    return sorted((segments[index] for index in top), key=lambda segment: to_seconds(segment["start"]))
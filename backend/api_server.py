@@ -1,11 +1,23 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
-import requests
 import json
+from coalescing import GenerationCoalescer
+from graph_client import MAX_IDEATORS_ERROR, generation_events, parse_max_ideators
+from jobs import JOB_STORE_PATH, JobQueue, JobStore
+from metrics import instrument_events, registry, server_timing_header
 
 app = Flask(__name__)
 CORS(app, resources={r"/*": {"origins": "http://localhost:3000"}})
 
+# Single-flight generations shared by identical concurrent requests, kept briefly after finishing
+# Each run's per-node metrics feed /metrics and its timing summary
+coalescer = GenerationCoalescer(
+    lambda topic, max_ideators, thread_id: instrument_events(generation_events(topic, max_ideators, thread_id))
+)
+
+# Background generation jobs; run_api.py starts the workers once the server process is up
+job_queue = JobQueue(JobStore(JOB_STORE_PATH), coalescer.events)
+
 @app.route('/generate-video', methods=['POST'])
 def generate_video():
     """Generate video structure from topic via LangGraph dev API"""
@@ -16,92 +28,114 @@ def generate_video():
             return jsonify({'error': 'Topic is required in request body'}), 400
         
         topic = data['topic']
-        max_ideators = data.get('max_ideators', 3)  # Default to 3
+        max_ideators = parse_max_ideators(data.get('max_ideators', 3))  # Default to 3
+        if max_ideators is None:
+            return jsonify({'error': MAX_IDEATORS_ERROR}), 400
+        
+        thread_id = data.get('thread_id')  # Retry: resume this thread from its last checkpoint
         
         print(f"🎬 Processing topic: {topic}")
         print(f"📊 Max ideators: {max_ideators}")
         
-        # LangGraph dev API endpoint
-        langgraph_dev_url = "http://localhost:2024"
-        
-        # Step 1: Create a thread
-        thread_url = f"{langgraph_dev_url}/threads"
-        thread_response = requests.post(thread_url, json={"metadata": {}})
-        
-        if thread_response.status_code != 200:
-            error_msg = f"Failed to create thread: {thread_response.status_code} - {thread_response.text}"
-            print(f"❌ {error_msg}")
-            return jsonify({'error': error_msg}), 500
-        
-        thread_id = thread_response.json()["thread_id"]
-        print(f"🧵 Created thread: {thread_id}")
-        
-        # Step 2: Prepare the input for the LangGraph dev API
-        input_data = {
-            "topic": topic,
-            "max_ideators": max_ideators
-        }
-        
-        # Step 3: Call LangGraph dev API to stream the graph execution
-        stream_url = f"{langgraph_dev_url}/threads/{thread_id}/runs/stream"
-        
-        payload = {
-            "assistant_id": "ClipHunt",
-            "input": input_data,
-            "stream_mode": ["values"]
-        }
-        
-        headers = {
-            "Content-Type": "application/json",
-            "Accept": "text/event-stream"
-        }
-        
-        print(f"🚀 Calling LangGraph dev API at {stream_url}")
-        
-        # Step 4: Make streaming request to LangGraph dev API
+        # Identical concurrent requests share one run (see coalescing.py); stops reading once the final structure arrives
         final_result = None
-        with requests.post(stream_url, json=payload, headers=headers, stream=True) as response:
-            if response.status_code != 200:
-                error_msg = f"LangGraph dev API error: {response.status_code} - {response.text}"
-                print(f"❌ {error_msg}")
-                return jsonify({'error': error_msg}), 500
-            
-            # Process streaming response (SSE format)
-            for line in response.iter_lines():
-                if line:
-                    line_str = line.decode('utf-8')
-                    # SSE format: "data: {json_data}"
-                    if line_str.startswith('data: '):
-                        try:
-                            data_str = line_str[6:]  # Remove "data: " prefix
-                            if data_str.strip():
-                                event_data = json.loads(data_str)
-                                
-                                # Look for the final video structure in the event data
-                                if isinstance(event_data, dict):
-                                    final_video_structure = event_data.get('final_video_structure')
-                                    if final_video_structure:
-                                        final_result = final_video_structure
-                                        print(f"📹 Received final video structure")
-                        except json.JSONDecodeError:
-                            # Skip lines that aren't valid JSON
-                            continue
+        timing = None
+        for progress_event in coalescer.events(topic, max_ideators, thread_id):
+            if progress_event['event'] == 'error':
+                print(f"❌ {progress_event['error']}")
+                error_body = {'error': progress_event['error']}
+                if 'thread_id' in progress_event:
+                    error_body['thread_id'] = progress_event['thread_id']
+                return jsonify(error_body), progress_event.get('status', 500)
+            if progress_event['event'] == 'timing':
+                timing = progress_event['data']
+            if progress_event['event'] == 'final':
+                final_result = progress_event['data']
+                print(f"📹 Received final video structure")
+                break
         
         if final_result is None:
             return jsonify({'error': 'Failed to generate video structure - no final result received'}), 500
         
         print(f"✅ Successfully generated video structure for: {topic}")
-        return jsonify(final_result)
-        
-    except requests.exceptions.ConnectionError:
-        error_msg = "Could not connect to LangGraph dev server. Make sure 'langgraph dev' is running on port 2024."
-        print(f"❌ {error_msg}")
-        return jsonify({'error': error_msg}), 503
+        response = jsonify(final_result)
+        if timing is not None:
+            response.headers['Server-Timing'] = server_timing_header(timing)
+        return response
         
     except Exception as e:
         print(f"❌ Error processing request: {str(e)}")
         return jsonify({'error': f'Internal server error: {str(e)}'}), 500
 
+@app.route('/generate-video/stream', methods=['POST'])
+def generate_video_stream():
+    """Stream per-node progress for a topic as newline-delimited JSON events"""
+    data = request.get_json(silent=True)
+    if not data or 'topic' not in data:
+        return jsonify({'error': 'Topic is required in request body'}), 400
+    
+    topic = data['topic']
+    max_ideators = parse_max_ideators(data.get('max_ideators', 3))  # Default to 3
+    if max_ideators is None:
+        return jsonify({'error': MAX_IDEATORS_ERROR}), 400
+    thread_id = data.get('thread_id')  # Retry: resume this thread from its last checkpoint
+    
+    print(f"🎬 Streaming topic: {topic}")
+    
+    events = coalescer.events(topic, max_ideators, thread_id)
+    # The start event, or the error that kept the run from starting (reported as a plain JSON error)
+    start_event = next(events)
+    if start_event['event'] == 'error':
+        print(f"❌ {start_event['error']}")
+        return jsonify({'error': start_event['error']}), start_event.get('status', 500)
+    
+    print(f"🧵 Streaming thread: {start_event['thread_id']}")
+    
+    def generate():
+        yield json.dumps(start_event) + '\n'
+        final_received = False
+        for progress_event in events:
+            final_received = final_received or progress_event['event'] == 'final'
+            yield json.dumps(progress_event) + '\n'
+            if progress_event['event'] == 'error':
+                print(f"❌ Error while streaming: {progress_event['error']}")
+                return
+        
+        if not final_received:
+            yield json.dumps({'event': 'error', 'error': 'Failed to generate video structure - no final result received'}) + '\n'
+        else:
+            print(f"✅ Finished streaming video structure for: {topic}")
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@app.route('/jobs', methods=['POST'])
+def create_job():
+    """Queue a video generation job and return its id immediately"""
+    data = request.get_json(silent=True)
+    if not data or 'topic' not in data:
+        return jsonify({'error': 'Topic is required in request body'}), 400
+    
+    max_ideators = parse_max_ideators(data.get('max_ideators', 3))  # Default to 3
+    if max_ideators is None:
+        return jsonify({'error': MAX_IDEATORS_ERROR}), 400
+    
+    job_id = job_queue.submit(data['topic'], max_ideators)
+    print(f"📥 Queued job {job_id}: {data['topic']}")
+    return jsonify({'job_id': job_id, 'status': 'queued', 'status_url': f'/jobs/{job_id}'}), 202
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Job status, progress events so far, and the final result once finished"""
+    job = job_queue.store.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found or expired'}), 404
+    return jsonify(job)
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Per-node latency, token, external call and cache metrics in Prometheus text format"""
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
@@ -115,7 +149,11 @@ def root():
         'description': 'This API wraps the LangGraph dev server to enable LangSmith tracking',
         'prerequisites': 'Make sure LangGraph dev server is running on port 2024',
         'endpoints': {
-            'POST /generate-video': 'Generate video structure from topic via LangGraph dev API',
+            'POST /generate-video': 'Generate video structure from topic via LangGraph dev API (pass thread_id to resume a failed run)',
+            'POST /generate-video/stream': 'Same as /generate-video, streaming per-node progress as NDJSON events',
+            'POST /jobs': 'Queue a video generation job; returns a job id immediately',
+            'GET /jobs/<job_id>': 'Job status, partial progress and final result',
+            'GET /metrics': 'Per-node latency, token, external call and cache metrics (Prometheus format)',
             'GET /health': 'Health check',
             'GET /': 'This information'
         },
@@ -0,0 +1,354 @@
+"""
+Async (ASGI) variant of the API wrapper with the same routes as api_server.py.
+
+Generations are long-lived streams, so instead of pinning one worker thread each
+they are plain coroutines sharing a single keep-alive connection pool to the
+LangGraph dev server. Run with: uv run backend/run_api.py --asgi
+"""
+
+import asyncio
+import json
+import os
+import uuid
+from contextlib import asynccontextmanager
+
+import aiosqlite
+import httpx
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+
+from coalescing import AsyncGenerationCoalescer
+from graph_client import (
+    CHECKPOINT_DB_PATH,
+    EXECUTION_MODE,
+    GRAPH_CHECKPOINTER,
+    LANGGRAPH_DEV_URL,
+    MAX_IDEATORS_ERROR,
+    SSE_HEADERS,
+    LangGraphError,
+    SSEParser,
+    checkpoint_serde,
+    embedded_progress_events,
+    graph_input,
+    load_graph,
+    load_workflow,
+    parse_max_ideators,
+    progress_events,
+    resume_plan,
+    run_payload,
+)
+from jobs import JOB_STORE_PATH, JobQueue, JobStore
+from metrics import ainstrument_events, registry, server_timing_header
+
+# Upper bound on generations in flight (each holds one upstream stream) and on pooled connections
+MAX_CONCURRENT_GENERATIONS = int(os.getenv("MAX_CONCURRENT_GENERATIONS", "500"))
+LANGGRAPH_MAX_CONNECTIONS = int(os.getenv("LANGGRAPH_MAX_CONNECTIONS", "512"))
+LANGGRAPH_MAX_KEEPALIVE = int(os.getenv("LANGGRAPH_MAX_KEEPALIVE", "64"))
+
+
+@asynccontextmanager
+async def lifespan(app):
+    app.state.client = httpx.AsyncClient(
+        base_url=LANGGRAPH_DEV_URL,
+        limits=httpx.Limits(
+            max_connections=LANGGRAPH_MAX_CONNECTIONS,
+            max_keepalive_connections=LANGGRAPH_MAX_KEEPALIVE
+        ),
+        # Runs take minutes, so there is no read timeout; waiting for a pooled connection is bounded by the semaphore
+        timeout=httpx.Timeout(30.0, read=None, pool=None)
+    )
+    app.state.generation_slots = asyncio.Semaphore(MAX_CONCURRENT_GENERATIONS)
+    app.state.graph, checkpoint_conn = await open_embedded_graph() if EXECUTION_MODE == 'embedded' else (None, None)
+    # Single-flight generations shared by identical concurrent requests, kept briefly after finishing;
+    # each run's per-node metrics feed /metrics and its timing summary
+    app.state.coalescer = AsyncGenerationCoalescer(
+        lambda topic, max_ideators, thread_id: ainstrument_events(shared_generation_events(app, topic, max_ideators, thread_id)),
+        connection_errors=(httpx.ConnectError,)
+    )
+    # Background jobs run on their own bounded worker pool, independent of request lifetimes,
+    # and go through the same coalescer so they share runs with identical requests
+    loop = asyncio.get_running_loop()
+    app.state.job_queue = JobQueue(
+        JobStore(JOB_STORE_PATH),
+        lambda topic, max_ideators: job_events(app.state.coalescer, loop, topic, max_ideators)
+    )
+    await run_in_threadpool(app.state.job_queue.start)
+    yield
+    # Before the loop closes under the workers, so in-flight jobs are re-queued rather than failed
+    app.state.job_queue.stop()
+    await app.state.client.aclose()
+    if checkpoint_conn is not None:
+        await checkpoint_conn.close()
+
+
+async def open_embedded_graph():
+    """The ClipHunt graph for astream plus its checkpoint connection, using the async SQLite checkpointer unless disabled"""
+    if GRAPH_CHECKPOINTER != 'sqlite':
+        return load_graph(), None
+    os.makedirs(os.path.dirname(os.path.abspath(CHECKPOINT_DB_PATH)), exist_ok=True)
+    conn = await aiosqlite.connect(CHECKPOINT_DB_PATH)
+    return load_workflow().compile(checkpointer=AsyncSqliteSaver(conn, serde=checkpoint_serde())), conn
+
+
+async def create_thread(client):
+    """Create a LangGraph thread and return its id"""
+    thread_response = await client.post("/threads", json={"metadata": {}})
+    if thread_response.status_code != 200:
+        raise LangGraphError(f"Failed to create thread: {thread_response.status_code} - {thread_response.text}")
+    return thread_response.json()["thread_id"]
+
+
+async def aiter_sse_data(response):
+    """Yield (event, raw data string) pairs from a LangGraph SSE response without decoding them"""
+    parser = SSEParser()
+    async for line in response.aiter_lines():
+        parsed = parser.feed(line)
+        if parsed is not None:
+            yield parsed
+
+
+async def get_thread_state(client, thread_id):
+    """Latest checkpoint of a LangGraph dev thread ({"values": ..., "next": [...], ...})"""
+    state_response = await client.get(f"/threads/{thread_id}/state")
+    if state_response.status_code != 200:
+        raise LangGraphError(f"Failed to get thread state: {state_response.status_code} - {state_response.text}")
+    return state_response.json()
+
+
+async def stream_proxy_events(client, topic, max_ideators, thread_id, resume=False):
+    """Progress events for a run on the LangGraph dev server, optionally resuming an existing thread"""
+    # "updates" yields one event per finished node, which is what we forward
+    payload = run_payload(topic, max_ideators, "updates")
+    if resume:
+        state = await get_thread_state(client, thread_id)
+        action, final_structure = resume_plan(state.get('values'), state.get('next'))
+        if action == 'done':
+            yield {'event': 'final', 'node': 'generate_final_structure', 'data': final_structure}
+            return
+        if action == 'resume':
+            payload['input'] = None
+    async with client.stream("POST", f"/threads/{thread_id}/runs/stream", json=payload, headers=SSE_HEADERS) as response:
+        if response.status_code != 200:
+            await response.aread()
+            raise LangGraphError(f"LangGraph dev API error: {response.status_code} - {response.text}")
+
+        async for event, data_str in aiter_sse_data(response):
+            for progress_event in progress_events(event, data_str):
+                yield progress_event
+
+
+async def stream_embedded_events(graph, topic, max_ideators, thread_id, resume=False):
+    """Progress events for an in-process run, optionally resuming an existing thread"""
+    config = {"configurable": {"thread_id": thread_id}}
+    run_input = graph_input(topic, max_ideators)
+    if resume and graph.checkpointer is not None:
+        snapshot = await graph.aget_state(config)
+        action, final_structure = resume_plan(snapshot.values, snapshot.next)
+        if action == 'done':
+            yield {'event': 'final', 'node': 'generate_final_structure', 'data': final_structure}
+            return
+        if action == 'resume':
+            run_input = None
+    async for chunk in graph.astream(run_input, config=config, stream_mode="updates"):
+        for progress_event in embedded_progress_events(chunk):
+            yield progress_event
+
+
+async def read_topic(request):
+    """Parse topic, max_ideators and an optional thread_id to resume from the request body, or None if the topic is missing"""
+    try:
+        data = await request.json()
+    except ValueError:
+        return None
+    if not isinstance(data, dict) or 'topic' not in data:
+        return None
+    return data['topic'], data.get('max_ideators', 3), data.get('thread_id')  # Default to 3 ideators, new thread
+
+
+async def shared_generation_events(app, topic, max_ideators, thread_id=None):
+    """Progress events for a run in the configured execution mode, holding one generation slot; passing a thread_id resumes that thread"""
+    resume = thread_id is not None
+    async with app.state.generation_slots:
+        if EXECUTION_MODE == 'embedded':
+            thread_id = thread_id or str(uuid.uuid4())
+            events = stream_embedded_events(app.state.graph, topic, max_ideators, thread_id, resume)
+        else:
+            if not resume:
+                thread_id = await create_thread(app.state.client)
+                print(f"🧵 Created thread: {thread_id}")
+            events = stream_proxy_events(app.state.client, topic, max_ideators, thread_id, resume)
+        yield {'event': 'start', 'thread_id': thread_id}
+        async for progress_event in events:
+            yield progress_event
+
+
+def job_events(coalescer, loop, topic, max_ideators):
+    """Progress events from the async coalescer for a job worker thread
+
+    The coalescer belongs to the event loop, so attaching and every read are scheduled on it.
+    """
+    async def attach():
+        return coalescer.events(topic, max_ideators)
+
+    events = asyncio.run_coroutine_threadsafe(attach(), loop).result()
+
+    async def next_event():
+        return await anext(events, None)
+
+    while True:
+        progress_event = asyncio.run_coroutine_threadsafe(next_event(), loop).result()
+        if progress_event is None:
+            return
+        yield progress_event
+
+
+async def generate_video(request):
+    """Generate video structure from topic via LangGraph dev API"""
+    parsed = await read_topic(request)
+    if parsed is None:
+        return JSONResponse({'error': 'Topic is required in request body'}, status_code=400)
+    topic, max_ideators, thread_id = parsed
+    max_ideators = parse_max_ideators(max_ideators)
+    if max_ideators is None:
+        return JSONResponse({'error': MAX_IDEATORS_ERROR}, status_code=400)
+
+    print(f"🎬 Processing topic: {topic}")
+    print(f"📊 Max ideators: {max_ideators}")
+
+    try:
+        # Identical concurrent requests share one run (see coalescing.py); stops reading once the final structure arrives
+        final_result = None
+        timing = None
+        async for progress_event in request.app.state.coalescer.events(topic, max_ideators, thread_id):
+            if progress_event['event'] == 'error':
+                print(f"❌ {progress_event['error']}")
+                error_body = {'error': progress_event['error']}
+                if 'thread_id' in progress_event:
+                    error_body['thread_id'] = progress_event['thread_id']
+                return JSONResponse(error_body, status_code=progress_event.get('status', 500))
+            if progress_event['event'] == 'timing':
+                timing = progress_event['data']
+            if progress_event['event'] == 'final':
+                final_result = progress_event['data']
+                break
+
+        if final_result is None:
+            return JSONResponse({'error': 'Failed to generate video structure - no final result received'}, status_code=500)
+
+        print(f"✅ Successfully generated video structure for: {topic}")
+        headers = {'Server-Timing': server_timing_header(timing)} if timing is not None else None
+        return JSONResponse(final_result, headers=headers)
+
+    except Exception as e:
+        print(f"❌ Error processing request: {str(e)}")
+        return JSONResponse({'error': f'Internal server error: {str(e)}'}, status_code=500)
+
+
+async def generate_video_stream(request):
+    """Stream per-node progress for a topic as newline-delimited JSON events"""
+    parsed = await read_topic(request)
+    if parsed is None:
+        return JSONResponse({'error': 'Topic is required in request body'}, status_code=400)
+    topic, max_ideators, thread_id = parsed
+    max_ideators = parse_max_ideators(max_ideators)
+    if max_ideators is None:
+        return JSONResponse({'error': MAX_IDEATORS_ERROR}, status_code=400)
+
+    print(f"🎬 Streaming topic: {topic}")
+
+    events = request.app.state.coalescer.events(topic, max_ideators, thread_id)
+    # The start event, or the error that kept the run from starting (reported as a plain JSON error)
+    start_event = await events.__anext__()
+    if start_event['event'] == 'error':
+        print(f"❌ {start_event['error']}")
+        return JSONResponse({'error': start_event['error']}, status_code=start_event.get('status', 500))
+
+    async def generate():
+        yield json.dumps(start_event) + '\n'
+        final_received = False
+        async for progress_event in events:
+            final_received = final_received or progress_event['event'] == 'final'
+            yield json.dumps(progress_event) + '\n'
+            if progress_event['event'] == 'error':
+                print(f"❌ Error while streaming: {progress_event['error']}")
+                return
+
+        if not final_received:
+            yield json.dumps({'event': 'error', 'error': 'Failed to generate video structure - no final result received'}) + '\n'
+        else:
+            print(f"✅ Finished streaming video structure for: {topic}")
+
+    return StreamingResponse(generate(), media_type='application/x-ndjson')
+
+
+async def create_job(request):
+    """Queue a video generation job and return its id immediately"""
+    parsed = await read_topic(request)
+    if parsed is None:
+        return JSONResponse({'error': 'Topic is required in request body'}, status_code=400)
+    topic, max_ideators, _ = parsed
+    max_ideators = parse_max_ideators(max_ideators)
+    if max_ideators is None:
+        return JSONResponse({'error': MAX_IDEATORS_ERROR}, status_code=400)
+
+    job_id = await run_in_threadpool(request.app.state.job_queue.submit, topic, max_ideators)
+    print(f"📥 Queued job {job_id}: {topic}")
+    return JSONResponse({'job_id': job_id, 'status': 'queued', 'status_url': f'/jobs/{job_id}'}, status_code=202)
+
+
+async def get_job(request):
+    """Job status, progress events so far, and the final result once finished"""
+    job = await run_in_threadpool(request.app.state.job_queue.store.get, request.path_params['job_id'])
+    if job is None:
+        return JSONResponse({'error': 'Job not found or expired'}, status_code=404)
+    return JSONResponse(job)
+
+
+async def metrics(request):
+    """Per-node latency, token, external call and cache metrics in Prometheus text format"""
+    return PlainTextResponse(registry.render(), media_type='text/plain; version=0.0.4')
+
+
+async def health_check(request):
+    """Health check endpoint"""
+    return JSONResponse({'status': 'healthy', 'message': 'Video generation API is running'})
+
+
+async def root(request):
+    """Root endpoint with API information"""
+    return JSONResponse({
+        'message': 'Video Generation API (LangGraph Dev Wrapper, async)',
+        'description': 'This API wraps the LangGraph dev server to enable LangSmith tracking',
+        'prerequisites': 'Make sure LangGraph dev server is running on port 2024',
+        'endpoints': {
+            'POST /generate-video': 'Generate video structure from topic via LangGraph dev API (pass thread_id to resume a failed run)',
+            'POST /generate-video/stream': 'Same as /generate-video, streaming per-node progress as NDJSON events',
+            'POST /jobs': 'Queue a video generation job; returns a job id immediately',
+            'GET /jobs/<job_id>': 'Job status, partial progress and final result',
+            'GET /metrics': 'Per-node latency, token, external call and cache metrics (Prometheus format)',
+            'GET /health': 'Health check',
+            'GET /': 'This information'
+        }
+    })
+
+
+app = Starlette(
+    routes=[
+        Route('/generate-video', generate_video, methods=['POST']),
+        Route('/generate-video/stream', generate_video_stream, methods=['POST']),
+        Route('/jobs', create_job, methods=['POST']),
+        Route('/jobs/{job_id}', get_job, methods=['GET']),
+        Route('/metrics', metrics, methods=['GET']),
+        Route('/health', health_check, methods=['GET']),
+        Route('/', root, methods=['GET']),
+    ],
+    middleware=[
+        Middleware(CORSMiddleware, allow_origins=['http://localhost:3000'], allow_methods=['*'], allow_headers=['*'])
+    ],
+    lifespan=lifespan
+)
@@ -0,0 +1,121 @@
+"""
+Script-generation latency with and without research context packing, on
+the create_script node, at growing ideator counts.
+
+Each ideator's key insights are recorded llm_text responses, served
+round-robin, so past the fixture's four responses ideators repeat each
+other word for word; real ideators overlap less, and the budget (rather
+than de-duplication) does more of the trimming. Prompt length only affects
+wall time through --prefill-ms (injected milliseconds per 1k prompt
+tokens); prompt tokens are the figure that carries over to a real model.
+
+    cd backend
+    python -m bench.context_packing --ideators 3,8,16 --profile realistic --latency-scale 0.05
+"""
+
+import argparse
+import json
+import statistics
+
+from bench.replay import (
+    DEFAULT_FIXTURES,
+    LATENCY_PROFILES,
+    Fixtures,
+    Latency,
+    import_cliphunt,
+    install,
+    parse_latency_override,
+    resize_ideators,
+)
+
+MODES = ("unpacked", "packed")
+
+
+def research_state(cliphunt, fixtures, count):
+    """create_script input with `count` ideators' research results"""
+    from cliphunt import Ideator, ResearchResult, Scriptor, SearchQuery
+    recorded = fixtures.data["llm_structured"]
+    ideators = resize_ideators(recorded["Perspectives"][0]["ideators"], count)
+    return {
+        "topic": fixtures.topic,
+        "scriptor": Scriptor.model_validate(recorded["Scriptor"][0]),
+        "research_results": [
+            ResearchResult(
+                ideator=Ideator.model_validate(ideator),
+                search_query=SearchQuery.model_validate(fixtures.next("llm_structured", "SearchQuery")),
+                search_results="",
+                key_insights=fixtures.next("llm_text"),
+            )
+            for ideator in ideators
+        ],
+    }
+
+
+def run_mode(cliphunt, script_node, state, budget, repeats):
+    """Mean prompt tokens, context tokens and wall time of `repeats` create_script runs"""
+    cliphunt.research_context_tokens = budget
+    samples = [script_node(state)["node_metrics"][0] for _ in range(repeats)]
+    return {
+        "prompt_tokens": statistics.mean(sample["counters"].get("llm_input_tokens", 0) for sample in samples),
+        "context_tokens": statistics.mean(sample["counters"].get("context_tokens_out", 0) for sample in samples),
+        "passages_dropped": statistics.mean(sample["counters"].get("context_passages_dropped", 0) for sample in samples),
+        "seconds": round(statistics.mean(sample["seconds"] for sample in samples), 4),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="create_script latency with and without research context packing")
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURES, help="recorded fixture file (see bench/record.py)")
+    parser.add_argument("--ideators", default="3,8,16", help="comma-separated ideator counts")
+    parser.add_argument("--budget", type=int, default=None, help="packing token budget (default: RESEARCH_CONTEXT_TOKENS)")
+    parser.add_argument("--repeats", type=int, default=3, help="create_script runs per mode and ideator count")
+    parser.add_argument("--profile", choices=sorted(LATENCY_PROFILES), default="zero", help="injected latency profile")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="multiply all injected latencies")
+    parser.add_argument("--latency", action="append", default=[], metavar="SERVICE=MEAN[:JITTER]",
+                        help="override one service's latency in ms (llm, tavily, duckduckgo, youtube, gemini)")
+    parser.add_argument("--prefill-ms", type=float, default=400.0, help="injected LLM milliseconds per 1k prompt tokens")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for latency jitter")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args(argv)
+
+    cliphunt = import_cliphunt()
+    from instrumentation import instrument_node
+    fixtures = Fixtures(args.fixtures)
+    latency = Latency(args.profile, args.latency_scale, dict(map(parse_latency_override, args.latency)), args.seed,
+                      token_rates={"llm": args.prefill_ms})
+    install(cliphunt, fixtures, latency)
+    script_node = instrument_node("create_script", cliphunt.create_script)
+    budget_setting = cliphunt.research_context_tokens
+    budget = args.budget or budget_setting or 2500
+
+    report = {"profile": args.profile, "latency_scale": args.latency_scale, "prefill_ms": args.prefill_ms,
+              "budget": budget, "repeats": args.repeats, "results": []}
+    print(f"📊 create_script, research context packing (budget ~{budget} tokens), "
+          f"profile={args.profile} x{args.latency_scale}, {args.prefill_ms:g} ms/1k prompt tokens")
+    print(f"  {'ideators':>8} {'mode':<10} {'prompt tok':>10} {'context tok':>11} {'dropped':>8} {'ms':>9}")
+    try:
+        for count in [int(count) for count in args.ideators.split(",")]:
+            state = research_state(cliphunt, fixtures, count)
+            modes = {mode: run_mode(cliphunt, script_node, state, budget if mode == "packed" else 0, args.repeats) for mode in MODES}
+            for mode, result in modes.items():
+                print(f"  {count:>8} {mode:<10} {result['prompt_tokens']:>10.0f} {result['context_tokens']:>11.0f} "
+                      f"{result['passages_dropped']:>8.0f} {result['seconds'] * 1000:>9.1f}")
+            unpacked, packed = modes["unpacked"], modes["packed"]
+            saved = {
+                "prompt_tokens_pct": round(100 * (1 - packed["prompt_tokens"] / unpacked["prompt_tokens"]), 1),
+                "latency_pct": round(100 * (1 - packed["seconds"] / unpacked["seconds"]), 1) if unpacked["seconds"] else 0.0,
+            }
+            print(f"  {'':>8} {'saved':<10} {saved['prompt_tokens_pct']:>9.1f}% {'':>11} {'':>8} {saved['latency_pct']:>8.1f}%")
+            report["results"].append({"ideators": count, **modes, "saved": saved})
+    finally:
+        cliphunt.research_context_tokens = budget_setting
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✅ Report written to {args.json}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
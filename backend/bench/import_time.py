@@ -0,0 +1,114 @@
+"""
+Cold-start benchmark for cliphunt.py.
+
+Imports the module in fresh interpreters (what `langgraph dev` reloads,
+worker spawns and test collection pay), then builds every API client the
+way the first request does. Building them at import time used to be part
+of the import itself, so "import + clients" is the eager baseline and the
+gap between the two is what lazy construction saves on every cold start.
+
+    cd backend
+    python -m bench.import_time --repeats 5
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from bench.replay import AGENT_DIR
+
+CHILD = """
+import json, sys, time
+sys.path.insert(0, {agent_dir!r})
+start_time = time.perf_counter()
+import cliphunt
+imported = time.perf_counter() - start_time
+built_at_import = cliphunt.clients.built
+start_time = time.perf_counter()
+cliphunt.clients.build_all()
+print(json.dumps({{"import_s": imported, "clients_s": time.perf_counter() - start_time, "built_at_import": built_at_import}}))
+"""
+
+
+def child_env():
+    """Dummy keys and no tracing or cache directories shared with a real deployment"""
+    env = dict(os.environ)
+    env.update({
+        "GOOGLE_API_KEY": env.get("GOOGLE_API_KEY") or "bench",
+        "TAVILY_API_KEY": env.get("TAVILY_API_KEY") or "bench",
+        "YOUTUBE_API_KEY": env.get("YOUTUBE_API_KEY") or "bench",
+        "LANGSMITH_TRACING": "false",
+        "LANGCHAIN_TRACING_V2": "false",
+        "CLIPHUNT_CACHE_DIR": tempfile.mkdtemp(prefix="cliphunt-import-"),
+    })
+    return env
+
+
+def measure_once(env):
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD.format(agent_dir=AGENT_DIR)],
+        env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def slowest_imports(env, top):
+    """Direct imports of cliphunt by cumulative time, from one `python -X importtime` run"""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import sys; sys.path.insert(0, {AGENT_DIR!r}); import cliphunt"],
+        env=env, capture_output=True, text=True, check=True
+    ).stderr
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        # One level of indentation below cliphunt itself
+        if name.startswith("   ") and not name.startswith("    ") and cumulative.strip().isdigit():
+            modules.append((name.strip(), int(cumulative) / 1e6))
+    return sorted(modules, key=lambda module: module[1], reverse=True)[:top]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cold-start import benchmark for cliphunt.py")
+    parser.add_argument("--repeats", type=int, default=5, help="fresh interpreters to measure")
+    parser.add_argument("--top", type=int, default=8, help="slowest direct imports to list")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args(argv)
+
+    env = child_env()
+    samples = [measure_once(env) for _ in range(args.repeats)]
+    import_s = statistics.median(sample["import_s"] for sample in samples)
+    clients_s = statistics.median(sample["clients_s"] for sample in samples)
+    report = {
+        "repeats": args.repeats,
+        "import_s": round(import_s, 4),
+        "clients_s": round(clients_s, 4),
+        "eager_baseline_s": round(import_s + clients_s, 4),
+        "speedup": round((import_s + clients_s) / import_s, 2),
+        "built_at_import": samples[0]["built_at_import"],
+        "slowest_imports": [{"module": name, "seconds": round(seconds, 4)} for name, seconds in slowest_imports(env, args.top)],
+    }
+
+    print(f"⏱️ cliphunt cold start, median of {args.repeats} fresh interpreters")
+    print(f"  import cliphunt (lazy clients)   {import_s * 1000:>8.1f} ms")
+    print(f"  + building every client          {clients_s * 1000:>8.1f} ms")
+    print(f"  eager baseline                   {(import_s + clients_s) * 1000:>8.1f} ms  ({report['speedup']}x)")
+    print(f"  clients built during import: {report['built_at_import'] or 'none'}")
+    print("\nSlowest direct imports")
+    for module in report["slowest_imports"]:
+        print(f"  {module['module']:<40} {module['seconds'] * 1000:>8.1f} ms")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✅ Report written to {args.json}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Closed-loop load generator for POST /generate-video.
+
+Ramps through increasing concurrency levels (each worker sends its next
+request as soon as the previous one finishes), reports throughput, latency
+percentiles and error rate per level, and marks the saturation point: the
+first level where adding workers stops buying throughput (or starts causing
+errors) and only adds queueing latency.
+
+    cd backend
+    python -m bench.stubs --profile realistic --latency-scale 0.02 &
+    LANGGRAPH_DEV_URL=http://localhost:12024 python run_api.py &
+    python -m bench.loadgen --levels 1,2,4,8,16,32 --duration 20
+"""
+
+import argparse
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from bench.replay import DEFAULT_FIXTURES, Fixtures
+from bench.run import percentile
+
+
+def send_requests(session, url, topics, max_ideators, deadline, timeout):
+    """Send requests back to back until the deadline; returns [(seconds, status code or error name)]"""
+    results = []
+    while time.monotonic() < deadline:
+        start_time = time.perf_counter()
+        try:
+            response = session.post(url, json={"topic": next(topics), "max_ideators": max_ideators}, timeout=timeout)
+            outcome = response.status_code
+        except requests.exceptions.RequestException as e:
+            outcome = type(e).__name__
+        results.append((time.perf_counter() - start_time, outcome))
+    return results
+
+
+class TopicSource:
+    """Thread-safe topic supplier; unique topics keep request coalescing from merging the load"""
+
+    def __init__(self, topic, unique):
+        self.topic = topic
+        self.unique = unique
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def __next__(self):
+        if not self.unique:
+            return self.topic
+        with self._lock:
+            self._count += 1
+            return f"{self.topic} #{self._count}"
+
+
+def run_level(url, topics, max_ideators, concurrency, duration, timeout):
+    """One concurrency level for `duration` seconds"""
+    deadline = time.monotonic() + duration
+    sessions = [requests.Session() for _ in range(concurrency)]
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        per_worker = list(executor.map(
+            lambda session: send_requests(session, url, topics, max_ideators, deadline, timeout), sessions
+        ))
+    elapsed = time.perf_counter() - start_time
+    for session in sessions:
+        session.close()
+
+    results = [result for worker_results in per_worker for result in worker_results]
+    succeeded = [seconds for seconds, outcome in results if outcome == 200]
+    failures = {}
+    for _, outcome in results:
+        if outcome != 200:
+            failures[str(outcome)] = failures.get(str(outcome), 0) + 1
+    level = {
+        "concurrency": concurrency,
+        "requests": len(results),
+        "succeeded": len(succeeded),
+        "error_rate": round(1 - len(succeeded) / len(results), 4) if results else 0.0,
+        "failures": failures,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(succeeded) / elapsed, 3),
+    }
+    if succeeded:
+        level.update({f"p{q}_ms": round(percentile(succeeded, q) * 1000, 1) for q in (50, 95, 99)})
+    return level
+
+
+def find_saturation(levels, min_gain, error_budget):
+    """First level whose throughput gain over the previous level is below `min_gain`, or whose
+    error rate exceeds the first level's by more than `error_budget` (injected background errors don't count)
+
+    Returns (index of the last level that still scaled, reason), or (None, None)
+    if throughput kept scaling across the whole ramp.
+    """
+    baseline_error_rate = levels[0]["error_rate"] if levels else 0.0
+    for index in range(1, len(levels)):
+        previous, current = levels[index - 1], levels[index]
+        if current["error_rate"] > baseline_error_rate + error_budget:
+            return index - 1, f"error rate {current['error_rate']:.1%} at concurrency {current['concurrency']}"
+        if current["throughput_rps"] < previous["throughput_rps"] * (1 + min_gain):
+            return index - 1, (f"throughput {previous['throughput_rps']} -> {current['throughput_rps']} req/s "
+                               f"going from concurrency {previous['concurrency']} to {current['concurrency']}")
+    return None, None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ramp concurrency against /generate-video and report saturation")
+    parser.add_argument("--url", default="http://localhost:5001", help="API server base URL")
+    parser.add_argument("--path", default="/generate-video")
+    parser.add_argument("--topic", help="topic to request (defaults to the fixture's topic)")
+    parser.add_argument("--ideators", type=int, default=3, help="max_ideators for every request")
+    parser.add_argument("--levels", default="1,2,4,8,16", help="comma-separated concurrency levels to ramp through")
+    parser.add_argument("--duration", type=float, default=30, help="seconds per level")
+    parser.add_argument("--timeout", type=float, default=600, help="per-request timeout in seconds")
+    parser.add_argument("--same-topic", action="store_true", help="send one topic everywhere (exercises request coalescing)")
+    parser.add_argument("--min-gain", type=float, default=0.1, help="throughput gain below which a level counts as saturated")
+    parser.add_argument("--error-budget", type=float, default=0.01,
+                        help="error rate increase over the first level above which a level counts as saturated")
+    parser.add_argument("--warmup", type=int, default=1, help="untimed requests before the ramp (server imports, stub recordings)")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args(argv)
+
+    topics = TopicSource(args.topic or Fixtures(DEFAULT_FIXTURES).topic, unique=not args.same_topic)
+    url = args.url.rstrip("/") + args.path
+    with requests.Session() as session:
+        for _ in range(args.warmup):
+            session.post(url, json={"topic": next(topics), "max_ideators": args.ideators}, timeout=args.timeout)
+
+    print(f"🚦 Ramping {url} through concurrency {args.levels}, {args.duration:g}s per level")
+    print(f"  {'conc':>5} {'reqs':>6} {'ok/s':>8} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'errors':>8}")
+
+    levels = []
+    for concurrency in [int(level) for level in args.levels.split(",")]:
+        level = run_level(url, topics, args.ideators, concurrency, args.duration, args.timeout)
+        levels.append(level)
+        print(f"  {concurrency:>5} {level['requests']:>6} {level['throughput_rps']:>8.2f} "
+              f"{level.get('p50_ms', 0):>10.1f} {level.get('p95_ms', 0):>10.1f} {level.get('p99_ms', 0):>10.1f} "
+              f"{level['error_rate']:>8.1%}")
+
+    saturated_index, reason = find_saturation(levels, args.min_gain, args.error_budget)
+    best = max(levels, key=lambda level: level["throughput_rps"])
+    report = {
+        "url": url,
+        "ideators": args.ideators,
+        "duration_s": args.duration,
+        "levels": levels,
+        "peak": {"concurrency": best["concurrency"], "throughput_rps": best["throughput_rps"]},
+        "saturation": None,
+    }
+    print(f"\n📈 Peak throughput: {best['throughput_rps']} req/s at concurrency {best['concurrency']}")
+    if saturated_index is None:
+        print("  No saturation within the ramp; try higher levels")
+    else:
+        knee = levels[saturated_index]
+        report["saturation"] = {"concurrency": knee["concurrency"], "throughput_rps": knee["throughput_rps"], "reason": reason}
+        print(f"  Saturates at concurrency {knee['concurrency']} ({knee['throughput_rps']} req/s): {reason}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✅ Report written to {args.json}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Compare batched search query generation (one structured LLM call for all
+ideators) with the per-ideator loop, on the conduct_research node.
+
+Reports LLM round-trips, approximate input/output tokens and wall time per
+ideator count. Injected LLM latency is per call and doesn't grow with output
+length, so wall time flatters the larger batched response a little; the
+round-trip and token counts are the figures to compare.
+
+    cd backend
+    python -m bench.query_batching --ideators 3,5,8 --profile realistic --latency-scale 0.05
+"""
+
+import argparse
+import json
+import statistics
+
+from bench.replay import (
+    DEFAULT_FIXTURES,
+    LATENCY_PROFILES,
+    Fixtures,
+    Latency,
+    import_cliphunt,
+    install,
+    parse_latency_override,
+    resize_ideators,
+)
+
+MODES = ("per_ideator", "batched")
+COUNTERS = ("llm_calls", "llm_input_tokens", "llm_output_tokens")
+
+
+def run_mode(cliphunt, research_node, ideators, topic, batched, repeats):
+    """Mean counters and wall time of `repeats` conduct_research runs"""
+    from cliphunt import Ideator
+    cliphunt.batch_search_queries = batched
+    state = {"topic": topic, "ideators": [Ideator.model_validate(ideator) for ideator in ideators]}
+    samples = [research_node(state)["node_metrics"][0] for _ in range(repeats)]
+    result = {name: statistics.mean(sample["counters"].get(name, 0) for sample in samples) for name in COUNTERS}
+    result["seconds"] = round(statistics.mean(sample["seconds"] for sample in samples), 4)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batched vs per-ideator search query generation")
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURES, help="recorded fixture file (see bench/record.py)")
+    parser.add_argument("--ideators", default="3,5,8", help="comma-separated ideator counts")
+    parser.add_argument("--repeats", type=int, default=3, help="conduct_research runs per mode and ideator count")
+    parser.add_argument("--profile", choices=sorted(LATENCY_PROFILES), default="zero", help="injected latency profile")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="multiply all injected latencies")
+    parser.add_argument("--latency", action="append", default=[], metavar="SERVICE=MEAN[:JITTER]",
+                        help="override one service's latency in ms (llm, tavily, duckduckgo, youtube, gemini)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for latency jitter")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args(argv)
+
+    cliphunt = import_cliphunt()
+    from instrumentation import instrument_node
+    fixtures = Fixtures(args.fixtures)
+    latency = Latency(args.profile, args.latency_scale, dict(map(parse_latency_override, args.latency)), args.seed)
+    install(cliphunt, fixtures, latency)
+    research_node = instrument_node("conduct_research", cliphunt.conduct_research)
+    recorded_ideators = fixtures.data["llm_structured"]["Perspectives"][0]["ideators"]
+    batch_setting = cliphunt.batch_search_queries
+
+    report = {"profile": args.profile, "latency_scale": args.latency_scale, "repeats": args.repeats, "results": []}
+    print(f"📊 conduct_research, batched vs per-ideator search queries, profile={args.profile} x{args.latency_scale}")
+    print(f"  {'ideators':>8} {'mode':<12} {'LLM calls':>10} {'input tok':>10} {'output tok':>10} {'ms':>9}")
+    try:
+        for count in [int(count) for count in args.ideators.split(",")]:
+            ideators = resize_ideators(recorded_ideators, count)
+            modes = {mode: run_mode(cliphunt, research_node, ideators, fixtures.topic, mode == "batched", args.repeats) for mode in MODES}
+            for mode, result in modes.items():
+                print(f"  {count:>8} {mode:<12} {result['llm_calls']:>10.1f} {result['llm_input_tokens']:>10.0f} "
+                      f"{result['llm_output_tokens']:>10.0f} {result['seconds'] * 1000:>9.1f}")
+            per_ideator, batched = modes["per_ideator"], modes["batched"]
+            saved = {
+                "llm_calls": per_ideator["llm_calls"] - batched["llm_calls"],
+                "input_tokens_pct": round(100 * (1 - batched["llm_input_tokens"] / per_ideator["llm_input_tokens"]), 1),
+                "total_tokens_pct": round(100 * (1 - (batched["llm_input_tokens"] + batched["llm_output_tokens"])
+                                                 / (per_ideator["llm_input_tokens"] + per_ideator["llm_output_tokens"])), 1),
+            }
+            print(f"  {'':>8} {'saved':<12} {saved['llm_calls']:>10.1f} {saved['input_tokens_pct']:>9.1f}% "
+                  f"{'':>10} {'':>9}  ({saved['total_tokens_pct']}% of all tokens)")
+            report["results"].append({"ideators": count, **modes, "saved": saved})
+    finally:
+        cliphunt.batch_search_queries = batch_setting
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✅ Report written to {args.json}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Record a fixture file for bench/run.py from one live pipeline run.
+
+Wraps cliphunt's real clients (API keys from .env are required), runs the
+graph once with every cache disabled, and saves each LLM, Tavily, DuckDuckGo,
+YouTube and Gemini response in the format bench/replay.py serves.
+
+    cd backend
+    python -m bench.record --topic "lebron james and the lakers" --output bench/fixtures/lebron.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+
+from bench.replay import AGENT_DIR
+
+
+class Recorder:
+    """Collects responses by kind (and by schema name for structured LLM output)"""
+
+    def __init__(self, topic):
+        self.data = {
+            "topic": topic,
+            "llm_structured": {},
+            "llm_text": [],
+            "tavily": [],
+            "duckduckgo": [],
+            "youtube_search": [],
+            "gemini": [],
+        }
+        self._lock = threading.Lock()
+
+    def add(self, kind, value, name=None):
+        with self._lock:
+            if name is None:
+                self.data[kind].append(value)
+            else:
+                self.data[kind].setdefault(name, []).append(value)
+
+
+class RecordingLLM:
+    def __init__(self, llm, recorder):
+        self.llm = llm
+        self.recorder = recorder
+
+    def __getattr__(self, name):
+        return getattr(self.llm, name)
+
+    def with_structured_output(self, schema, **kwargs):
+        structured_llm = self.llm.with_structured_output(schema, **kwargs)
+        recorder = self.recorder
+
+        class RecordingStructuredLLM:
+            def invoke(self, messages, config=None, **kw):
+                result = structured_llm.invoke(messages, config=config, **kw)
+                recorder.add("llm_structured", result.model_dump(mode="json"), schema.__name__)
+                return result
+
+        return RecordingStructuredLLM()
+
+    def invoke(self, messages, config=None, **kwargs):
+        response = self.llm.invoke(messages, config=config, **kwargs)
+        self.recorder.add("llm_text", response.content)
+        return response
+
+
+class RecordingTavily:
+    def __init__(self, tavily, recorder):
+        self.tavily = tavily
+        self.recorder = recorder
+
+    def search(self, **kwargs):
+        response = self.tavily.search(**kwargs)
+        self.recorder.add("tavily", response)
+        return response
+
+
+class RecordingRequests:
+    """Wraps the shared HTTP session as used by duckduckgo_search"""
+
+    def __init__(self, session, recorder):
+        self.session = session
+        self.recorder = recorder
+
+    def __getattr__(self, name):
+        return getattr(self.session, name)
+
+    def get(self, url, params=None, **kwargs):
+        response = self.session.get(url, params=params, **kwargs)
+        if "duckduckgo" in url:
+            self.recorder.add("duckduckgo", response.json())
+        return response
+
+
+class RecordingYouTube:
+    def __init__(self, youtube, recorder):
+        self.youtube = youtube
+        self.recorder = recorder
+
+    def search(self):
+        recorder = self.recorder
+        search = self.youtube.search()
+
+        class RecordingSearch:
+            def list(self, **params):
+                request = search.list(**params)
+
+                class RecordingRequest:
+                    def execute(self, **kwargs):
+                        response = request.execute(**kwargs)
+                        recorder.add("youtube_search", response)
+                        return response
+
+                return RecordingRequest()
+
+        return RecordingSearch()
+
+
+class RecordingGemini:
+    def __init__(self, client, recorder):
+        self.client = client
+        self.recorder = recorder
+        self.models = self
+
+    def generate_content(self, **kwargs):
+        response = self.client.models.generate_content(**kwargs)
+        if response.text:
+            self.recorder.add("gemini", response.text)
+        return response
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Record benchmark fixtures from one live ClipHunt run")
+    parser.add_argument("--topic", required=True)
+    parser.add_argument("--ideators", type=int, default=3)
+    parser.add_argument("--output", required=True)
+    args = parser.parse_args(argv)
+
+    # Every call must reach the real APIs to be recorded
+    for flag in ("LLM_CACHE_ENABLED", "GEMINI_CACHE_ENABLED", "SEARCH_CACHE_ENABLED"):
+        os.environ[flag] = "false"
+    if AGENT_DIR not in sys.path:
+        sys.path.insert(0, AGENT_DIR)
+    import cliphunt
+    from bench.replay import NullCache
+
+    if cliphunt.youtube is None:
+        sys.exit("❌ YOUTUBE_API_KEY is required to record YouTube fixtures")
+
+    recorder = Recorder(args.topic)
+    cliphunt.llm = RecordingLLM(cliphunt.llm, recorder)
+    cliphunt.tavily = RecordingTavily(cliphunt.tavily, recorder)
+    cliphunt.http_session = RecordingRequests(cliphunt.http_session, recorder)
+    cliphunt.youtube = RecordingYouTube(cliphunt.youtube, recorder)
+    cliphunt.gemini_client = RecordingGemini(cliphunt.gemini_client, recorder)
+    cliphunt.youtube_cache = NullCache()
+
+    print(f"🎬 Recording a live run for: {args.topic}")
+    cliphunt.graph.invoke({"topic": args.topic, "max_ideators": args.ideators})
+
+    with open(args.output, "w") as f:
+        json.dump(recorder.data, f, indent=2)
+    counts = {kind: len(value) if isinstance(value, list) else sum(map(len, value.values()))
+              for kind, value in recorder.data.items() if kind != "topic"}
+    print(f"✅ Fixtures written to {args.output}: {counts}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+"""
+Replayable stand-ins for the clients cliphunt.py talks to (LLM, Tavily,
+DuckDuckGo, YouTube, Gemini), serving recorded fixtures with injected latency
+so the pipeline can be benchmarked without network access or API keys
+"""
+
+import copy
+import json
+import math
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+
+from langchain_core.messages import AIMessage
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+AGENT_DIR = os.path.join(BACKEND_DIR, "agent")
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+DEFAULT_FIXTURES = os.path.join(FIXTURES_DIR, "lakers.json")
+
+# (mean ms, jitter ms) per external service; "realistic" roughly matches production traces
+LATENCY_PROFILES = {
+    "zero": {},
+    "realistic": {
+        "llm": (1200, 400),
+        "tavily": (900, 300),
+        "duckduckgo": (350, 100),
+        "youtube": (250, 80),
+        "gemini": (9000, 3000),
+    },
+}
+
+
+LATENCY_DISTRIBUTIONS = ("gaussian", "lognormal")
+
+
+class Latency:
+    """Injected per-service latency around a mean, scaled, never negative
+
+    "gaussian" spreads samples symmetrically by the jitter (standard
+    deviation); "lognormal" has the same mean and standard deviation but a
+    long right tail, closer to what real APIs show under load.
+
+    `token_rates` adds milliseconds per 1k prompt tokens for a service
+    (prefill time), so longer prompts take longer; off unless given.
+    """
+
+    def __init__(self, profile="zero", scale=1.0, overrides=None, seed=None, distribution="gaussian", profiles=LATENCY_PROFILES,
+                 token_rates=None):
+        self.delays = dict(profiles[profile])
+        self.delays.update(overrides or {})
+        self.scale = scale
+        self.token_rates = dict(token_rates or {})
+        self.distribution = distribution
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self, service, tokens=0):
+        mean, jitter = self.delays.get(service, (0, 0))
+        prefill_ms = self.token_rates.get(service, 0) * tokens / 1000
+        if not jitter or mean <= 0:
+            delay_ms = mean
+        elif self.distribution == "lognormal":
+            sigma = math.sqrt(math.log(1 + (jitter / mean) ** 2))
+            with self._lock:
+                delay_ms = self._random.lognormvariate(math.log(mean) - sigma ** 2 / 2, sigma)
+        else:
+            with self._lock:
+                delay_ms = self._random.gauss(mean, jitter)
+        return (max(0.0, delay_ms) + prefill_ms) * self.scale / 1000
+
+    def sleep(self, service, tokens=0):
+        delay = self.sample(service, tokens)
+        if delay:
+            time.sleep(delay)
+
+
+def parse_latency_override(text):
+    """'gemini=9000:3000' -> ('gemini', (9000.0, 3000.0)); the jitter part is optional"""
+    service, _, value = text.partition("=")
+    mean, _, jitter = value.partition(":")
+    return service, (float(mean), float(jitter or 0))
+
+
+class Fixtures:
+    """Recorded responses served round-robin per kind, safe to share across concurrent runs"""
+
+    def __init__(self, path=DEFAULT_FIXTURES):
+        with open(path) as f:
+            self.data = json.load(f)
+        self._positions = {}
+        self._lock = threading.Lock()
+
+    @property
+    def topic(self):
+        return self.data.get("topic", "")
+
+    def next(self, kind, name=None):
+        responses = self.data[kind] if name is None else self.data[kind][name]
+        with self._lock:
+            position = self._positions.get((kind, name), 0)
+            self._positions[(kind, name)] = position + 1
+        return copy.deepcopy(responses[position % len(responses)])
+
+
+def approximate_tokens(text):
+    return max(1, len(text) // 4)
+
+
+class ReplayLLM:
+    """Chat model stand-in supporting invoke(messages) and with_structured_output(schema).invoke(messages)"""
+
+    model = "replay"
+
+    def __init__(self, fixtures, latency, max_ideators=None):
+        self.fixtures = fixtures
+        self.latency = latency
+        self.max_ideators = max_ideators
+
+    def with_structured_output(self, schema, **kwargs):
+        return SimpleNamespace(invoke=lambda messages, config=None, **kw: self._structured(schema, messages))
+
+    def invoke(self, messages, config=None, **kwargs):
+        self.latency.sleep("llm", self._prompt_tokens(messages))
+        content = self.fixtures.next("llm_text")
+        self._record_usage(messages, content)
+        return AIMessage(content=content)
+
+    def _structured(self, schema, messages):
+        self.latency.sleep("llm", self._prompt_tokens(messages))
+        prompt = "\n".join(str(message.content) for message in messages)
+        recorded = structured_response(self.fixtures, schema.__name__, prompt, self.max_ideators)
+        self._record_usage(messages, json.dumps(recorded))
+        return schema.model_validate(recorded)
+
+    @staticmethod
+    def _prompt_tokens(messages):
+        return sum(approximate_tokens(str(message.content)) for message in messages)
+
+    @classmethod
+    def _record_usage(cls, messages, output_text):
+        from instrumentation import record
+        record("llm_calls")
+        record("llm_input_tokens", cls._prompt_tokens(messages))
+        record("llm_output_tokens", approximate_tokens(output_text))
+
+
+# Ideator personas are rendered as "Name: ...\nRole: ...\nDescription: ..." (Ideator.persona)
+PERSONA_NAMES = re.compile(r"^Name: (.+)$", re.MULTILINE)
+
+
+def structured_response(fixtures, schema_name, prompt, ideator_count=None):
+    """A recorded structured output for `schema_name`, adapted to the request
+
+    Perspectives are resized to the requested number of ideators. A
+    SearchQueryBatch missing from older fixtures is assembled from recorded
+    SearchQuery responses, one for each persona named in the prompt.
+    """
+    if schema_name == "SearchQueryBatch" and schema_name not in fixtures.data["llm_structured"]:
+        return {"queries": [
+            {**fixtures.next("llm_structured", "SearchQuery"), "ideator_name": name.strip()}
+            for name in PERSONA_NAMES.findall(prompt)
+        ]}
+    recorded = fixtures.next("llm_structured", schema_name)
+    if schema_name == "Perspectives" and ideator_count:
+        recorded["ideators"] = resize_ideators(recorded["ideators"], ideator_count)
+    return recorded
+
+
+def resize_ideators(ideators, count):
+    """Repeat recorded ideators (with numbered names) until there are `count` of them"""
+    resized = []
+    for index in range(count):
+        ideator = dict(ideators[index % len(ideators)])
+        if index >= len(ideators):
+            ideator["name"] = f"{ideator['name']} {index // len(ideators) + 1}"
+        resized.append(ideator)
+    return resized
+
+
+class ReplayTavily:
+    def __init__(self, fixtures, latency):
+        self.fixtures = fixtures
+        self.latency = latency
+
+    def search(self, **kwargs):
+        self.latency.sleep("tavily")
+        return self.fixtures.next("tavily")
+
+
+class ReplayResponse:
+    def __init__(self, data, status_code=200):
+        self._data = data
+        self.status_code = status_code
+
+    def json(self):
+        return self._data
+
+    def raise_for_status(self):
+        pass
+
+
+class ReplayRequests:
+    """Stand-in for the shared HTTP session as used by duckduckgo_search"""
+
+    def __init__(self, fixtures, latency):
+        self.fixtures = fixtures
+        self.latency = latency
+
+    def get(self, url, params=None, **kwargs):
+        self.latency.sleep("duckduckgo")
+        return ReplayResponse(self.fixtures.next("duckduckgo"))
+
+
+class ReplayYouTube:
+    """Stand-in for the googleapiclient YouTube resource: search().list(**params).execute(http=...)"""
+
+    def __init__(self, fixtures, latency):
+        self.fixtures = fixtures
+        self.latency = latency
+
+    def search(self):
+        return self
+
+    def list(self, **params):
+        return self
+
+    def execute(self, http=None, **kwargs):
+        self.latency.sleep("youtube")
+        return self.fixtures.next("youtube_search")
+
+
+class ReplayGemini:
+    """Stand-in for genai.Client: models.generate_content(...) returning .text and .usage_metadata"""
+
+    def __init__(self, fixtures, latency):
+        self.fixtures = fixtures
+        self.latency = latency
+        self.models = self
+
+    def generate_content(self, model=None, contents=None, config=None, **kwargs):
+        self.latency.sleep("gemini")
+        text = self.fixtures.next("gemini")
+        if getattr(config, "response_schema", None) is not None:
+            text = structured_video_analysis(text)
+        # A video of a few minutes is on the order of tens of thousands of input tokens
+        usage = SimpleNamespace(prompt_token_count=25000, candidates_token_count=approximate_tokens(text))
+        return SimpleNamespace(text=text, usage_metadata=usage)
+
+
+def structured_video_analysis(text):
+    """A recorded video analysis as Gemini's structured output returns it ({"segments": [...]})
+
+    Fixtures recorded without structured output hold free text with a JSON
+    array in it; text that is already structured passes through unchanged.
+    """
+    # The stub server serves these without importing cliphunt
+    if AGENT_DIR not in sys.path:
+        sys.path.insert(0, AGENT_DIR)
+    from segment_ranking import extract_json, find_segments
+    return json.dumps({"segments": find_segments(extract_json(text))})
+
+
+class NullCache:
+    """Cache stand-in that never hits, so every benchmark run exercises the full pipeline"""
+
+    def get(self, key, *args, **kwargs):
+        return None
+
+    def set(self, key, value):
+        pass
+
+
+class UnlimitedQuota:
+    def try_spend(self, units):
+        return True
+
+
+def import_cliphunt():
+    """Import cliphunt.py offline: dummy keys, no YouTube discovery fetch, no tracing, caches off"""
+    os.environ.setdefault("GOOGLE_API_KEY", "bench")
+    os.environ.setdefault("TAVILY_API_KEY", "bench")
+    # Set before cliphunt's load_dotenv() so a local .env can't re-enable them
+    os.environ["YOUTUBE_API_KEY"] = ""
+    os.environ["LANGSMITH_TRACING"] = "false"
+    os.environ["LANGCHAIN_TRACING_V2"] = "false"
+    os.environ["LLM_CACHE_ENABLED"] = "false"
+    os.environ["GEMINI_CACHE_ENABLED"] = "false"
+    os.environ["SEARCH_CACHE_ENABLED"] = "false"
+    os.environ["CLIPHUNT_CACHE_DIR"] = tempfile.mkdtemp(prefix="cliphunt-bench-")
+    if AGENT_DIR not in sys.path:
+        sys.path.insert(0, AGENT_DIR)
+    import cliphunt
+    return cliphunt
+
+
+def install(cliphunt, fixtures, latency, max_ideators=None):
+    """Swap cliphunt's external clients for replaying fakes"""
+    cliphunt.llm = ReplayLLM(fixtures, latency, max_ideators)
+    cliphunt.tavily = ReplayTavily(fixtures, latency)
+    cliphunt.http_session = ReplayRequests(fixtures, latency)
+    cliphunt.youtube = ReplayYouTube(fixtures, latency)
+    cliphunt.gemini_client = ReplayGemini(fixtures, latency)
+    cliphunt.search_cache = None
+    cliphunt.gemini_cache = None
+    cliphunt.youtube_cache = NullCache()
+    cliphunt.youtube_quota = UnlimitedQuota()
@@ -0,0 +1,159 @@
+"""
+Offline benchmark for the ClipHunt pipeline.
+
+Drives each node function in order, then the compiled graph at one or more
+concurrency levels, against recorded fixtures with injected latencies, and
+reports per-node and end-to-end p50/p95 latency plus throughput.
+
+    cd backend
+    python -m bench.run --runs 20 --concurrency 1,4,8 --profile realistic --latency-scale 0.05
+"""
+
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from bench.replay import (
+    DEFAULT_FIXTURES,
+    LATENCY_DISTRIBUTIONS,
+    LATENCY_PROFILES,
+    Fixtures,
+    Latency,
+    import_cliphunt,
+    install,
+    parse_latency_override,
+)
+
+
+def percentile(values, q):
+    """Linear-interpolated percentile (q in 0-100) of a non-empty list"""
+    ordered = sorted(values)
+    if len(ordered) == 1:
+        return ordered[0]
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def latency_stats(samples):
+    return {
+        "count": len(samples),
+        "p50_ms": round(percentile(samples, 50) * 1000, 2),
+        "p95_ms": round(percentile(samples, 95) * 1000, 2),
+    }
+
+
+def bench_nodes(cliphunt, topic, max_ideators, repeats):
+    """Call every node function directly, in graph order, feeding each one the accumulated state"""
+    node_samples = {name: [] for name in cliphunt.workflow.nodes}
+    for _ in range(repeats):
+        state = {"topic": topic, "max_ideators": max_ideators}
+        for name in cliphunt.workflow.nodes:
+            node = getattr(cliphunt, name)
+            start_time = time.perf_counter()
+            update = node(state)
+            node_samples[name].append(time.perf_counter() - start_time)
+            state.update(update)
+    return {name: latency_stats(samples) for name, samples in node_samples.items()}
+
+
+def run_graph_once(graph, topic, max_ideators):
+    """One full graph run; returns (end-to-end seconds, {node: seconds}) using the nodes' own node_metrics"""
+    node_seconds = {}
+    start_time = time.perf_counter()
+    for chunk in graph.stream({"topic": topic, "max_ideators": max_ideators}, stream_mode="updates"):
+        for node, update in chunk.items():
+            for node_metrics in (update or {}).get("node_metrics", []):
+                node_seconds[node] = node_metrics["seconds"]
+    return time.perf_counter() - start_time, node_seconds
+
+
+def bench_graph(graph, topic, max_ideators, runs, concurrency):
+    """`runs` graph runs with `concurrency` of them in flight at a time"""
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda _: run_graph_once(graph, topic, max_ideators), range(runs)))
+    elapsed = time.perf_counter() - start_time
+
+    node_samples = {}
+    for _, node_seconds in results:
+        for node, seconds in node_seconds.items():
+            node_samples.setdefault(node, []).append(seconds)
+    return {
+        "concurrency": concurrency,
+        "runs": runs,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_runs_per_s": round(runs / elapsed, 3),
+        "end_to_end": latency_stats([total for total, _ in results]),
+        # Report nodes in graph order, whatever order parallel branches finished in
+        "nodes": {node: latency_stats(node_samples[node]) for node in graph.builder.nodes if node in node_samples},
+    }
+
+
+def print_table(title, rows):
+    print(f"\n{title}")
+    print(f"  {'node':<28} {'p50 ms':>10} {'p95 ms':>10}")
+    for name, stats in rows.items():
+        print(f"  {name:<28} {stats['p50_ms']:>10.1f} {stats['p95_ms']:>10.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline ClipHunt pipeline benchmark")
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURES, help="recorded fixture file (see bench/record.py)")
+    parser.add_argument("--topic", help="topic to run (defaults to the fixture's topic)")
+    parser.add_argument("--ideators", type=int, default=3, help="max_ideators for every run")
+    parser.add_argument("--runs", type=int, default=10, help="graph runs per concurrency level")
+    parser.add_argument("--concurrency", default="1", help="comma-separated concurrency levels, e.g. 1,4,8")
+    parser.add_argument("--node-repeats", type=int, default=5, help="sequential passes over the node functions (0 to skip)")
+    parser.add_argument("--profile", choices=sorted(LATENCY_PROFILES), default="zero", help="injected latency profile")
+    parser.add_argument("--distribution", choices=LATENCY_DISTRIBUTIONS, default="gaussian", help="shape of the injected latency")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="multiply all injected latencies")
+    parser.add_argument("--latency", action="append", default=[], metavar="SERVICE=MEAN[:JITTER]",
+                        help="override one service's latency in ms (llm, tavily, duckduckgo, youtube, gemini)")
+    parser.add_argument("--gemini-rps", type=float,
+                        help="override the shared Gemini rate limit, 0 = unlimited (defaults to GEMINI_REQUESTS_PER_SECOND)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for latency jitter")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args(argv)
+
+    cliphunt = import_cliphunt()
+    from scheduler import TokenBucket
+    fixtures = Fixtures(args.fixtures)
+    latency = Latency(args.profile, args.latency_scale, dict(map(parse_latency_override, args.latency)), args.seed, args.distribution)
+    install(cliphunt, fixtures, latency, args.ideators)
+    if args.gemini_rps is not None:
+        cliphunt.gemini_rate_limiter = TokenBucket(args.gemini_rps, capacity=cliphunt.gemini_max_concurrency) if args.gemini_rps > 0 else None
+    topic = args.topic or fixtures.topic
+
+    report = {
+        "topic": topic,
+        "ideators": args.ideators,
+        "profile": args.profile,
+        "distribution": args.distribution,
+        "latency_scale": args.latency_scale,
+        "latencies_ms": latency.delays,
+        "nodes": bench_nodes(cliphunt, topic, args.ideators, args.node_repeats) if args.node_repeats > 0 else {},
+        "graph": [],
+    }
+    print(f"📊 Benchmarking '{topic}' with {args.ideators} ideators, profile={args.profile} x{args.latency_scale}")
+    if report["nodes"]:
+        print_table(f"Node functions ({args.node_repeats} sequential passes)", report["nodes"])
+
+    for concurrency in [int(level) for level in args.concurrency.split(",")]:
+        result = bench_graph(cliphunt.graph, topic, args.ideators, args.runs, concurrency)
+        report["graph"].append(result)
+        print_table(f"Graph, {result['runs']} runs at concurrency {concurrency}", result["nodes"])
+        print(f"  {'end-to-end':<28} {result['end_to_end']['p50_ms']:>10.1f} {result['end_to_end']['p95_ms']:>10.1f}")
+        print(f"  throughput: {result['throughput_runs_per_s']} runs/s ({result['elapsed_s']} s)")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✅ Report written to {args.json}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Microbenchmarks for segment extraction and ranking in parse_video_analysis,
+on large synthetic Gemini analyses (hundreds to thousands of segments).
+
+The baseline is the previous implementation: line-by-line fence stripping,
+json.loads, a str.count loop per keyword and two full sorts. Both must pick
+the same segments on well-formed input. The recovery table shows how many
+segments each one gets out of damaged responses.
+
+    cd backend
+    python -m bench.segment_ranking --segments 100,500,2000
+"""
+
+import argparse
+import json
+import random
+import timeit
+
+from bench.replay import import_cliphunt
+
+WORDS = ("crowd", "dunk", "timeout", "replay", "bench", "coach", "three", "pointer", "fast", "break", "rebound",
+         "arena", "highlight", "fans", "defense", "assist", "quarter", "buzzer", "interview", "locker", "room")
+KEYWORDS = ["lebron james", "lebron", "fadeaway", "scoring record", "kareem"]
+
+
+def synthetic_analysis(count, seed=0):
+    """A fenced JSON array of `count` segments with keywords sprinkled in"""
+    rng = random.Random(seed)
+    segments = []
+    for index in range(count):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(12, 30))]
+        for _ in range(rng.choice((0, 0, 0, 1, 2, 3))):
+            words.insert(rng.randrange(len(words)), rng.choice(KEYWORDS))
+        start = index * 7
+        segments.append({"start": f"{start // 60:02d}:{start % 60:02d}", "end": f"{(start + 6) // 60:02d}:{(start + 6) % 60:02d}",
+                         "content": " ".join(words).capitalize() + "."})
+    rng.shuffle(segments)
+    return "```json\n" + json.dumps(segments, indent=2) + "\n```"
+
+
+def legacy_parse(analysis_text, keywords):
+    """parse_video_analysis before the segment_ranking module, minus the pydantic models"""
+    analysis_text = analysis_text.strip()
+    if analysis_text.startswith('```json') or analysis_text.startswith('```'):
+        json_lines = []
+        in_json_block = False
+        for line in analysis_text.split('\n'):
+            if line.strip().startswith('```json') or line.strip() == '```':
+                in_json_block = True
+                continue
+            elif line.strip() == '```' and in_json_block:
+                break
+            elif in_json_block:
+                json_lines.append(line)
+        json_text = '\n'.join(json_lines)
+    else:
+        json_text = analysis_text
+    try:
+        analysis_data = json.loads(json_text)
+    except json.JSONDecodeError:
+        return []
+    video_segments = []
+    if isinstance(analysis_data, list):
+        video_segments = [segment for segment in analysis_data if all(k in segment for k in ('start', 'end', 'content'))]
+    keywords_lower = [k.lower() for k in keywords]
+    video_segments = sorted(
+        video_segments,
+        key=lambda segment: sum(segment['content'].lower().count(keyword) for keyword in keywords_lower),
+        reverse=True
+    )[:3]
+
+    def to_seconds(time_str):
+        parts = [int(p) for p in time_str.split(":")]
+        return parts[0] * 60 + parts[1] if len(parts) == 2 else 0
+
+    return sorted(video_segments, key=lambda segment: to_seconds(segment['start']))
+
+
+def damaged_variants(text):
+    """Responses the models actually return now and then"""
+    body = text[text.index("["):text.rindex("]") + 1]
+    return {
+        "fenced": text,
+        "prose before fence": "Here is the analysis of the video:\n" + text,
+        # The old fence stripper treated the closing fence as an opening one and kept reading
+        "prose after fence": text + "\nLet me know if you need more detail.",
+        "prose around bare JSON": "Sure! " + body + "\nThese are the most relevant moments.",
+        "truncated array": text[:len(text) * 2 // 3],
+        "unclosed fence": text[:text.rindex("```")],
+        "object wrapper": "```json\n" + json.dumps({"segments": json.loads(body)}) + "\n```",
+    }
+
+
+def best_ms(function, repeats, number):
+    return min(timeit.repeat(function, repeat=repeats, number=number)) / number * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Segment extraction and ranking microbenchmarks")
+    parser.add_argument("--segments", default="100,500,2000", help="comma-separated segment counts per analysis")
+    parser.add_argument("--repeats", type=int, default=5, help="timing repeats (best one is reported)")
+    parser.add_argument("--number", type=int, default=20, help="calls per timing repeat")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args(argv)
+
+    import_cliphunt()
+    from segment_ranking import KeywordMatcher, extract_json, find_segments, rank_segments
+
+    def parse(text):
+        return rank_segments(find_segments(extract_json(text)), KEYWORDS, k=3)
+
+    report = {"timings": [], "recovery": []}
+    print(f"⏱️ Segment extraction and ranking, best of {args.repeats} x {args.number} calls")
+    print(f"  {'segments':>8} {'stage':<10} {'legacy ms':>10} {'new ms':>9} {'speedup':>8}")
+    for count in [int(count) for count in args.segments.split(",")]:
+        text = synthetic_analysis(count)
+        assert parse(text) == legacy_parse(text, KEYWORDS), "rankings differ from the legacy implementation"
+        segments = find_segments(extract_json(text))
+        keywords_lower = [keyword.lower() for keyword in KEYWORDS]
+        matcher = KeywordMatcher(KEYWORDS)
+        stages = {
+            "scoring": (lambda: [sum(s["content"].lower().count(k) for k in keywords_lower) for s in segments],
+                        lambda: matcher.scores([s["content"] for s in segments])),
+            "end to end": (lambda: legacy_parse(text, KEYWORDS), lambda: parse(text)),
+        }
+        for stage, (legacy, new) in stages.items():
+            legacy_ms = best_ms(legacy, args.repeats, args.number)
+            new_ms = best_ms(new, args.repeats, args.number)
+            print(f"  {count:>8} {stage:<10} {legacy_ms:>10.3f} {new_ms:>9.3f} {legacy_ms / new_ms:>7.2f}x")
+            report["timings"].append({"segments": count, "stage": stage, "legacy_ms": round(legacy_ms, 4),
+                                      "new_ms": round(new_ms, 4), "speedup": round(legacy_ms / new_ms, 2)})
+
+    print("\n🩹 Segments recovered from damaged responses (500 segments)")
+    print(f"  {'response':<24} {'legacy':>7} {'new':>7}")
+    for name, text in damaged_variants(synthetic_analysis(500)).items():
+        legacy_found = len(legacy_parse(text, KEYWORDS))
+        new_found = len(parse(text))
+        print(f"  {name:<24} {legacy_found:>7} {new_found:>7}")
+        report["recovery"].append({"response": name, "legacy_segments": legacy_found, "new_segments": new_found})
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✅ Report written to {args.json}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Serialized graph state size after every node, with large text fields kept
+inline and with them offloaded to the blob store (BLOB_STORE_ENABLED).
+
+The state after each node is what a checkpointer writes and what a
+"values" stream sends, so the per-node sum is the total serialized for one
+run. Sizes are JSON bytes of the state as the API server would encode it.
+
+    cd backend
+    python -m bench.state_size --ideators 3,8
+"""
+
+import argparse
+import json
+import tempfile
+
+from bench.replay import DEFAULT_FIXTURES, Fixtures, Latency, import_cliphunt, install
+
+MODES = ("inline", "blob_store")
+
+
+def state_sizes(cliphunt, topic, max_ideators):
+    """[(node, serialized state bytes after it)] for one offline graph run
+
+    Nodes that run in the same step (create_ideators and create_scriptor)
+    share one entry, since the state is only written once per step.
+    """
+    from graph_client import to_jsonable
+    sizes = []
+    step_nodes = []
+    run_input = {"topic": topic, "max_ideators": max_ideators}
+    for mode, chunk in cliphunt.graph.stream(run_input, stream_mode=["updates", "values"]):
+        if mode == "updates":
+            step_nodes.extend(chunk)
+        elif step_nodes:
+            sizes.append((" + ".join(step_nodes), len(json.dumps(to_jsonable(chunk), ensure_ascii=False).encode("utf-8"))))
+            step_nodes = []
+    return sizes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Graph state size per node, inline vs blob store")
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURES, help="recorded fixture file (see bench/record.py)")
+    parser.add_argument("--ideators", default="3,8", help="comma-separated ideator counts")
+    parser.add_argument("--min-bytes", type=int, default=512, help="smallest text moved to the blob store")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args(argv)
+
+    cliphunt = import_cliphunt()
+    from blob_store import BlobStore
+    fixtures = Fixtures(args.fixtures)
+    blob_store_setting = cliphunt.blob_store
+
+    report = {"min_bytes": args.min_bytes, "results": []}
+    try:
+        for count in [int(count) for count in args.ideators.split(",")]:
+            runs = {}
+            for mode in MODES:
+                install(cliphunt, fixtures, Latency(), count)
+                cliphunt.blob_store = BlobStore(tempfile.mkdtemp(prefix="cliphunt-blobs-"), args.min_bytes) if mode == "blob_store" else None
+                runs[mode] = state_sizes(cliphunt, fixtures.topic, count)
+
+            print(f"\n📦 Serialized state after each node, {count} ideators")
+            print(f"  {'node':<40} {'inline KB':>10} {'blob KB':>10} {'saved':>7}")
+            nodes = []
+            for (node, inline_bytes), (_, blob_bytes) in zip(runs["inline"], runs["blob_store"]):
+                saved_pct = round(100 * (1 - blob_bytes / inline_bytes), 1)
+                print(f"  {node:<40} {inline_bytes / 1024:>10.1f} {blob_bytes / 1024:>10.1f} {saved_pct:>6.1f}%")
+                nodes.append({"node": node, "inline_bytes": inline_bytes, "blob_bytes": blob_bytes, "saved_pct": saved_pct})
+            total = {mode: sum(size for _, size in runs[mode]) for mode in MODES}
+            total_saved_pct = round(100 * (1 - total["blob_store"] / total["inline"]), 1)
+            print(f"  {'all nodes (one run)':<40} {total['inline'] / 1024:>10.1f} {total['blob_store'] / 1024:>10.1f} {total_saved_pct:>6.1f}%")
+            report["results"].append({"ideators": count, "nodes": nodes, "total_inline_bytes": total["inline"],
+                                      "total_blob_bytes": total["blob_store"], "total_saved_pct": total_saved_pct})
+    finally:
+        cliphunt.blob_store = blob_store_setting
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✅ Report written to {args.json}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+"""
+Local stand-ins for every service the ClipHunt backend talks to, for load
+testing without API keys or quotas:
+
+- a LangGraph dev API stub (threads, runs/stream SSE, thread state) that
+  replays the node updates of a real graph run, for api_server.py / asgi_server.py
+  in proxy mode
+- HTTP fakes for Tavily (/search), DuckDuckGo (/duckduckgo/), YouTube search
+  (/youtube/v3/search) and Gemini generateContent (/v1beta/models/...), for
+  cliphunt.py itself (langgraph dev or embedded mode)
+
+All of them serve the recorded fixtures from bench/replay.py, with per-service
+(and per-node) latency distributions and error rates.
+
+    cd backend
+    python -m bench.stubs --profile realistic --latency-scale 0.1 --error-rate gemini=0.05
+
+    # API server in proxy mode against the LangGraph stub
+    LANGGRAPH_DEV_URL=http://localhost:12024 python run_api.py
+
+    # or the real graph against the HTTP fakes
+    GOOGLE_GEMINI_BASE_URL=http://localhost:12024 TAVILY_API_BASE_URL=http://localhost:12024 \\
+    DUCKDUCKGO_API_URL=http://localhost:12024/duckduckgo/ YOUTUBE_API_BASE_URL=http://localhost:12024 \\
+    GOOGLE_API_KEY=stub TAVILY_API_KEY=stub YOUTUBE_API_KEY=stub GRAPH_EXECUTION_MODE=embedded python run_api.py
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+
+from flask import Flask, Response, jsonify, request
+
+from bench.replay import (
+    DEFAULT_FIXTURES,
+    LATENCY_DISTRIBUTIONS,
+    LATENCY_PROFILES,
+    Fixtures,
+    Latency,
+    approximate_tokens,
+    import_cliphunt,
+    install,
+    parse_latency_override,
+    structured_response,
+    structured_video_analysis,
+)
+
+# Per-node latencies (mean ms, jitter ms) for the LangGraph stub, on top of the service profiles.
+# Nodes are replayed one after another, so create_scriptor (which really runs alongside
+# create_ideators/conduct_research) only gets a token delay.
+NODE_LATENCY_PROFILES = {
+    "zero": {},
+    "realistic": {
+        "create_ideators": (2500, 800),
+        "conduct_research": (9000, 3000),
+        "create_scriptor": (100, 50),
+        "create_script": (6000, 2000),
+        "extract_keywords": (2000, 600),
+        "search_youtube_api": (800, 300),
+        "understand_youtube_videos": (25000, 8000),
+        "parse_video_analysis": (3000, 1000),
+        "generate_final_structure": (1500, 500),
+    },
+}
+STUB_LATENCY_PROFILES = {
+    name: {**LATENCY_PROFILES[name], **NODE_LATENCY_PROFILES[name]} for name in LATENCY_PROFILES
+}
+
+# ideator_instructions asks for "the top {max_ideators} themes"
+IDEATOR_COUNT = re.compile(r"top (\d+) themes")
+
+
+def parse_error_rate(text):
+    """'gemini=0.05' -> ('gemini', 0.05); the service may also be 'langgraph' (whole runs) or a node name"""
+    service, _, rate = text.partition("=")
+    return service, float(rate)
+
+
+class Faults:
+    """Decides which requests fail, per service, at a fixed rate"""
+
+    def __init__(self, rates=None, seed=None):
+        self.rates = dict(rates or {})
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def should_fail(self, service):
+        rate = self.rates.get(service, 0)
+        if rate <= 0:
+            return False
+        with self._lock:
+            return self._random.random() < rate
+
+    def pick(self, service, choices):
+        """A random element of `choices` to fail at for this service's failure rate, or None"""
+        if not choices or not self.should_fail(service):
+            return None
+        with self._lock:
+            return self._random.choice(choices)
+
+
+class RecordedRun:
+    """Node updates ("updates" stream chunks) of one offline graph run per max_ideators"""
+
+    def __init__(self, fixtures):
+        self.fixtures = fixtures
+        self._runs = {}
+        self._lock = threading.Lock()
+
+    def chunks(self, topic, max_ideators):
+        with self._lock:
+            if max_ideators not in self._runs:
+                self._runs[max_ideators] = self._record(topic, max_ideators)
+            return self._runs[max_ideators]
+
+    def _record(self, topic, max_ideators):
+        from graph_client import to_jsonable
+        cliphunt = import_cliphunt()
+        install(cliphunt, self.fixtures, Latency(), max_ideators)
+        print(f"📼 Recording stub node updates for {max_ideators} ideators")
+        run_input = {"topic": topic, "max_ideators": max_ideators}
+        return [to_jsonable(chunk) for chunk in cliphunt.graph.stream(run_input, stream_mode="updates")]
+
+
+def sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def create_app(fixtures, latency, faults):
+    app = Flask(__name__)
+    recorded_run = RecordedRun(fixtures)
+    # thread id -> {"values": accumulated state, "next": pending nodes, "position": next chunk index}
+    threads = {}
+    threads_lock = threading.Lock()
+
+    def service_error(service):
+        return jsonify({"error": {"code": 503, "message": f"Injected {service} failure", "status": "UNAVAILABLE"}}), 503
+
+    # LangGraph dev API
+
+    @app.get("/ok")
+    def ok():
+        return {"ok": True}
+
+    @app.post("/threads")
+    def create_thread():
+        thread_id = str(uuid.uuid4())
+        with threads_lock:
+            threads[thread_id] = {"values": {}, "next": [], "position": 0}
+        return {"thread_id": thread_id, "metadata": (request.get_json(silent=True) or {}).get("metadata", {})}
+
+    @app.get("/threads/<thread_id>/state")
+    def thread_state(thread_id):
+        with threads_lock:
+            thread = threads.get(thread_id)
+        if thread is None:
+            return {"detail": f"Thread {thread_id} not found"}, 404
+        return {"values": thread["values"], "next": thread["next"]}
+
+    @app.post("/threads/<thread_id>/runs/stream")
+    def stream_run(thread_id):
+        payload = request.get_json(silent=True) or {}
+        with threads_lock:
+            thread = threads.setdefault(thread_id, {"values": {}, "next": [], "position": 0})
+        run_input = payload.get("input")
+        if run_input is not None:
+            # Fresh input restarts the thread; input None resumes after its last completed node
+            thread.update(values=dict(run_input), next=[], position=0)
+        values = thread["values"]
+        chunks = recorded_run.chunks(fixtures.topic, int(values.get("max_ideators", 3)))
+        stream_modes = payload.get("stream_mode") or ["values"]
+        if isinstance(stream_modes, str):
+            stream_modes = [stream_modes]
+
+        # "langgraph" is the fraction of runs that fail, at a random remaining node
+        failing_position = faults.pick("langgraph", range(thread["position"], len(chunks)))
+
+        def generate():
+            yield sse("metadata", {"run_id": str(uuid.uuid4()), "attempt": 1})
+            for position in range(thread["position"], len(chunks)):
+                chunk = chunks[position]
+                node = next(iter(chunk))
+                delay = latency.sample(node)
+                if delay:
+                    time.sleep(delay)
+                if position == failing_position or faults.should_fail(node):
+                    thread.update(next=[node], position=position)
+                    yield sse("error", {"error": "StubError", "message": f"Injected failure in {node}"})
+                    return
+                update = {
+                    node: {
+                        **chunk[node],
+                        # Report the injected delay, so /metrics and Server-Timing look like a real run
+                        "node_metrics": [{**metrics, "seconds": round(delay, 4)} for metrics in chunk[node].get("node_metrics", [])],
+                    }
+                }
+                values.update({key: value for key, value in update[node].items() if key != "node_metrics"})
+                thread.update(next=[], position=position + 1)
+                if "updates" in stream_modes:
+                    yield sse("updates", update)
+                if "values" in stream_modes:
+                    yield sse("values", values)
+
+        return Response(generate(), mimetype="text/event-stream")
+
+    # Tavily
+
+    @app.post("/search")
+    def tavily_search():
+        latency.sleep("tavily")
+        if faults.should_fail("tavily"):
+            return service_error("tavily")
+        return jsonify(fixtures.next("tavily"))
+
+    # DuckDuckGo Instant Answer API
+
+    @app.get("/duckduckgo/")
+    def duckduckgo():
+        latency.sleep("duckduckgo")
+        if faults.should_fail("duckduckgo"):
+            return service_error("duckduckgo")
+        return jsonify(fixtures.next("duckduckgo"))
+
+    # YouTube Data API search.list
+
+    @app.get("/youtube/v3/search")
+    def youtube_search():
+        latency.sleep("youtube")
+        if faults.should_fail("youtube"):
+            return service_error("youtube")
+        return jsonify(fixtures.next("youtube_search"))
+
+    # Gemini generateContent: video analyses (fileData parts, structured with responseSchema),
+    # structured LLM output (responseJsonSchema, served by schema title) and plain chat completions
+
+    @app.post("/v1beta/models/<path:model_action>")
+    def generate_content(model_action):
+        model, _, action = model_action.partition(":")
+        if action != "generateContent":
+            return {"error": {"code": 404, "message": f"Unsupported method {action}", "status": "NOT_FOUND"}}, 404
+        body = request.get_json(silent=True) or {}
+        parts = [part for content in body.get("contents", []) for part in content.get("parts", [])]
+        # LangChain sends system messages as systemInstruction, outside contents
+        system_parts = (body.get("systemInstruction") or {}).get("parts", [])
+        prompt = "\n".join(part.get("text", "") for part in system_parts + parts)
+        generation_config = body.get("generationConfig") or {}
+        schema = generation_config.get("responseJsonSchema")
+
+        if any("fileData" in part for part in parts):
+            service, text, prompt_tokens = "gemini", fixtures.next("gemini"), 25000
+            if generation_config.get("responseSchema"):
+                text = structured_video_analysis(text)
+        elif schema:
+            service, prompt_tokens = "llm", approximate_tokens(prompt)
+            ideator_count = IDEATOR_COUNT.search(prompt)
+            recorded = structured_response(fixtures, schema.get("title"), prompt, int(ideator_count.group(1)) if ideator_count else None)
+            text = json.dumps(recorded)
+        else:
+            service, text, prompt_tokens = "llm", fixtures.next("llm_text"), approximate_tokens(prompt)
+
+        latency.sleep(service)
+        if faults.should_fail(service):
+            return service_error(service)
+        return jsonify({
+            "candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": "STOP", "index": 0}],
+            "usageMetadata": {
+                "promptTokenCount": prompt_tokens,
+                "candidatesTokenCount": approximate_tokens(text),
+                "totalTokenCount": prompt_tokens + approximate_tokens(text),
+            },
+            "modelVersion": model,
+        })
+
+    return app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local LangGraph, Tavily, DuckDuckGo, YouTube and Gemini stubs for load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=12024)
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURES, help="recorded fixture file (see bench/record.py)")
+    parser.add_argument("--profile", choices=sorted(STUB_LATENCY_PROFILES), default="zero", help="latency profile for services and graph nodes")
+    parser.add_argument("--distribution", choices=LATENCY_DISTRIBUTIONS, default="lognormal", help="shape of the injected latency")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="multiply all injected latencies")
+    parser.add_argument("--latency", action="append", default=[], metavar="SERVICE=MEAN[:JITTER]",
+                        help="override one service's or node's latency in ms (llm, tavily, duckduckgo, youtube, gemini, <node>)")
+    parser.add_argument("--error-rate", action="append", default=[], metavar="SERVICE=RATE",
+                        help="fraction of failing calls (llm, tavily, duckduckgo, youtube, gemini, <node>) or runs (langgraph)")
+    parser.add_argument("--seed", type=int, help="random seed for latency jitter and injected failures")
+    args = parser.parse_args(argv)
+
+    fixtures = Fixtures(args.fixtures)
+    latency = Latency(args.profile, args.latency_scale, dict(map(parse_latency_override, args.latency)),
+                      args.seed, args.distribution, profiles=STUB_LATENCY_PROFILES)
+    faults = Faults(dict(map(parse_error_rate, args.error_rate)), args.seed)
+    print(f"🧪 Stubs on http://{args.host}:{args.port} (profile={args.profile} x{args.latency_scale}, {args.distribution}, errors={faults.rates or 'none'})")
+    create_app(fixtures, latency, faults).run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""
+Single-flight coalescing of identical generation requests.
+
+Concurrent requests for the same normalized topic and parameters attach to one
+running generation and replay its progress events from the start; finished
+generations are kept for a short time so near-simultaneous repeats are free.
+"""
+
+import asyncio
+import os
+import threading
+import time
+
+import requests
+
+from graph_client import CONNECTION_ERROR_MESSAGE
+
+COALESCE_REQUESTS = os.getenv("COALESCE_REQUESTS", "true").lower() == "true"
+COALESCE_RESULT_TTL = float(os.getenv("COALESCE_RESULT_TTL", "60"))
+
+
+def coalesce_key(topic, max_ideators, thread_id=None):
+    """Requests are identical when their case/whitespace-normalized topic and parameters match"""
+    return " ".join(str(topic).lower().split()), int(max_ideators), thread_id
+
+
+def error_event(error, connection_errors, thread_id):
+    """Error event for a failed generation, with the HTTP status the wrappers should answer with
+
+    The thread id (once known) lets clients retry by resuming the thread from its last checkpoint.
+    """
+    if isinstance(error, connection_errors):
+        event = {'event': 'error', 'error': CONNECTION_ERROR_MESSAGE, 'status': 503}
+    else:
+        event = {'event': 'error', 'error': str(error), 'status': 500}
+    if thread_id is not None:
+        event['thread_id'] = thread_id
+    return event
+
+
+class SharedGeneration:
+    """Progress events of one generation, replayable by any number of subscribers"""
+
+    def __init__(self):
+        self.events = []
+        self.done = False
+        self.failed = False
+        self.finished_at = None
+
+    def expired(self, now, ttl):
+        return self.done and (self.failed or now - self.finished_at > ttl)
+
+
+class GenerationCoalescer:
+    """Thread-based coalescer: each distinct generation runs on its own background thread
+
+    The run is not tied to the request that started it, so the remaining
+    subscribers still get the result if the first client disconnects.
+    run_events(topic, max_ideators, thread_id) yields the run's progress
+    events; thread_id is None for a new run, or the thread to resume.
+    """
+
+    def __init__(self, run_events, result_ttl=COALESCE_RESULT_TTL, enabled=COALESCE_REQUESTS,
+                 connection_errors=(requests.exceptions.ConnectionError,)):
+        self.run_events = run_events
+        self.connection_errors = connection_errors
+        self.result_ttl = result_ttl
+        self.enabled = enabled
+        self._generations = {}
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+
+    def attach(self, topic, max_ideators, thread_id=None):
+        """Join the in-flight (or recently finished) generation for these parameters, or start one"""
+        key = coalesce_key(topic, max_ideators, thread_id)
+        with self._lock:
+            now = time.time()
+            for stale_key in [k for k, g in self._generations.items() if g.expired(now, self.result_ttl)]:
+                del self._generations[stale_key]
+            generation = self._generations.get(key) if self.enabled else None
+            if generation is None:
+                generation = SharedGeneration()
+                if self.enabled:
+                    self._generations[key] = generation
+                threading.Thread(target=self._run, args=(generation, topic, max_ideators, thread_id), daemon=True).start()
+            else:
+                print(f"🔗 {'Reusing recent' if generation.done else 'Attached to in-flight'} generation for: {topic}")
+        return generation
+
+    def _run(self, generation, topic, max_ideators, thread_id):
+        try:
+            for event in self.run_events(topic, max_ideators, thread_id):
+                thread_id = event.get('thread_id', thread_id)
+                with self._changed:
+                    generation.events.append(event)
+                    self._changed.notify_all()
+        except Exception as e:
+            with self._changed:
+                generation.events.append(error_event(e, self.connection_errors, thread_id))
+                generation.failed = True
+        with self._changed:
+            generation.done = True
+            generation.finished_at = time.time()
+            self._changed.notify_all()
+
+    def subscribe(self, generation):
+        """Yield every event of the generation, from the first one, until it finishes"""
+        index = 0
+        while True:
+            with self._changed:
+                while index >= len(generation.events) and not generation.done:
+                    self._changed.wait()
+                batch = generation.events[index:]
+                index += len(batch)
+                finished = generation.done and index >= len(generation.events)
+            yield from batch
+            if finished:
+                return
+
+    def events(self, topic, max_ideators, thread_id=None):
+        """Progress events for these parameters, shared with any identical concurrent request"""
+        return self.subscribe(self.attach(topic, max_ideators, thread_id))
+
+
+class AsyncGenerationCoalescer:
+    """asyncio counterpart of GenerationCoalescer: each distinct generation runs as a background task"""
+
+    def __init__(self, run_events, result_ttl=COALESCE_RESULT_TTL, enabled=COALESCE_REQUESTS,
+                 connection_errors=(requests.exceptions.ConnectionError,)):
+        self.run_events = run_events
+        self.connection_errors = connection_errors
+        self.result_ttl = result_ttl
+        self.enabled = enabled
+        self._generations = {}
+        self._tasks = set()
+        self._changed = asyncio.Condition()
+
+    def attach(self, topic, max_ideators, thread_id=None):
+        """Join the in-flight (or recently finished) generation for these parameters, or start one"""
+        key = coalesce_key(topic, max_ideators, thread_id)
+        now = time.time()
+        for stale_key in [k for k, g in self._generations.items() if g.expired(now, self.result_ttl)]:
+            del self._generations[stale_key]
+        generation = self._generations.get(key) if self.enabled else None
+        if generation is None:
+            generation = SharedGeneration()
+            if self.enabled:
+                self._generations[key] = generation
+            task = asyncio.create_task(self._run(generation, topic, max_ideators, thread_id))
+            # Keep a reference so the task isn't garbage collected while subscribers come and go
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        else:
+            print(f"🔗 {'Reusing recent' if generation.done else 'Attached to in-flight'} generation for: {topic}")
+        return generation
+
+    async def _run(self, generation, topic, max_ideators, thread_id):
+        try:
+            async for event in self.run_events(topic, max_ideators, thread_id):
+                thread_id = event.get('thread_id', thread_id)
+                async with self._changed:
+                    generation.events.append(event)
+                    self._changed.notify_all()
+        except Exception as e:
+            async with self._changed:
+                generation.events.append(error_event(e, self.connection_errors, thread_id))
+                generation.failed = True
+        async with self._changed:
+            generation.done = True
+            generation.finished_at = time.time()
+            self._changed.notify_all()
+
+    async def subscribe(self, generation):
+        """Yield every event of the generation, from the first one, until it finishes"""
+        index = 0
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: index < len(generation.events) or generation.done)
+                batch = generation.events[index:]
+                index += len(batch)
+                finished = generation.done and index >= len(generation.events)
+            for event in batch:
+                yield event
+            if finished:
+                return
+
+    def events(self, topic, max_ideators, thread_id=None):
+        """Progress events for these parameters, shared with any identical concurrent request"""
+        return self.subscribe(self.attach(topic, max_ideators, thread_id))
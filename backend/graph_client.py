@@ -0,0 +1,317 @@
+"""
+Framework-agnostic helpers for running the ClipHunt graph, either through the
+LangGraph dev API (proxy mode) or in-process (embedded mode), shared by the
+Flask (api_server.py) and ASGI (asgi_server.py) servers
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import threading
+import uuid
+from enum import Enum
+
+import requests
+from pydantic import BaseModel
+
+from metrics import registry
+
+# LangGraph dev API endpoint
+LANGGRAPH_DEV_URL = os.getenv("LANGGRAPH_DEV_URL", "http://localhost:2024")
+
+SSE_HEADERS = {
+    "Content-Type": "application/json",
+    "Accept": "text/event-stream"
+}
+
+# "proxy" forwards runs to the LangGraph dev server (LangSmith-traced deployments);
+# "embedded" imports the graph and runs it in this process, skipping the HTTP hop and state re-serialization
+EXECUTION_MODE = os.getenv("GRAPH_EXECUTION_MODE", "proxy")
+
+# Embedded runs checkpoint every superstep here, so a failed run can be resumed by thread id
+# ("none" disables it); in proxy mode the LangGraph dev server persists threads itself
+GRAPH_CHECKPOINTER = os.getenv("GRAPH_CHECKPOINTER", "sqlite")
+CHECKPOINT_DB_PATH = os.getenv("CHECKPOINT_DB_PATH") or os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "checkpoints.sqlite")
+
+MAX_IDEATORS_ERROR = "max_ideators must be a positive integer"
+
+CONNECTION_ERROR_MESSAGE = "Could not connect to LangGraph dev server. Make sure 'langgraph dev' is running on port 2024."
+
+
+class LangGraphError(Exception):
+    """Raised when the LangGraph dev API returns an error response"""
+
+
+def run_payload(topic, max_ideators, stream_mode):
+    """Request body for POST /threads/<id>/runs/stream"""
+    return {
+        "assistant_id": "ClipHunt",
+        "input": {
+            "topic": topic,
+            "max_ideators": max_ideators
+        },
+        "stream_mode": [stream_mode]
+    }
+
+
+class SSEParser:
+    """Incremental parser turning SSE lines into (event, raw data string) pairs"""
+
+    def __init__(self):
+        self.event = None
+
+    def feed(self, line):
+        """Consume one line; return (event, data) when the line completes a data field, else None"""
+        if not line:
+            self.event = None
+            return None
+        if line.startswith('event: '):
+            self.event = line[7:].strip()
+        elif line.startswith('data: '):
+            data_str = line[6:]  # Remove "data: " prefix
+            if data_str.strip():
+                return self.event, data_str
+        return None
+
+
+def decode_event(data_str):
+    """Decode an SSE data payload, or None if it isn't valid JSON"""
+    try:
+        return json.loads(data_str)
+    except json.JSONDecodeError:
+        return None
+
+
+def summarize_update(node, update):
+    """Turn one node's state update into client-facing progress events
+
+    Raw search text and full Gemini analyses stay server-side; everything
+    the UI needs to render progress (personas, insights, script, keywords,
+    per-range clips) is forwarded. The node's instrumentation (wall time,
+    tokens, external calls, cache hits) becomes a leading 'metrics' event.
+    """
+    if not isinstance(update, dict):
+        return []
+    if 'node_metrics' in update:
+        update = dict(update)
+        metrics_events = [
+            {'event': 'metrics', 'node': node, 'data': node_metrics}
+            for node_metrics in update.pop('node_metrics') or []
+        ]
+        return metrics_events + summarize_update(node, update)
+    if node == 'conduct_research':
+        research_results = [
+            {key: value for key, value in result.items() if key != 'search_results'}
+            for result in update.get('research_results') or []
+        ]
+        return [{'event': 'node', 'node': node, 'data': {'research_results': research_results}}]
+    if node == 'understand_youtube_videos':
+        understanding_results = [
+            {key: value for key, value in result.items() if key != 'analysis_result'}
+            for result in (update.get('video_understanding_results') or {}).get('understanding_results', [])
+        ]
+        return [{'event': 'node', 'node': node, 'data': {'understanding_results': understanding_results}}]
+    if node == 'parse_video_analysis':
+        # One event per script time range so the UI can fill segments in as they arrive
+        return [
+            {'event': 'clips', 'node': node, 'data': parsed}
+            for parsed in (update.get('parsed_video_analysis') or {}).get('parsed_results', [])
+        ]
+    if node == 'generate_final_structure':
+        return [{'event': 'final', 'node': node, 'data': update.get('final_video_structure')}]
+    return [{'event': 'node', 'node': node, 'data': update}]
+
+
+def progress_events(event, data_str):
+    """Progress events for one SSE event of an "updates" stream"""
+    if event == 'error':
+        raise LangGraphError(f"LangGraph run failed: {data_str}")
+    if event != 'updates':
+        return []
+    event_data = decode_event(data_str)
+    if not isinstance(event_data, dict):
+        return []
+    progress = []
+    for node, update in event_data.items():
+        print(f"📨 {node} finished")
+        progress.extend(summarize_update(node, update))
+    return progress
+
+
+def _add_agent_path():
+    # Same import root langgraph dev uses for the agent ("dependencies": ["."] in langgraph.json)
+    agent_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'agent')
+    if agent_dir not in sys.path:
+        sys.path.insert(0, agent_dir)
+
+
+def load_workflow():
+    """Import the uncompiled ClipHunt StateGraph"""
+    _add_agent_path()
+    from cliphunt import http_session, workflow
+    # The graph's outbound HTTP pool lives in this process, so its gauges can go on /metrics
+    registry.set_collector('http_pool', http_session.pool_stats)
+    return workflow
+
+
+def checkpoint_serde():
+    """Checkpoint serializer that allowlists the ClipHunt state models, so resuming a thread restores them without warnings
+
+    Newer langgraph-checkpoint releases warn on every unregistered type they deserialize (and will block them);
+    releases without an allowlist get their default serializer.
+    """
+    from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+    _add_agent_path()
+    import cliphunt
+    state_types = [value for value in vars(cliphunt).values()
+                   if isinstance(value, type) and value.__module__ == cliphunt.__name__ and issubclass(value, (BaseModel, Enum))]
+    try:
+        return JsonPlusSerializer(allowed_msgpack_modules=state_types)
+    except TypeError:
+        return JsonPlusSerializer()
+
+
+_checkpointed_graph = None
+_checkpointed_graph_lock = threading.Lock()
+
+
+def load_graph():
+    """The ClipHunt graph for embedded execution, compiled with the SQLite checkpointer unless disabled"""
+    global _checkpointed_graph
+    if GRAPH_CHECKPOINTER != 'sqlite':
+        load_workflow()
+        from cliphunt import graph
+        return graph
+    with _checkpointed_graph_lock:
+        if _checkpointed_graph is None:
+            from langgraph.checkpoint.sqlite import SqliteSaver
+            os.makedirs(os.path.dirname(os.path.abspath(CHECKPOINT_DB_PATH)), exist_ok=True)
+            conn = sqlite3.connect(CHECKPOINT_DB_PATH, check_same_thread=False)
+            _checkpointed_graph = load_workflow().compile(checkpointer=SqliteSaver(conn, serde=checkpoint_serde()))
+        return _checkpointed_graph
+
+
+def parse_max_ideators(value):
+    """max_ideators from a request body (an integer or a string of digits) as a positive int, or None if invalid"""
+    if isinstance(value, str) and value.strip().isdigit():
+        value = int(value)
+    if not isinstance(value, int) or isinstance(value, bool) or value < 1:
+        return None
+    return value
+
+
+def graph_input(topic, max_ideators):
+    """Initial state for an embedded run"""
+    return {"topic": topic, "max_ideators": max_ideators}
+
+
+def resume_plan(values, next_nodes):
+    """How to continue a thread given its latest checkpoint: ('resume', None), ('done', final structure) or ('start', None)
+
+    A thread with pending nodes is resumed from its last completed superstep
+    (input None); a finished thread already holds the final structure; a
+    thread without checkpoints starts over with a fresh input.
+    """
+    if next_nodes:
+        print(f"♻️ Resuming thread at: {', '.join(next_nodes)}")
+        return 'resume', None
+    final_structure = (values or {}).get('final_video_structure')
+    if final_structure:
+        print("♻️ Thread already finished, reusing its final structure")
+        return 'done', to_jsonable(final_structure)
+    return 'start', None
+
+
+def to_jsonable(value):
+    """Convert in-process state (Pydantic models, nested containers) to JSON-compatible data"""
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, dict):
+        return {key: to_jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_jsonable(item) for item in value]
+    return value
+
+
+def embedded_progress_events(chunk):
+    """Progress events for one embedded "updates" chunk ({node: state update})"""
+    progress = []
+    for node, update in chunk.items():
+        print(f"📨 {node} finished")
+        progress.extend(summarize_update(node, to_jsonable(update)))
+    return progress
+
+
+def create_thread():
+    """Create a LangGraph thread and return its id"""
+    thread_response = requests.post(f"{LANGGRAPH_DEV_URL}/threads", json={"metadata": {}})
+    if thread_response.status_code != 200:
+        raise LangGraphError(f"Failed to create thread: {thread_response.status_code} - {thread_response.text}")
+    return thread_response.json()["thread_id"]
+
+
+def get_thread_state(thread_id):
+    """Latest checkpoint of a LangGraph dev thread ({"values": ..., "next": [...], ...})"""
+    state_response = requests.get(f"{LANGGRAPH_DEV_URL}/threads/{thread_id}/state")
+    if state_response.status_code != 200:
+        raise LangGraphError(f"Failed to get thread state: {state_response.status_code} - {state_response.text}")
+    return state_response.json()
+
+
+def iter_sse_data(response):
+    """Yield (event, raw data string) pairs from a LangGraph SSE response without decoding them"""
+    parser = SSEParser()
+    for line in response.iter_lines(chunk_size=64 * 1024):
+        parsed = parser.feed(line.decode('utf-8'))
+        if parsed is not None:
+            yield parsed
+
+
+def stream_proxy_events(topic, max_ideators, thread_id, resume=False):
+    """Progress events for a run on the LangGraph dev server, optionally resuming an existing thread"""
+    # "updates" yields one event per finished node, which is what we forward
+    payload = run_payload(topic, max_ideators, "updates")
+    if resume:
+        state = get_thread_state(thread_id)
+        action, final_structure = resume_plan(state.get('values'), state.get('next'))
+        if action == 'done':
+            yield {'event': 'final', 'node': 'generate_final_structure', 'data': final_structure}
+            return
+        if action == 'resume':
+            payload['input'] = None
+    with requests.post(f"{LANGGRAPH_DEV_URL}/threads/{thread_id}/runs/stream", json=payload, headers=SSE_HEADERS, stream=True) as response:
+        if response.status_code != 200:
+            raise LangGraphError(f"LangGraph dev API error: {response.status_code} - {response.text}")
+        
+        for event, data_str in iter_sse_data(response):
+            yield from progress_events(event, data_str)
+
+
+def stream_embedded_events(topic, max_ideators, thread_id, resume=False):
+    """Progress events for an in-process run, optionally resuming an existing thread"""
+    graph = load_graph()
+    config = {"configurable": {"thread_id": thread_id}}
+    run_input = graph_input(topic, max_ideators)
+    if resume and graph.checkpointer is not None:
+        snapshot = graph.get_state(config)
+        action, final_structure = resume_plan(snapshot.values, snapshot.next)
+        if action == 'done':
+            yield {'event': 'final', 'node': 'generate_final_structure', 'data': final_structure}
+            return
+        if action == 'resume':
+            run_input = None
+    for chunk in graph.stream(run_input, config=config, stream_mode="updates"):
+        yield from embedded_progress_events(chunk)
+
+
+def generation_events(topic, max_ideators, thread_id=None):
+    """Progress events for a run in the configured execution mode; passing a thread_id resumes that thread"""
+    resume = thread_id is not None
+    if not resume:
+        thread_id = str(uuid.uuid4()) if EXECUTION_MODE == 'embedded' else create_thread()
+    yield {'event': 'start', 'thread_id': thread_id}
+    if EXECUTION_MODE == 'embedded':
+        yield from stream_embedded_events(topic, max_ideators, thread_id, resume)
+    else:
+        yield from stream_proxy_events(topic, max_ideators, thread_id, resume)
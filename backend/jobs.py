@@ -0,0 +1,186 @@
+"""
+Asynchronous video generation jobs: a persistent SQLite job store and a local
+worker pool, so long runs survive proxy timeouts and client disconnects
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+
+# Worker pool size, how long finished jobs are kept, and where they are stored
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", str(24 * 3600)))
+JOB_STORE_PATH = os.getenv("JOB_STORE_PATH") or os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "jobs.sqlite")
+
+
+class JobStore:
+    """SQLite-backed job records plus their progress events, safe to share across threads"""
+
+    def __init__(self, path, retention=JOB_RETENTION_SECONDS):
+        self.retention = retention
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, status TEXT NOT NULL, topic TEXT NOT NULL, max_ideators INTEGER NOT NULL, "
+            "created_at REAL NOT NULL, updated_at REAL NOT NULL, result TEXT, error TEXT)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS job_events ("
+            "job_id TEXT NOT NULL, seq INTEGER NOT NULL, event TEXT NOT NULL, PRIMARY KEY (job_id, seq))"
+        )
+
+    def create(self, topic, max_ideators):
+        job_id = str(uuid.uuid4())
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, topic, max_ideators, created_at, updated_at) VALUES (?, 'queued', ?, ?, ?, ?)",
+                (job_id, topic, max_ideators, now, now),
+            )
+        return job_id
+
+    def set_status(self, job_id, status, result=None, error=None):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, updated_at = ? WHERE id = ?",
+                (status, json.dumps(result) if result is not None else None, error, time.time(), job_id),
+            )
+
+    def add_event(self, job_id, event):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO job_events (job_id, seq, event) "
+                "VALUES (?, (SELECT COUNT(*) FROM job_events WHERE job_id = ?), ?)",
+                (job_id, job_id, json.dumps(event)),
+            )
+            self._conn.execute("UPDATE jobs SET updated_at = ? WHERE id = ?", (time.time(), job_id))
+
+    def reset_events(self, job_id):
+        with self._lock:
+            self._conn.execute("DELETE FROM job_events WHERE job_id = ?", (job_id,))
+
+    def get(self, job_id):
+        """Job status with its partial progress and final result, or None if unknown or expired"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, status, topic, max_ideators, created_at, updated_at, result, error FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+            if row is None:
+                return None
+            events = self._conn.execute(
+                "SELECT event FROM job_events WHERE job_id = ? ORDER BY seq", (job_id,)
+            ).fetchall()
+        job = {
+            'job_id': row[0],
+            'status': row[1],
+            'topic': row[2],
+            'max_ideators': row[3],
+            'created_at': row[4],
+            'updated_at': row[5],
+            'progress': [json.loads(event) for (event,) in events],
+            'result': json.loads(row[6]) if row[6] is not None else None,
+            'error': row[7],
+        }
+        if job['status'] in ('succeeded', 'failed'):
+            job['expires_at'] = job['updated_at'] + self.retention
+            if job['expires_at'] < time.time():
+                return None
+        return job
+
+    def unfinished(self):
+        """Jobs that were queued or running when the process last stopped"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, topic, max_ideators FROM jobs WHERE status IN ('queued', 'running') ORDER BY created_at"
+            ).fetchall()
+        return rows
+
+    def purge_expired(self):
+        """Delete finished jobs older than the retention period"""
+        cutoff = time.time() - self.retention
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM job_events WHERE job_id IN "
+                "(SELECT id FROM jobs WHERE status IN ('succeeded', 'failed') AND updated_at < ?)",
+                (cutoff,),
+            )
+            self._conn.execute("DELETE FROM jobs WHERE status IN ('succeeded', 'failed') AND updated_at < ?", (cutoff,))
+
+
+class JobQueue:
+    """Runs jobs on a bounded local worker pool, recording progress and results in a JobStore
+
+    run_events(topic, max_ideators) must yield the same progress events as the
+    streaming endpoint; the 'final' event's data becomes the job result and an
+    'error' event fails the job.
+    """
+
+    def __init__(self, store, run_events, workers=JOB_WORKERS):
+        self.store = store
+        self.run_events = run_events
+        self.workers = workers
+        self._executor = None
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+
+    def start(self):
+        """Start the worker pool (once) and re-queue jobs interrupted by a restart"""
+        with self._lock:
+            if self._executor is not None:
+                return
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job-worker")
+        self.store.purge_expired()
+        for job_id, topic, max_ideators in self.store.unfinished():
+            print(f"♻️ Re-queueing interrupted job {job_id}")
+            self.store.reset_events(job_id)
+            self.store.set_status(job_id, 'queued')
+            self._executor.submit(self._run, job_id, topic, max_ideators)
+
+    def stop(self):
+        """Stop taking work on shutdown; queued and in-flight jobs stay unfinished and resume on the next start"""
+        self._stopping.set()
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def submit(self, topic, max_ideators):
+        self.start()
+        self.store.purge_expired()
+        job_id = self.store.create(topic, max_ideators)
+        self._executor.submit(self._run, job_id, topic, max_ideators)
+        return job_id
+
+    def _run(self, job_id, topic, max_ideators):
+        print(f"🛠️ Job {job_id} started: {topic}")
+        self.store.set_status(job_id, 'running')
+        try:
+            result = None
+            for event in self.run_events(topic, max_ideators):
+                if self._stopping.is_set():
+                    raise CancelledError()
+                if event['event'] == 'error':
+                    raise RuntimeError(event['error'])
+                if event['event'] == 'final':
+                    result = event['data']
+                else:
+                    self.store.add_event(job_id, event)
+            if result is None:
+                raise RuntimeError('Failed to generate video structure - no final result received')
+            self.store.set_status(job_id, 'succeeded', result=result)
+            print(f"✅ Job {job_id} succeeded")
+        except Exception as e:
+            # A shutdown cancels the run or closes its event loop under it: that is an interruption, not a failure
+            if isinstance(e, CancelledError) or self._stopping.is_set():
+                print(f"⏸️ Job {job_id} interrupted by shutdown, re-queued for the next start")
+                self.store.set_status(job_id, 'queued')
+                return
+            print(f"❌ Job {job_id} failed: {str(e)}")
+            self.store.set_status(job_id, 'failed', error=str(e))
@@ -0,0 +1,218 @@
+"""
+In-process aggregation of the per-node metrics reported by the ClipHunt graph
+(see backend/agent/instrumentation.py), exposed in Prometheus text format on
+/metrics and summarized per run as a 'timing' event and Server-Timing header
+"""
+
+import threading
+import time
+
+# Histogram buckets (seconds) for node and end-to-end latencies; nodes range from sub-second to minutes
+LATENCY_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+def split_counter(name):
+    """'external_calls.tavily' -> ('external_calls', 'tavily'); unlabeled counters get None"""
+    metric, _, label = name.partition('.')
+    return metric, label or None
+
+
+def cache_hit_rates(counters):
+    """Hit ratio per cache from 'cache_hits.<cache>' / 'cache_misses.<cache>' counters"""
+    hits, lookups = {}, {}
+    for name, value in counters.items():
+        metric, cache = split_counter(name)
+        if metric in ('cache_hits', 'cache_misses'):
+            lookups[cache] = lookups.get(cache, 0) + value
+            if metric == 'cache_hits':
+                hits[cache] = hits.get(cache, 0) + value
+    return {cache: round(hits.get(cache, 0) / total, 4) for cache, total in lookups.items() if total}
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram"""
+
+    def __init__(self):
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        self.count += 1
+        self.sum += seconds
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                self.buckets[index] += 1
+
+
+class RunTiming:
+    """Timing and usage summary of one generation, built from its 'metrics' events"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.nodes = {}
+        self.counters = {}
+
+    def add(self, node_metrics):
+        node = node_metrics.get('node')
+        self.nodes[node] = self.nodes.get(node, 0) + node_metrics.get('seconds', 0)
+        for name, value in (node_metrics.get('counters') or {}).items():
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def summary(self):
+        return {
+            'total_seconds': round(time.perf_counter() - self.started, 4),
+            'node_seconds': {node: round(seconds, 4) for node, seconds in self.nodes.items()},
+            'counters': self.counters,
+            'cache_hit_rates': cache_hit_rates(self.counters),
+        }
+
+
+def server_timing_header(summary):
+    """Server-Timing header value (milliseconds) for a run summary"""
+    entries = [f"{node};dur={seconds * 1000:.1f}" for node, seconds in summary['node_seconds'].items()]
+    entries.append(f"total;dur={summary['total_seconds'] * 1000:.1f}")
+    return ", ".join(entries)
+
+
+class MetricsRegistry:
+    """Thread-safe totals across all runs served by this process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.node_latency = {}
+        self.counters = {}
+        self.generations = {}
+        self.generation_latency = Histogram()
+        self.collectors = {}
+
+    def set_collector(self, name, collect):
+        """Render `collect()` ({gauge: value}) as cliphunt_<name>_<gauge> gauges, e.g. the HTTP pool of an embedded graph"""
+        with self._lock:
+            self.collectors[name] = collect
+
+    def observe_node(self, node_metrics):
+        with self._lock:
+            node = node_metrics.get('node')
+            self.node_latency.setdefault(node, Histogram()).observe(node_metrics.get('seconds', 0))
+            for name, value in (node_metrics.get('counters') or {}).items():
+                key = (node, name)
+                self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe_generation(self, status, seconds):
+        with self._lock:
+            self.generations[status] = self.generations.get(status, 0) + 1
+            if status == 'succeeded':
+                self.generation_latency.observe(seconds)
+
+    def render(self):
+        """Prometheus text exposition format"""
+        with self._lock:
+            lines = []
+            lines += self._render_histogram(
+                'cliphunt_node_duration_seconds', 'Wall time per graph node',
+                {(('node', node),): histogram for node, histogram in sorted(self.node_latency.items())}
+            )
+            lines += self._render_histogram(
+                'cliphunt_generation_duration_seconds', 'End-to-end wall time of successful generations',
+                {(): self.generation_latency}
+            )
+            lines += ['# HELP cliphunt_generations_total Finished generations by status', '# TYPE cliphunt_generations_total counter']
+            lines += [f'cliphunt_generations_total{{status="{status}"}} {count}' for status, count in sorted(self.generations.items())]
+
+            # Node counters: llm_calls/llm_input_tokens/... plus labeled external_calls.<service> and cache_hits.<cache>
+            families = {}
+            for (node, name), value in self.counters.items():
+                metric, label = split_counter(name)
+                labels = [('node', node)]
+                if metric == 'external_calls':
+                    labels.append(('service', label))
+                elif metric in ('cache_hits', 'cache_misses'):
+                    labels.append(('cache', label))
+                families.setdefault(metric, []).append((tuple(labels), value))
+            for metric, samples in sorted(families.items()):
+                lines += [f'# TYPE cliphunt_{metric}_total counter']
+                lines += [f'cliphunt_{metric}_total{self._labels(labels)} {value:g}' for labels, value in sorted(samples)]
+
+            # Convenience gauge: hit ratio per cache across all nodes
+            totals = {}
+            for (node, name), value in self.counters.items():
+                totals[name] = totals.get(name, 0) + value
+            hit_rates = cache_hit_rates(totals)
+            if hit_rates:
+                lines += ['# HELP cliphunt_cache_hit_ratio Cache hits / lookups since startup', '# TYPE cliphunt_cache_hit_ratio gauge']
+                lines += [f'cliphunt_cache_hit_ratio{{cache="{cache}"}} {ratio:.4f}' for cache, ratio in sorted(hit_rates.items())]
+
+            # Share of video analyses (each a 20-60 s Gemini call) that yielded nothing parseable
+            if totals.get('video_analyses'):
+                ratio = totals.get('video_analyses_discarded', 0) / totals['video_analyses']
+                lines += ['# HELP cliphunt_video_analysis_discard_ratio Video analyses that yielded no usable segment / analyses parsed since startup',
+                          '# TYPE cliphunt_video_analysis_discard_ratio gauge', f'cliphunt_video_analysis_discard_ratio {ratio:.4f}']
+
+            for name, collect in sorted(self.collectors.items()):
+                for gauge, value in sorted(collect().items()):
+                    lines += [f'# TYPE cliphunt_{name}_{gauge} gauge', f'cliphunt_{name}_{gauge} {value:g}']
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _labels(labels):
+        if not labels:
+            return ''
+        return '{' + ','.join(f'{key}="{value}"' for key, value in labels) + '}'
+
+    def _render_histogram(self, name, help_text, series):
+        lines = [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+        for labels, histogram in series.items():
+            for bound, count in zip(LATENCY_BUCKETS, histogram.buckets):
+                lines.append(f'{name}_bucket{self._labels(labels + (("le", f"{bound:g}"),))} {count}')
+            lines.append(f'{name}_bucket{self._labels(labels + (("le", "+Inf"),))} {histogram.count}')
+            lines.append(f'{name}_sum{self._labels(labels)} {histogram.sum:.4f}')
+            lines.append(f'{name}_count{self._labels(labels)} {histogram.count}')
+        return lines
+
+
+registry = MetricsRegistry()
+
+
+def instrument_events(events):
+    """Feed a run's 'metrics' events into the registry and emit its 'timing' summary right before 'final'"""
+    timing = RunTiming()
+    final_received = False
+    try:
+        for event in events:
+            if event['event'] == 'metrics':
+                registry.observe_node(event['data'])
+                timing.add(event['data'])
+            elif event['event'] == 'final':
+                final_received = True
+                summary = timing.summary()
+                registry.observe_generation('succeeded', summary['total_seconds'])
+                yield {'event': 'timing', 'data': summary}
+            yield event
+    except Exception:
+        registry.observe_generation('failed', time.perf_counter() - timing.started)
+        raise
+    if not final_received:
+        registry.observe_generation('incomplete', time.perf_counter() - timing.started)
+
+
+async def ainstrument_events(events):
+    """Async counterpart of instrument_events"""
+    timing = RunTiming()
+    final_received = False
+    try:
+        async for event in events:
+            if event['event'] == 'metrics':
+                registry.observe_node(event['data'])
+                timing.add(event['data'])
+            elif event['event'] == 'final':
+                final_received = True
+                summary = timing.summary()
+                registry.observe_generation('succeeded', summary['total_seconds'])
+                yield {'event': 'timing', 'data': summary}
+            yield event
+    except Exception:
+        registry.observe_generation('failed', time.perf_counter() - timing.started)
+        raise
+    if not final_received:
+        registry.observe_generation('incomplete', time.perf_counter() - timing.started)
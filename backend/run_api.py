@@ -1,7 +1,17 @@
 import os
 import sys
 from dotenv import load_dotenv
-from api_server import app
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5001, debug=True) 
\ No newline at end of file
+    if '--asgi' in sys.argv:
+        # Async server: long-lived generations are coroutines sharing one connection pool
+        import uvicorn
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        uvicorn.run('asgi_server:app', host='0.0.0.0', port=5001)
+    else:
+        from werkzeug.serving import is_running_from_reloader
+        from api_server import app, job_queue
+        # Start job workers (and re-queue interrupted jobs) once, in the serving process rather than the reloader's watcher
+        if is_running_from_reloader():
+            job_queue.start()
+        app.run(host='0.0.0.0', port=5001, debug=True)
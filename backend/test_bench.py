@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+"""
+Smoke tests for the offline benchmark harness and load-test stubs (recorded fixtures, no network)
+"""
+
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from concurrent.futures import CancelledError
+from types import SimpleNamespace
+
+from bench import context_packing, query_batching, run, segment_ranking, state_size, stubs
+from bench.replay import Fixtures, Latency, import_cliphunt, install
+from coalescing import AsyncGenerationCoalescer, GenerationCoalescer
+from graph_client import SSEParser, checkpoint_serde, progress_events
+from jobs import JobQueue, JobStore
+
+
+def test_offline_benchmark_covers_every_node():
+    report = run.main(["--runs", "2", "--concurrency", "2", "--node-repeats", "1", "--gemini-rps", "1000"])
+    graph_result = report["graph"][0]
+    assert set(graph_result["nodes"]) == set(report["nodes"])
+    assert len(graph_result["nodes"]) == 9
+    assert graph_result["end_to_end"]["count"] == 2
+    assert graph_result["throughput_runs_per_s"] > 0
+
+
+def test_langgraph_stub_streams_a_full_run():
+    client = stubs.create_app(Fixtures(), Latency(), stubs.Faults()).test_client()
+    thread_id = client.post("/threads", json={"metadata": {}}).get_json()["thread_id"]
+    payload = {"assistant_id": "ClipHunt", "input": {"topic": "lakers", "max_ideators": 2}, "stream_mode": ["updates"]}
+    response = client.post(f"/threads/{thread_id}/runs/stream", json=payload)
+
+    parser = SSEParser()
+    events = []
+    for line in response.get_data(as_text=True).splitlines():
+        parsed = parser.feed(line)
+        if parsed is not None:
+            events.extend(progress_events(*parsed))
+    assert events[-1]["event"] == "final"
+    assert len([event for event in events if event["event"] == "metrics"]) == 9
+    assert client.get(f"/threads/{thread_id}/state").get_json()["values"]["final_video_structure"]
+
+
+def test_batched_search_queries_save_llm_round_trips():
+    report = query_batching.main(["--ideators", "4", "--repeats", "1"])
+    result = report["results"][0]
+    assert result["per_ideator"]["llm_calls"] == 8
+    assert result["batched"]["llm_calls"] == 5
+    assert result["batched"]["llm_input_tokens"] < result["per_ideator"]["llm_input_tokens"]
+
+
+def test_batched_search_queries_leave_unmatched_ideators_to_fallback(monkeypatch):
+    cliphunt = import_cliphunt()
+    ideators = [cliphunt.Ideator(name=name, role="fan", description="watches games") for name in ("Ana", "Ben")]
+    batch = cliphunt.SearchQueryBatch(queries=[
+        cliphunt.IdeatorSearchQuery(ideator_name=" ana ", query="q", search_method="tavily", reasoning="r"),
+        cliphunt.IdeatorSearchQuery(ideator_name="Carl", query="q", search_method="tavily", reasoning="r"),
+    ])
+    structured_llm = SimpleNamespace(invoke=lambda messages, **kwargs: batch)
+    monkeypatch.setattr(cliphunt, "llm", SimpleNamespace(with_structured_output=lambda schema, **kwargs: structured_llm))
+    assert list(cliphunt.generate_search_queries(ideators, "lakers")) == ["Ana"]
+
+
+def test_batched_search_queries_fall_back_when_the_llm_returns_nothing(monkeypatch):
+    cliphunt = import_cliphunt()
+    ideators = [cliphunt.Ideator(name="Ana", role="fan", description="watches games")]
+    structured_llm = SimpleNamespace(invoke=lambda messages, **kwargs: None)
+    monkeypatch.setattr(cliphunt, "llm", SimpleNamespace(with_structured_output=lambda schema, **kwargs: structured_llm))
+    assert cliphunt.generate_search_queries(ideators, "lakers") == {}
+
+
+def test_video_analysis_survives_a_broken_gemini_cache(monkeypatch):
+    cliphunt = import_cliphunt()
+    install(cliphunt, Fixtures(), Latency())
+
+    def broken(*args, **kwargs):
+        raise OSError("disk I/O error")
+
+    monkeypatch.setattr(cliphunt, "gemini_cache", SimpleNamespace(get=broken, set=broken))
+    search_result = cliphunt.ContentSearchResult(title="t", start="00:00", end="00:05", keywords=["lebron"],
+                                                 search_query="q", links=["https://youtu.be/x"])
+    result = cliphunt.analyze_youtube_video(search_result, "lakers", time.monotonic() + 60)
+    assert not result.cache_hit
+    assert not result.analysis_result.startswith("Analysis failed")
+
+    # A malformed entry (here without processing_time) is treated as a miss too
+    monkeypatch.setattr(cliphunt, "gemini_cache", SimpleNamespace(get=lambda key: {"analysis_result": "[]"}, set=broken))
+    result = cliphunt.analyze_youtube_video(search_result, "lakers", time.monotonic() + 60)
+    assert not result.cache_hit
+    assert not result.analysis_result.startswith("Analysis failed")
+
+
+def test_search_survives_a_broken_search_cache(monkeypatch):
+    cliphunt = import_cliphunt()
+    install(cliphunt, Fixtures(), Latency())
+
+    def broken(*args, **kwargs):
+        raise OSError("database is locked")
+
+    monkeypatch.setattr(cliphunt, "search_cache", SimpleNamespace(get=broken, set=broken))
+    search_results = cliphunt.execute_search("lebron james scoring record", cliphunt.SearchMethod.TAVILY)
+    assert search_results and not cliphunt._is_search_error(search_results)
+
+
+def test_context_packing_bounds_the_script_prompt():
+    report = context_packing.main(["--ideators", "3,16", "--budget", "600", "--repeats", "1", "--prefill-ms", "0"])
+    small, large = report["results"]
+    assert large["unpacked"]["prompt_tokens"] > 3 * small["unpacked"]["prompt_tokens"]
+    assert small["packed"]["context_tokens"] <= 600
+    assert large["packed"]["context_tokens"] <= 600
+    assert large["packed"]["passages_dropped"] > 0
+
+
+def test_blob_store_shrinks_state_without_changing_the_result(tmp_path):
+    cliphunt = import_cliphunt()
+    from blob_store import BlobStore, is_blob_ref
+    final_states = []
+    for blob_store in (None, BlobStore(str(tmp_path), min_bytes=64)):
+        # Fresh fixtures, so both runs replay the same responses
+        fixtures = Fixtures()
+        install(cliphunt, fixtures, Latency(), 2)
+        blob_store_setting = cliphunt.blob_store
+        cliphunt.blob_store = blob_store
+        try:
+            final_states.append(cliphunt.graph.invoke({"topic": fixtures.topic, "max_ideators": 2}))
+        finally:
+            cliphunt.blob_store = blob_store_setting
+    offloaded = final_states[1]
+    assert all(is_blob_ref(result.search_results) for result in offloaded["research_results"])
+    assert all(is_blob_ref(result.analysis_result) for result in offloaded["video_understanding_results"].understanding_results)
+    # Videos are analyzed concurrently, so which recorded analysis goes with which range varies between runs
+    segments = [sorted(segment.content for result in state["parsed_video_analysis"].parsed_results for segment in result.video_segments)
+                for state in final_states]
+    assert segments[0] and segments[0] == segments[1]
+
+    report = state_size.main(["--ideators", "2"])
+    assert report["results"][0]["total_blob_bytes"] < report["results"][0]["total_inline_bytes"]
+
+
+def test_resumed_checkpoint_restores_state_models_without_warnings(tmp_path, monkeypatch, caplog):
+    from langgraph.checkpoint.serde import jsonplus
+    from langgraph.checkpoint.sqlite import SqliteSaver
+    cliphunt = import_cliphunt()
+    fixtures = Fixtures()
+    install(cliphunt, fixtures, Latency(), 2)
+    # The "unregistered type" warning is logged once per type per process
+    monkeypatch.setattr(jsonplus, "_warned_unregistered_types", set(), raising=False)
+    path = str(tmp_path / "checkpoints.sqlite")
+    config = {"configurable": {"thread_id": "resume-test"}}
+    cliphunt.workflow.compile(checkpointer=SqliteSaver(sqlite3.connect(path, check_same_thread=False), serde=checkpoint_serde())).invoke(
+        {"topic": fixtures.topic, "max_ideators": 2}, config)
+
+    # A fresh saver reads the thread back, as a restarted server resuming it would
+    resumed = cliphunt.workflow.compile(checkpointer=SqliteSaver(sqlite3.connect(path, check_same_thread=False), serde=checkpoint_serde()))
+    with caplog.at_level(logging.WARNING):
+        values = resumed.get_state(config).values
+    assert isinstance(values["final_video_structure"], cliphunt.FinalVideoStructure)
+    assert values["ideators"] and all(isinstance(ideator, cliphunt.Ideator) for ideator in values["ideators"])
+    assert not [record for record in caplog.records if "Deserializing unregistered type" in record.getMessage()]
+
+
+def test_segment_ranking_matches_legacy_and_recovers_damaged_analyses():
+    # main() asserts the new ranking picks the same segments as the old implementation
+    report = segment_ranking.main(["--segments", "200", "--repeats", "1", "--number", "1"])
+    assert all(result["new_segments"] == 3 for result in report["recovery"])
+
+
+def test_parse_video_analysis_validates_structured_output_and_counts_discards():
+    cliphunt = import_cliphunt()
+    from instrumentation import instrument_node
+    from metrics import MetricsRegistry
+    segment = {"start": "00:03", "end": "00:09", "content": "LeBron fadeaway"}
+    analyses = [
+        json.dumps({"segments": [segment]}),
+        "```json\n" + json.dumps([segment]) + "\n```\nHope this helps!",
+        "Analysis failed: 503 UNAVAILABLE",
+        "[]",
+    ]
+    understanding_results = cliphunt.VideoUnderstandingResults(understanding_results=[
+        cliphunt.VideoUnderstandingResult(start="00:00", end="00:05", keywords=["fadeaway"], youtube_url=f"https://youtu.be/{index}",
+                                          analysis_query="q", analysis_result=analysis, processing_time=1.0)
+        for index, analysis in enumerate(analyses)
+    ])
+    update = instrument_node("parse_video_analysis", cliphunt.parse_video_analysis)({"video_understanding_results": understanding_results})
+
+    segment_counts = [len(result.video_segments) for result in update["parsed_video_analysis"].parsed_results]
+    assert segment_counts == [1, 1, 0, 0]
+    node_metrics = update["node_metrics"][0]
+    # Only the fenced analysis counts as repaired; the failed call and the empty list both produced nothing usable
+    assert node_metrics["counters"] == {"video_analyses": 4, "video_analyses_repaired": 1, "video_analyses_discarded": 2}
+    registry = MetricsRegistry()
+    registry.observe_node(node_metrics)
+    assert "cliphunt_video_analysis_discard_ratio 0.5000" in registry.render()
+
+
+def wait_for_status(store, job_id, statuses, timeout=5):
+    deadline = time.time() + timeout
+    while store.get(job_id)["status"] not in statuses:
+        assert time.time() < deadline, store.get(job_id)
+        time.sleep(0.01)
+    return store.get(job_id)
+
+
+def test_job_queue_records_progress_results_and_errors(tmp_path):
+    def run_events(topic, max_ideators):
+        if topic == "broken":
+            yield {"event": "error", "error": "Gemini unavailable", "status": 503}
+            return
+        yield {"event": "progress", "node": "generate_ideators"}
+        yield {"event": "progress", "node": "conduct_research"}
+        yield {"event": "final", "data": {"topic": topic, "max_ideators": max_ideators}}
+
+    store = JobStore(str(tmp_path / "jobs.sqlite"))
+    queue = JobQueue(store, run_events)
+    succeeded = queue.submit("lakers", 2)
+    failed = queue.submit("broken", 2)
+    assert store.get(succeeded)["topic"] == "lakers"
+
+    job = wait_for_status(store, succeeded, ("succeeded", "failed"))
+    assert job["status"] == "succeeded"
+    assert [event["node"] for event in job["progress"]] == ["generate_ideators", "conduct_research"]
+    assert job["result"] == {"topic": "lakers", "max_ideators": 2}
+    assert job["expires_at"] == job["updated_at"] + store.retention
+    job = wait_for_status(store, failed, ("succeeded", "failed"))
+    assert job["status"] == "failed" and job["error"] == "Gemini unavailable"
+    assert store.get("unknown") is None
+
+    # Finished jobs disappear after the retention period
+    expired = JobStore(str(tmp_path / "jobs.sqlite"), retention=0)
+    time.sleep(0.01)
+    assert expired.get(succeeded) is None
+    expired.purge_expired()
+    assert store.get(succeeded) is None and store.get(failed) is None
+
+
+def test_job_queue_restart_reruns_unfinished_jobs_from_scratch(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite"))
+    queued = store.create("lakers", 2)
+    running = store.create("warriors", 3)
+    store.set_status(running, "running")
+    store.add_event(running, {"event": "progress", "node": "generate_ideators"})
+    finished = store.create("celtics", 2)
+    store.set_status(finished, "succeeded", result={"topic": "celtics"})
+
+    runs = []
+
+    def run_events(topic, max_ideators):
+        runs.append((topic, max_ideators))
+        yield {"event": "progress", "node": "write_script"}
+        yield {"event": "final", "data": {"topic": topic}}
+
+    JobQueue(store, run_events).start()
+    for job_id, topic in ((queued, "lakers"), (running, "warriors")):
+        job = wait_for_status(store, job_id, ("succeeded", "failed"))
+        assert job["result"] == {"topic": topic}
+        # Progress from the interrupted attempt is dropped
+        assert [event["node"] for event in job["progress"]] == ["write_script"]
+    assert sorted(runs) == [("lakers", 2), ("warriors", 3)]
+
+
+def test_jobs_interrupted_by_shutdown_are_requeued_not_failed(tmp_path):
+    def cancelled_run(topic, max_ideators):
+        yield {"event": "progress", "node": "generate_ideators"}
+        # What the worker sees when the server's event loop cancels the run on shutdown
+        raise CancelledError()
+
+    cancelled_store = JobStore(str(tmp_path / "cancelled.sqlite"))
+    cancelled = JobQueue(cancelled_store, cancelled_run).submit("lakers", 2)
+    # Submitted jobs start out queued, so wait until the run is under way before waiting for it to end
+    deadline = time.time() + 5
+    while not cancelled_store.get(cancelled)["progress"]:
+        assert time.time() < deadline
+        time.sleep(0.01)
+    assert wait_for_status(cancelled_store, cancelled, ("queued", "failed"))["status"] == "queued"
+
+    released = threading.Event()
+
+    def blocked_run(topic, max_ideators):
+        released.wait(5)
+        yield {"event": "final", "data": {"segments": []}}
+
+    stopped_store = JobStore(str(tmp_path / "stopped.sqlite"))
+    queue = JobQueue(stopped_store, blocked_run, workers=1)
+    stopped = queue.submit("warriors", 2)
+    wait_for_status(stopped_store, stopped, ("running",))
+    queue.stop()
+    released.set()
+    assert wait_for_status(stopped_store, stopped, ("queued", "succeeded", "failed"))["status"] == "queued"
+
+    # The next start picks both up again
+    for store, job_id, topic in ((cancelled_store, cancelled, "lakers"), (stopped_store, stopped, "warriors")):
+        JobQueue(store, lambda topic, max_ideators: iter([{"event": "final", "data": {"topic": topic}}])).start()
+        assert wait_for_status(store, job_id, ("succeeded", "failed"))["result"] == {"topic": topic}
+
+
+def test_identical_generation_requests_share_one_run():
+    runs = []
+    released = threading.Event()
+
+    def run_events(topic, max_ideators, thread_id):
+        runs.append((topic, max_ideators))
+        released.wait(5)
+        yield {"event": "progress", "node": "generate_ideators", "thread_id": "t1"}
+        yield {"event": "final", "data": {"topic": topic}}
+
+    coalescer = GenerationCoalescer(run_events, result_ttl=60, enabled=True)
+    first = coalescer.events("Lakers  Highlights", 2)
+    second = coalescer.events(" lakers highlights", 2)
+    other = coalescer.events("lakers highlights", 3)
+    released.set()
+    expected = [{"event": "progress", "node": "generate_ideators", "thread_id": "t1"},
+                {"event": "final", "data": {"topic": "Lakers  Highlights"}}]
+    assert list(first) == list(second) == expected
+    list(other)
+    # A repeat shortly after the run finished reuses its result
+    assert list(coalescer.events("LAKERS HIGHLIGHTS", 2)) == expected
+    assert sorted(runs) == [("Lakers  Highlights", 2), ("lakers highlights", 3)]
+
+
+def test_failed_generation_fans_the_error_out_and_is_not_reused():
+    runs = []
+    released = threading.Event()
+
+    def run_events(topic, max_ideators, thread_id):
+        runs.append(topic)
+        released.wait(5)
+        yield {"event": "progress", "node": "generate_ideators", "thread_id": "t1"}
+        raise ValueError("Gemini unavailable")
+
+    coalescer = GenerationCoalescer(run_events, result_ttl=60, enabled=True)
+    subscribers = [coalescer.events("lakers", 2), coalescer.events("Lakers", 2)]
+    released.set()
+    for events in subscribers:
+        assert list(events)[-1] == {"event": "error", "error": "Gemini unavailable", "status": 500, "thread_id": "t1"}
+    assert len(runs) == 1
+    list(coalescer.events("lakers", 2))
+    assert len(runs) == 2
+
+    def unreachable(topic, max_ideators, thread_id):
+        raise ConnectionError("refused")
+        yield
+
+    errors = list(GenerationCoalescer(unreachable, connection_errors=(ConnectionError,)).events("lakers", 2))
+    assert [event["status"] for event in errors] == [503]
+
+
+def test_async_coalescer_shares_one_run():
+    runs = []
+
+    async def run_events(topic, max_ideators, thread_id):
+        runs.append(topic)
+        await asyncio.sleep(0.01)
+        yield {"event": "final", "data": {"topic": topic}}
+
+    async def collect(events):
+        return [event async for event in events]
+
+    async def main():
+        coalescer = AsyncGenerationCoalescer(run_events, result_ttl=60, enabled=True)
+        return await asyncio.gather(collect(coalescer.events("lakers", 2)), collect(coalescer.events("LAKERS", 2)))
+
+    first, second = asyncio.run(main())
+    assert first == second == [{"event": "final", "data": {"topic": "lakers"}}]
+    assert runs == ["lakers"]
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Structural tests for the ClipHunt graph (no API calls are made)
+"""
+
+import os
+import sys
+from functools import lru_cache
+
+# cliphunt builds its API clients on first use; dummy keys cover any client a test ends up building
+os.environ.setdefault("GOOGLE_API_KEY", "test")
+os.environ.setdefault("TAVILY_API_KEY", "test")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "agent"))
+
+import cliphunt
+from cliphunt import graph
+
+
+def critical_path(drawable_graph):
+    """Longest chain of nodes between __start__ and __end__"""
+    successors = {}
+    for edge in drawable_graph.edges:
+        successors.setdefault(edge.source, []).append(edge.target)
+
+    @lru_cache(maxsize=None)
+    def longest_from(node):
+        if node == "__end__":
+            return ()
+        paths = [longest_from(target) for target in successors.get(node, [])]
+        return (node,) + max(paths, key=len, default=())
+
+    return [node for node in longest_from("__start__") if node != "__start__"]
+
+
+def test_critical_path_length():
+    """create_scriptor runs off the critical path, so only 8 of the 9 nodes are sequential"""
+    path = critical_path(graph.get_graph())
+    assert len(path) == 8
+    assert "create_scriptor" not in path
+
+
+def test_independent_nodes_share_superstep():
+    """create_ideators and create_scriptor both start right away and create_script waits for both branches"""
+    edges = {(edge.source, edge.target) for edge in graph.get_graph().edges}
+    assert ("__start__", "create_ideators") in edges
+    assert ("__start__", "create_scriptor") in edges
+    assert ("conduct_research", "create_script") in edges
+    assert ("create_scriptor", "create_script") in edges
+
+
+def test_import_and_compile_build_no_clients():
+    """Importing cliphunt and compiling the graph must not construct any API client"""
+    assert cliphunt.clients.built == []
+    graph.get_graph()
+    assert cliphunt.clients.built == []
+
+
+def test_tavily_client_shares_the_connection_pool_but_not_its_headers(monkeypatch):
+    """The pinned Tavily SDK accepts the pooled session, and its API key header stays off the DuckDuckGo session"""
+    from http_pool import PooledSession
+    # The benchmark tests swap http_session for a replay fake
+    monkeypatch.setattr(cliphunt, "http_session", PooledSession())
+    tavily = cliphunt.build_tavily()
+    assert tavily.session.get_adapter("https://api.tavily.com") is cliphunt.http_session.adapter
+    assert tavily.session.headers["Authorization"] == "Bearer test"
+    assert "Authorization" not in cliphunt.http_session.headers
+
+
+def test_tiered_cache_promotion_keeps_the_disk_entry_age(tmp_path):
+    """A disk hit copied into memory expires when the disk entry does, not a full TTL later"""
+    from cache import LRUCache, SQLiteCache, TieredCache
+    disk = SQLiteCache(str(tmp_path / "search.sqlite"))
+    disk.set("key", "results")
+    disk._conn.execute("UPDATE entries SET created_at = created_at - 100")
+    tiered = TieredCache(LRUCache(), disk)
+    assert tiered.get("key", max_age=120) == "results"
+    assert tiered.memory.get("key", max_age=120) == "results"
+    assert tiered.memory.get("key", max_age=50) is None
+
+
+def test_llm_cache_errors_fall_back_to_an_uncached_call():
+    """A locked cache database or a failed embeddings call must not fail the node"""
+    from types import SimpleNamespace
+    from langchain_core.messages import HumanMessage
+    from llm_cache import CachedLLM
+
+    def broken(*args, **kwargs):
+        raise OSError("database is locked")
+
+    llm = SimpleNamespace(model="fake", invoke=lambda messages, **kwargs: SimpleNamespace(content="fresh answer"))
+    cached_llm = CachedLLM(llm, SimpleNamespace(get=broken, set=broken), SimpleNamespace(embed=broken, nearest=broken, add=broken))
+    assert cached_llm.invoke([HumanMessage(content="hi")]).content == "fresh answer"
+
+
+def test_pooled_session_retries_server_errors_for_get_but_not_post():
+    """A search POST that reached the server is billed, so only idempotent GETs are retried on 5xx"""
+    import threading
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from http_pool import PooledSession
+
+    hits = []
+
+    class Unavailable(BaseHTTPRequestHandler):
+        def respond(self):
+            hits.append(self.command)
+            self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        do_GET = do_POST = respond
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Unavailable)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        session = PooledSession(max_retries=2, retry_backoff=0)
+        url = f"http://127.0.0.1:{server.server_port}/search"
+        assert session.post(url, json={"query": "q"}).status_code == 503
+        assert session.get(url).status_code == 503
+    finally:
+        server.shutdown()
+    assert hits == ["POST", "GET", "GET", "GET"]
+
+
+def test_quota_ledger_keeps_the_reserve_and_resets_each_day(tmp_path):
+    from scheduler import QuotaLedger
+    path = str(tmp_path / "quota.sqlite")
+    ledger = QuotaLedger(path, "youtube", daily_budget=300, reserve=100)
+    assert ledger.try_spend(100) and ledger.try_spend(100)
+    # A third search would dip into the reserve
+    assert not ledger.try_spend(100)
+    assert ledger.spent_today() == 200 and ledger.remaining_today() == 100
+    # Spending is persisted, so a restarted process sees the same day's total
+    assert QuotaLedger(path, "youtube", daily_budget=300, reserve=100).spent_today() == 200
+    assert QuotaLedger(path, "other", daily_budget=300).spent_today() == 0
+
+    ledger._today = lambda: "2099-01-01"
+    assert ledger.spent_today() == 0
+    assert ledger.try_spend(200)
+
+
+def test_youtube_search_serves_stale_results_once_the_quota_is_spent(tmp_path, monkeypatch):
+    from cache import SQLiteCache, cache_key
+    from scheduler import QuotaLedger
+
+    class NoYouTube:
+        def search(self):
+            raise AssertionError("the quota is spent, YouTube must not be called")
+
+    youtube_cache = SQLiteCache(str(tmp_path / "youtube_search.sqlite"), ttl=3600)
+    youtube_quota = QuotaLedger(str(tmp_path / "quota.sqlite"), "youtube", daily_budget=cliphunt.youtube_search_cost)
+    assert youtube_quota.try_spend(cliphunt.youtube_search_cost)
+    monkeypatch.setattr(cliphunt, "youtube_cache", youtube_cache)
+    monkeypatch.setattr(cliphunt, "youtube_quota", youtube_quota)
+    monkeypatch.setattr(cliphunt, "youtube", NoYouTube())
+
+    cached = cliphunt.TimestampKeywords(start="00:00", end="00:05", content_line="Intro", keywords=["lebron", "dunk"])
+    search_params = dict(q="lebron dunk lakers", part='id,snippet', maxResults=5, type='video', order='relevance', videoDuration='short')
+    youtube_cache.set(cache_key("youtube.search.list", search_params),
+                      {"items": [{"id": {"videoId": "abc"}, "snippet": {"title": "LeBron dunk"}}]})
+    youtube_cache._conn.execute("UPDATE entries SET created_at = created_at - 7200")
+
+    stale = cliphunt.search_youtube_range(cached, "lakers")
+    assert stale.links == ["https://www.youtube.com/watch?v=abc"]
+    uncached = cliphunt.TimestampKeywords(start="00:05", end="00:10", content_line="Outro", keywords=["buzzer"])
+    degraded = cliphunt.search_youtube_range(uncached, "lakers")
+    assert degraded.links == [] and "quota budget reached" in degraded.title